@@ -37,6 +37,14 @@ if 'clients_cleaned' not in st.session_state:
     clean_openai_clients_from_session()
     st.session_state.clients_cleaned = True
 
+# Precalentar la conexión con Firestore una sola vez por proceso
+from core.firebase_client import warm_up_firebase
+warm_up_firebase()
+
+# Reenviar las correcciones que quedaron sin guardar en la ejecución anterior
+from core.correction_journal import correction_journal
+correction_journal.replay()
+
 # Importar componentes principales
 from ui.main_layout import crear_layout_principal, mostrar_pie_pagina
 from ui.sidebar import configurar_sidebar
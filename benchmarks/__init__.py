@@ -0,0 +1,5 @@
+"""
+Pruebas de rendimiento de Textocorrector ELE.
+
+Cada módulo se ejecuta con `python -m benchmarks.<modulo>`.
+"""
@@ -0,0 +1,130 @@
+"""
+Benchmark de las analíticas del estudiante (utils.analytics).
+
+Genera historiales sintéticos de distinto tamaño (correcciones con errores
+desplegados por categoría, simulacros y ejercicios, con fechas ISO como las
+guarda la aplicación) y mide por tamaño el tiempo de:
+
+    - la ingesta columnar completa (HistorialAnalitico con todas sus tablas),
+    - calcular_metricas_progreso, analizar_errores, calcular_nivel_estimado
+      y analizar_tendencias por separado (cada una ingiere el historial),
+    - generar_informe_profesor (un solo HistorialAnalitico para todos los análisis),
+    - la carga desde la caché columnar (core.history_cache, en un directorio
+      temporal) y el informe generado a partir de ella.
+
+Uso:
+    python -m benchmarks.bench_analytics [--tamanos 1000 10000] [--repeticiones R]
+"""
+
+import argparse
+import logging
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from utils.analytics import (
+    calcular_metricas_progreso, analizar_errores, calcular_nivel_estimado,
+    analizar_tendencias, generar_informe_profesor
+)
+from utils.analytics_engine import HistorialAnalitico
+from core.history_cache import HistoryCache
+
+TAMANOS = [1000, 10000]
+
+CATEGORIAS = ["Gramática", "Léxico", "Puntuación", "Coherencia", "Ortografía", "Cohesión"]
+
+PALABRAS = "el la de en por para con casa tiempo escribir ayer siempre mañana texto idea".split()
+
+
+def generar_historial(n_correcciones, semilla=42):
+    """Devuelve (correcciones, simulacros, ejercicios) repartidos en el último año."""
+    rnd = random.Random(semilla)
+    ahora = datetime.now()
+
+    def fecha():
+        return (ahora - timedelta(seconds=rnd.randint(0, 365 * 86400))).isoformat()
+
+    correcciones = []
+    for _ in range(n_correcciones):
+        errores = [
+            {"categoria": categoria, "cantidad": rnd.randint(0, 6),
+             "ejemplos": [" ".join(rnd.choices(PALABRAS, k=3))] if rnd.random() < 0.3 else []}
+            for categoria in rnd.sample(CATEGORIAS, rnd.randint(1, 4))
+        ]
+        correcciones.append({
+            "fecha": fecha(),
+            "nivel": rnd.choice(["A2", "B1", "B2"]),
+            "puntuacion": round(rnd.uniform(3, 10), 1),
+            "texto_original": " ".join(rnd.choices(PALABRAS, k=rnd.randint(40, 250))),
+            "errores": errores,
+            "tema": rnd.choice(["viajes", "familia", "trabajo", "estudios"]),
+        })
+    simulacros = [
+        {"fecha": fecha(), "nivel": rnd.choice(["B1", "B2"]), "puntuacion": rnd.randint(40, 95)}
+        for _ in range(max(1, n_correcciones // 20))
+    ]
+    ejercicios = [
+        {"fecha": fecha(), "nivel": "B1", "tema": rnd.choice(["subjuntivo", "ser/estar", "pretéritos"])}
+        for _ in range(max(1, n_correcciones // 5))
+    ]
+    return correcciones, simulacros, ejercicios
+
+
+def ingerir(correcciones, simulacros, ejercicios):
+    """Construye todas las tablas del historial (normalmente se crean al primer uso)."""
+    historial = HistorialAnalitico(correcciones, simulacros, ejercicios)
+    historial.actividades, historial.errores, historial.palabras()
+    return historial
+
+
+def medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanos", type=int, nargs="+", default=TAMANOS,
+                        help="Número de correcciones del historial")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    print(f"Benchmark de analíticas ({args.repeticiones} repeticiones, mediana)\n")
+    directorio = tempfile.mkdtemp(prefix="bench_historial_")
+    cache = HistoryCache(path=directorio, refresh=float("inf"))
+
+    for tamano in args.tamanos:
+        correcciones, simulacros, ejercicios = generar_historial(tamano)
+        usuario = {"nombre": "Estudiante", "nivel": "B1"}
+        uid = f"bench-{tamano}"
+        cache.rebuild(uid, correcciones, simulacros, ejercicios)
+        operaciones = {
+            "ingesta (HistorialAnalitico)": lambda: ingerir(correcciones, simulacros, ejercicios),
+            "calcular_metricas_progreso": lambda: calcular_metricas_progreso(correcciones, simulacros, ejercicios),
+            "analizar_errores": lambda: analizar_errores(correcciones),
+            "calcular_nivel_estimado": lambda: calcular_nivel_estimado(correcciones, simulacros),
+            "analizar_tendencias (365 días)": lambda: analizar_tendencias(correcciones, periodo=365),
+            "generar_informe_profesor": lambda: generar_informe_profesor(correcciones, simulacros, ejercicios, usuario),
+            "carga desde la caché columnar": lambda: cache.load(uid),
+            "informe desde la caché columnar": lambda: generar_informe_profesor(
+                [], [], [], usuario, historial=cache.load(uid)),
+        }
+        print(f"Historial con {tamano} correcciones, {len(simulacros)} simulacros y {len(ejercicios)} ejercicios")
+        print(f"  {'operación':<36} {'ms':>10}")
+        for nombre, operacion in operaciones.items():
+            print(f"  {nombre:<36} {medir(operacion, args.repeticiones):>10.2f}")
+        print()
+
+    shutil.rmtree(directorio, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
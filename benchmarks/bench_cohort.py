@@ -0,0 +1,70 @@
+"""
+Benchmark del informe de una clase (utils.analytics_cohort).
+
+Genera una clase sintética (historiales como los de bench_analytics, con
+distinto tamaño por estudiante) y compara el tiempo de:
+
+    - generar_informe_profesor estudiante a estudiante (lo que había que
+      hacer antes para tener una vista de la clase),
+    - generar_informe_cohorte con los historiales ya en memoria (ingesta y
+      agregaciones de la clase),
+    - generar_informe_cohorte leyendo cada historial de la caché columnar
+      (core.history_cache, en un directorio temporal).
+
+Uso:
+    python -m benchmarks.bench_cohort [--estudiantes 150] [--correcciones 200] [--repeticiones R]
+"""
+
+import argparse
+import logging
+import random
+import shutil
+import tempfile
+
+from benchmarks.bench_analytics import generar_historial, medir
+from core.history_cache import HistoryCache
+from utils.analytics import generar_informe_profesor
+from utils.analytics_cohort import generar_informe_cohorte
+from utils.analytics_engine import HistorialAnalitico
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--estudiantes", type=int, default=150)
+    parser.add_argument("--correcciones", type=int, default=200,
+                        help="Correcciones medias por estudiante")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    rnd = random.Random(7)
+    clase = {
+        f"estudiante-{i}": generar_historial(rnd.randint(args.correcciones // 4, args.correcciones * 2), semilla=i)
+        for i in range(args.estudiantes)
+    }
+    total = sum(len(correcciones) for correcciones, _, _ in clase.values())
+    print(f"Benchmark del informe de clase ({args.repeticiones} repeticiones, mediana)")
+    print(f"{args.estudiantes} estudiantes, {total} correcciones en total\n")
+
+    directorio = tempfile.mkdtemp(prefix="bench_cohorte_")
+    cache = HistoryCache(path=directorio, refresh=float("inf"))
+    for uid, historial in clase.items():
+        cache.rebuild(uid, *historial)
+
+    usuario = {"nombre": "Estudiante"}
+    operaciones = {
+        "informe por estudiante (uno a uno)": lambda: [
+            generar_informe_profesor(*historial, usuario) for historial in clase.values()],
+        "informe de clase (en memoria)": lambda: generar_informe_cohorte(
+            list(clase), historiales={uid: HistorialAnalitico(*historial) for uid, historial in clase.items()}),
+        "informe de clase (caché columnar)": lambda: generar_informe_cohorte(
+            list(clase), historiales={uid: cache.load(uid) for uid in clase}),
+    }
+    print(f"  {'operación':<40} {'ms':>10}")
+    for nombre, operacion in operaciones.items():
+        print(f"  {nombre:<40} {medir(operacion, args.repeticiones):>10.2f}")
+
+    shutil.rmtree(directorio, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Benchmark de la codificación compacta de correcciones (core.correction_codec).
+
+Genera documentos de corrección realistas de distintos tamaños (texto
+original, texto corregido, resultado completo con errores y análisis
+contextual) y mide por documento:
+
+    - tamaño en Firestore sin codificar y codificado (según las reglas de
+      tamaño de documento de Firestore),
+    - tamaño de la lectura proyectada de los listados (HISTORY_LIST_FIELDS),
+    - tiempo de codificación y decodificación,
+
+comparando además varios niveles de zlib con bz2 y lzma como referencia.
+Comprueba que decodificar devuelve exactamente el documento original.
+
+Uso:
+    python -m benchmarks.bench_correction_codec [--documentos N]
+"""
+
+import argparse
+import bz2
+import json
+import lzma
+import random
+import time
+import zlib
+
+from config.settings import FIREBASE_COLLECTION_CORRECTIONS
+from core import correction_codec
+from core.correction_codec import encode_correction, decode_correction
+from core.firebase_client import HISTORY_LIST_FIELDS
+
+PALABRAS_TEXTO = (
+    "ayer fui al mercado con mi familia y compramos muchas frutas porque "
+    "mañana queremos preparar una comida especial para celebrar el cumpleaños "
+    "de mi abuela que siempre nos cuenta historias de su juventud en el pueblo"
+).split()
+
+LONGITUDES = [100, 300, 800, 2000]  # palabras del texto original
+
+
+def tamano_firestore(valor):
+    """Tamaño aproximado de un valor según las reglas de Firestore."""
+    if valor is None or isinstance(valor, bool):
+        return 1
+    if isinstance(valor, (int, float)):
+        return 8
+    if isinstance(valor, str):
+        return len(valor.encode("utf-8")) + 1
+    if isinstance(valor, (bytes, bytearray)):
+        return len(valor)
+    if isinstance(valor, dict):
+        return sum(len(k.encode("utf-8")) + 1 + tamano_firestore(v) for k, v in valor.items())
+    if isinstance(valor, list):
+        return sum(tamano_firestore(v) for v in valor)
+    return 8
+
+
+def generar_documento(rnd, palabras):
+    texto = " ".join(rnd.choice(PALABRAS_TEXTO) for _ in range(palabras))
+    errores = {
+        categoria: [
+            {
+                "fragmento_erroneo": " ".join(rnd.choice(PALABRAS_TEXTO) for _ in range(3)),
+                "correccion": " ".join(rnd.choice(PALABRAS_TEXTO) for _ in range(3)),
+                "explicacion": " ".join(rnd.choice(PALABRAS_TEXTO) for _ in range(18)),
+            }
+            for _ in range(max(1, palabras // 80))
+        ]
+        for categoria in ["Gramática", "Léxico", "Puntuación", "Estructura textual"]
+    }
+    analisis = {
+        componente: {
+            "puntuacion": rnd.randint(4, 9),
+            "comentario": " ".join(rnd.choice(PALABRAS_TEXTO) for _ in range(30)),
+            "sugerencias": [" ".join(rnd.choice(PALABRAS_TEXTO) for _ in range(12)) for _ in range(3)],
+        }
+        for componente in ["coherencia", "cohesion", "registro_linguistico", "adecuacion_cultural"]
+    }
+    return {
+        "uid": "usuario_benchmark",
+        "texto_original": texto,
+        "texto_corregido": texto,
+        "nivel": "B1",
+        "errores": {"gramatica": 3, "lexico": 2, "puntuacion": 1, "estructura textual": 0},
+        "puntuacion": 7.5,
+        "fecha": time.time(),
+        "resultado": {"errores": errores, "saludo": "¡Hola!", "tipo_texto": "Narración"},
+        "analisis_contextual": analisis,
+        "consejo_final": " ".join(rnd.choice(PALABRAS_TEXTO) for _ in range(40)),
+    }
+
+
+def cronometrar(funcion, documentos):
+    inicio = time.perf_counter()
+    resultados = [funcion(doc) for doc in documentos]
+    return resultados, (time.perf_counter() - inicio) / len(documentos) * 1e6
+
+
+def proyeccion(doc):
+    return {campo: doc[campo] for campo in HISTORY_LIST_FIELDS[FIREBASE_COLLECTION_CORRECTIONS] if campo in doc}
+
+
+def comparar_compresores(documentos):
+    """Ratio y tiempo de compresión de los campos voluminosos con distintos algoritmos."""
+    cargas = [
+        json.dumps({c: d[c] for c in correction_codec.CAMPOS_VOLUMINOSOS if c in d},
+                   ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        for d in documentos
+    ]
+    total = sum(len(c) for c in cargas)
+    compresores = {
+        "zlib-1": lambda b: zlib.compress(b, 1),
+        "zlib-6": lambda b: zlib.compress(b, 6),
+        "zlib-9": lambda b: zlib.compress(b, 9),
+        "bz2-9": lambda b: bz2.compress(b, 9),
+        "lzma": lambda b: lzma.compress(b),
+    }
+    print(f"  {'algoritmo':<10} {'ratio':>7} {'µs/doc':>9}")
+    for nombre, comprimir in compresores.items():
+        comprimidos, us = cronometrar(comprimir, cargas)
+        print(f"  {nombre:<10} {sum(len(c) for c in comprimidos) / total:>7.1%} {us:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documentos", type=int, default=200, help="Documentos por tamaño")
+    args = parser.parse_args()
+
+    rnd = random.Random(42)
+    print(f"Codificación de correcciones ({correction_codec.CODEC_ZLIB_JSON}, {args.documentos} documentos por tamaño)\n")
+    print(f"{'palabras':>8} {'original':>10} {'codificado':>11} {'ratio':>7} "
+          f"{'listado':>8} {'cod. µs':>9} {'dec. µs':>9}")
+
+    for palabras in LONGITUDES:
+        documentos = [generar_documento(rnd, palabras) for _ in range(args.documentos)]
+        codificados, us_codificar = cronometrar(encode_correction, documentos)
+        decodificados, us_decodificar = cronometrar(decode_correction, codificados)
+
+        for original, decodificado in zip(documentos, decodificados):
+            restaurado = {k: v for k, v in decodificado.items() if k not in ("palabras", "extracto")}
+            assert restaurado == original, "La decodificación no reproduce el documento original"
+
+        original = sum(tamano_firestore(d) for d in documentos) / len(documentos)
+        codificado = sum(tamano_firestore(d) for d in codificados) / len(codificados)
+        listado = sum(tamano_firestore(proyeccion(d)) for d in codificados) / len(codificados)
+        print(f"{palabras:>8} {original:>9.0f}B {codificado:>10.0f}B {codificado / original:>7.1%} "
+              f"{listado:>7.0f}B {us_codificar:>9.1f} {us_decodificar:>9.1f}")
+
+    print("\nCompresores de referencia (campos voluminosos, 800 palabras)")
+    comparar_compresores([generar_documento(rnd, 800) for _ in range(args.documentos)])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Benchmark de la reclasificación de errores.
+
+Compara la clasificación de core.json_extractor (alternancias precompiladas
+por categoría) con la implementación anterior (una búsqueda de subcadena por
+palabra clave y error) y comprueba que ambas asignan exactamente las mismas categorías.
+
+Uso:
+    python -m benchmarks.bench_error_classification [--errores N] [--repeticiones R]
+"""
+
+import argparse
+import random
+import re
+import time
+
+from core.json_extractor import INDICADORES_CATEGORIA, clasificar_error
+
+CATEGORIAS = list(INDICADORES_CATEGORIA.keys()) + ["", "Otra"]
+
+VOCABULARIO = [
+    "el", "la", "de", "en", "por", "para", "con", "sin", "a", "casa", "coma", "punto",
+    "verbo", "orden", "palabra", "mayor", "mínimo", "tiempo verbal", "género", "párrafo",
+    "cohesión", "falso amigo", "signo", "mayúscula", "acento", "tilde", "subjuntivo",
+    "estructura", "ordenación", "número", "plural", "significado", "conectores", "ayer",
+    "fui", "fue", "estoy", "soy", "¿", "?", ",", ".", "¡", "!", "Interrogación", "MAYÚSCULA",
+]
+
+
+def clasificar_error_anterior(error, cat_original):
+    """Implementación anterior, conservada como referencia."""
+    indicadores = INDICADORES_CATEGORIA
+    
+    fragmento = error.get("fragmento_erroneo", "").lower()
+    correccion = error.get("correccion", "").lower()
+    explicacion = error.get("explicacion", "").lower()
+    
+    texto_completo = f"{fragmento} {correccion} {explicacion}"
+    
+    nueva_categoria = None
+    max_score = 0
+    
+    for categoria, palabras_clave in indicadores.items():
+        score = sum(1 for palabra in palabras_clave if palabra.lower() in texto_completo)
+        if categoria == cat_original:
+            score += 0.5
+        if score > max_score:
+            max_score = score
+            nueva_categoria = categoria
+    
+    if nueva_categoria is None or max_score == 0:
+        nueva_categoria = cat_original if cat_original else "Gramática"
+    
+    if re.search(r'[.,;:!¡?¿]', fragmento) or re.search(r'[.,;:!¡?¿]', correccion):
+        puntuacion_pattern = r'(?:coma|punto|signo|interrogación|exclamación|mayúscula)'
+        if re.search(puntuacion_pattern, explicacion) or "may" in explicacion or "min" in explicacion:
+            nueva_categoria = "Puntuación"
+    
+    if len(fragmento.split()) >= 4 and len(correccion.split()) >= 4:
+        if abs(len(fragmento.split()) - len(correccion.split())) <= 1 and "orden" in explicacion:
+            nueva_categoria = "Estructura textual"
+    
+    if fragmento in correccion or correccion in fragmento:
+        if len(fragmento) - len(correccion) <= 3 and len(correccion) - len(fragmento) <= 3:
+            if not any(word in explicacion for word in indicadores["Gramática"]):
+                nueva_categoria = "Léxico"
+    if re.search(r'\b(a|de|en|por|para|con|sin)\b', fragmento) and re.search(r'\b(a|de|en|por|para|con|sin)\b', correccion):
+        if len(fragmento.split()) <= 3 and len(correccion.split()) <= 3:
+            nueva_categoria = "Gramática"
+    
+    return nueva_categoria
+
+
+def generar_corpus(n, semilla=42):
+    """Genera errores sintéticos que ejercitan todas las reglas de clasificación."""
+    rnd = random.Random(semilla)
+    
+    def frase(minimo, maximo):
+        # Sin separador en ocasiones, para forzar coincidencias en las fronteras
+        separador = rnd.choice([" ", " ", " ", ""])
+        return separador.join(rnd.choice(VOCABULARIO) for _ in range(rnd.randint(minimo, maximo)))
+    
+    corpus = []
+    for _ in range(n):
+        fragmento = frase(1, 6)
+        correccion = fragmento if rnd.random() < 0.2 else frase(1, 6)
+        error = {
+            "fragmento_erroneo": fragmento,
+            "correccion": correccion,
+            "explicacion": frase(3, 25),
+        }
+        corpus.append((error, rnd.choice(CATEGORIAS)))
+    return corpus
+
+
+def medir(funcion, corpus, repeticiones):
+    """Devuelve el mejor tiempo (s) de clasificar todo el corpus."""
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        for error, cat_original in corpus:
+            funcion(error, cat_original)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--errores", type=int, default=20000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+    
+    corpus = generar_corpus(args.errores)
+    
+    diferencias = [
+        (error, cat_original)
+        for error, cat_original in corpus
+        if clasificar_error(error, cat_original) != clasificar_error_anterior(error, cat_original)
+    ]
+    if diferencias:
+        raise SystemExit(f"{len(diferencias)} errores clasificados de forma distinta, p. ej.: {diferencias[0]}")
+    
+    anterior = medir(clasificar_error_anterior, corpus, args.repeticiones)
+    actual = medir(clasificar_error, corpus, args.repeticiones)
+    
+    print(f"Errores clasificados: {len(corpus)} (resultados idénticos)")
+    print(f"Implementación anterior: {anterior * 1e6 / len(corpus):8.2f} µs/error")
+    print(f"Implementación actual:   {actual * 1e6 / len(corpus):8.2f} µs/error")
+    print(f"Aceleración:             {anterior / actual:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Benchmark de la caché de figuras (core.figure_cache).
+
+Simula las recargas de Streamlit de la página de perfil: genera historiales
+sintéticos (como bench_analytics) y mide por tamaño el tiempo de los gráficos
+de errores y de actividad de features.perfil.generar_grafico_progreso:
+
+    - sin caché (la caché se vacía antes de cada llamada),
+    - con caché (misma entrada: huella de los datos y figura desde JSON),
+    - solo la huella de los datos de entrada.
+
+Uso:
+    python -m benchmarks.bench_figures [--tamanos 100 1000] [--repeticiones R]
+"""
+
+import argparse
+import logging
+
+from benchmarks.bench_analytics import generar_historial, medir
+from core.figure_cache import figure_cache, huella
+from features.perfil import generar_grafico_progreso
+
+TAMANOS = [100, 1000]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanos", type=int, nargs="+", default=TAMANOS,
+                        help="Número de correcciones del historial")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    print(f"Benchmark de la caché de figuras ({args.repeticiones} repeticiones, mediana)\n")
+
+    for tamano in args.tamanos:
+        correcciones, _, _ = generar_historial(tamano)
+        print(f"Historial con {tamano} correcciones")
+        print(f"  {'gráfico':<12} {'sin caché (ms)':>16} {'con caché (ms)':>16} {'huella (ms)':>14}")
+        for tipo in ("errores", "actividad"):
+            def sin_cache():
+                figure_cache.clear()
+                generar_grafico_progreso("bench", tipo, None, correcciones=correcciones)
+
+            def con_cache():
+                generar_grafico_progreso("bench", tipo, None, correcciones=correcciones)
+
+            fria = medir(sin_cache, args.repeticiones)
+            con_cache()
+            caliente = medir(con_cache, args.repeticiones)
+            solo_huella = medir(lambda: huella(("bench", tipo, None), [("correcciones", correcciones)]),
+                                args.repeticiones)
+            print(f"  {tipo:<12} {fria:>16.2f} {caliente:>16.2f} {solo_huella:>14.2f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark del mapa de calor de actividad (utils.analytics_engine.matriz_actividad).
+
+Genera fechas de actividad sintéticas y mide por tamaño el tiempo de:
+
+    - la agregación anterior de crear_mapa_calor_actividad (DataFrame,
+      day_name, groupby y pivot),
+    - matriz_actividad en las vistas semana, mes y año (una sola pasada
+      con bincount),
+    - matriz_actividad contando estudiantes distintos (vista del profesor),
+    - crear_mapa_calor_actividad completo, sin caché de figuras.
+
+Uso:
+    python -m benchmarks.bench_heatmap [--tamanos 1000 10000 100000] [--estudiantes 150] [--repeticiones R]
+"""
+
+import argparse
+import logging
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_analytics import medir
+from utils.analytics_engine import matriz_actividad
+from utils.visualization import crear_mapa_calor_actividad
+
+TAMANOS = [1000, 10000, 100000]
+
+def agregacion_anterior(datos):
+    """Agregación por día y hora tal como la hacía crear_mapa_calor_actividad."""
+    df = pd.DataFrame(datos)
+    df['fecha'] = pd.to_datetime(df['fecha'])
+    df['dia_semana'] = df['fecha'].dt.day_name()
+    df['hora'] = df['fecha'].dt.hour
+    conteo = df.groupby(['dia_semana', 'hora']).size().reset_index(name='count')
+    tabla = conteo.pivot(index='dia_semana', columns='hora', values='count')
+    orden = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+    return tabla.reindex(orden).fillna(0)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanos", type=int, nargs="+", default=TAMANOS,
+                        help="Número de actividades")
+    parser.add_argument("--estudiantes", type=int, default=150)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    rng = np.random.default_rng(7)
+    ahora = datetime.now()
+    print(f"Benchmark del mapa de calor de actividad ({args.repeticiones} repeticiones, mediana)\n")
+    print(f"  {'actividades':>11} {'operación':<36} {'ms':>10}")
+
+    for tamano in args.tamanos:
+        segundos = rng.integers(0, 400 * 86400, tamano)
+        fechas = (np.datetime64(ahora - timedelta(days=400), "s") + segundos).astype("datetime64[ns]")
+        usuarios = rng.integers(0, args.estudiantes, tamano)
+        datos = [{"fecha": fecha} for fecha in pd.to_datetime(fechas).to_pydatetime()]
+
+        operaciones = {
+            "agregación anterior (groupby)": lambda: agregacion_anterior(datos),
+            "matriz semana": lambda: matriz_actividad(fechas, "semana"),
+            "matriz mes": lambda: matriz_actividad(fechas, "mes", ahora=ahora),
+            "matriz año": lambda: matriz_actividad(fechas, "año", ahora=ahora),
+            "matriz semana (estudiantes)": lambda: matriz_actividad(fechas, "semana", usuarios=usuarios),
+            "figura completa (sin caché)": lambda: crear_mapa_calor_actividad.__wrapped__(datos),
+        }
+        for nombre, operacion in operaciones.items():
+            print(f"  {tamano:>11} {nombre:<36} {medir(operacion, args.repeticiones):>10.2f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
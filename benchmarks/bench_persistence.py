@@ -0,0 +1,224 @@
+"""
+Benchmark de la capa de persistencia (core.firebase_client).
+
+Siembra usuarios con historiales de distinto tamaño y mide, para cada tamaño,
+el tiempo y las lecturas/escrituras de Firestore por llamada de:
+
+    get_correcciones_usuario, save_correction_with_stats, get_error_statistics,
+    obtener_estadisticas_usuario (con el resumen de progreso ya creado y
+    reconstruyéndolo) y guardar_plan_estudio.
+
+Por defecto se ejecuta contra un Firestore en memoria (benchmarks.firestore_fake),
+sin red ni credenciales. Si FIRESTORE_EMULATOR_HOST está definido, se ejecuta
+contra el emulador local de Firestore; en ese caso solo se miden tiempos.
+
+La caché de perfiles se vacía antes de cada llamada para medir lecturas reales.
+El espejo local (core.offline_mirror) y la caché de historial se crean en un
+directorio temporal y se vacían antes de cada llamada, así que cada fila mide
+la lectura desde Firestore. Las operaciones que leen del espejo se miden
+además con el espejo ya cargado, en una fila aparte "(espejo)".
+
+Uso:
+    python -m benchmarks.bench_persistence [--tamanos 10 100 1000 10000] [--repeticiones R]
+"""
+
+import argparse
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from benchmarks.firestore_fake import FakeFirestore
+from config.settings import FIREBASE_COLLECTION_USERS, FIREBASE_COLLECTION_CORRECTIONS
+from core.profile_migrations import PROFILE_SCHEMA_VERSION
+from core.progress_rollup import ROLLUP_COLLECTION, ROLLUP_DOCUMENT, build_rollup
+
+TAMANOS = [10, 100, 1000, 10000]
+
+CATEGORIAS = ["gramatica", "lexico", "puntuacion", "estructura textual"]
+
+PALABRAS = "el la de en por para con casa tiempo escribir ayer siempre mañana texto idea".split()
+
+
+def crear_cliente():
+    """Devuelve (cliente, contadores): el emulador si está configurado, o el Firestore en memoria."""
+    if os.getenv("FIRESTORE_EMULATOR_HOST"):
+        from google.cloud import firestore as gcloud_firestore
+        proyecto = os.getenv("GCLOUD_PROJECT", "demo-benchmark")
+        return gcloud_firestore.Client(project=proyecto), None
+    db = FakeFirestore()
+    return db, db.contadores
+
+
+def generar_correccion(rnd, fecha):
+    texto = " ".join(rnd.choice(PALABRAS) for _ in range(rnd.randint(40, 250)))
+    return {
+        "texto_original": texto,
+        "texto_corregido": texto,
+        "nivel": rnd.choice(["A2", "B1", "B2"]),
+        "errores": {categoria: rnd.randint(0, 5) for categoria in CATEGORIAS},
+        "puntuacion": round(rnd.uniform(4, 9.5), 1),
+        "fecha": fecha,
+    }
+
+
+def sembrar_usuario(db, uid, n_correcciones, semilla=42):
+    """Crea el perfil, n correcciones, algunos simulacros, planes y el resumen de progreso."""
+    rnd = random.Random(semilla)
+    user_ref = db.collection(FIREBASE_COLLECTION_USERS).document(uid)
+    ahora = time.time()
+
+    correcciones = [
+        dict(generar_correccion(rnd, ahora - (n_correcciones - i) * 3600), uid=uid)
+        for i in range(n_correcciones)
+    ]
+    simulacros = [
+        {"uid": uid, "nivel": "B1", "calificacion": rnd.randint(40, 95),
+         "fecha": ahora - rnd.randint(0, n_correcciones) * 3600}
+        for _ in range(max(1, n_correcciones // 20))
+    ]
+
+    errores_totales = {categoria: sum(c["errores"][categoria] for c in correcciones) for categoria in CATEGORIAS}
+    perfil = {
+        "uid": uid, "email": f"{uid}@example.com", "nivel": "B1",
+        "numero_correcciones": n_correcciones, "errores_por_tipo": errores_totales,
+        "schema_version": PROFILE_SCHEMA_VERSION,
+    }
+
+    escrituras = [(user_ref, perfil)]
+    escrituras += [(user_ref.collection(FIREBASE_COLLECTION_CORRECTIONS).document(), c) for c in correcciones]
+    escrituras += [(user_ref.collection("simulacros").document(), s) for s in simulacros]
+    escrituras += [
+        (user_ref.collection("planes_estudio").document(),
+         {"uid": uid, "activo": i == 0, "fecha_creacion": ahora - i * 86400, "semanas": []})
+        for i in range(10)
+    ]
+    escrituras.append((
+        user_ref.collection(ROLLUP_COLLECTION).document(ROLLUP_DOCUMENT),
+        build_rollup(correcciones, simulacros, [])
+    ))
+
+    for inicio in range(0, len(escrituras), 500):
+        batch = db.batch()
+        for referencia, datos in escrituras[inicio:inicio + 500]:
+            batch.set(referencia, datos)
+        batch.commit()
+
+
+def borrar_resumen(db, uid):
+    db.collection(FIREBASE_COLLECTION_USERS).document(uid) \
+      .collection(ROLLUP_COLLECTION).document(ROLLUP_DOCUMENT).delete()
+
+
+def operaciones(db, uid):
+    """Operaciones a medir: nombre -> (preparación, llamada, si lee del espejo)."""
+    from core.firebase_client import (
+        get_correcciones_usuario, save_correction_with_stats, get_error_statistics, guardar_plan_estudio
+    )
+    from features.perfil import obtener_estadisticas_usuario
+
+    rnd = random.Random(7)
+    nada = lambda: None
+
+    def guardar_correccion():
+        c = generar_correccion(rnd, time.time())
+        return save_correction_with_stats(uid, c["texto_original"], c["texto_corregido"],
+                                          "B1", c["errores"], c["puntuacion"])
+
+    return {
+        "get_correcciones_usuario": (nada, lambda: get_correcciones_usuario(uid), True),
+        "save_correction_with_stats": (nada, guardar_correccion, False),
+        "get_error_statistics": (nada, lambda: get_error_statistics(uid), False),
+        "obtener_estadisticas_usuario": (nada, lambda: obtener_estadisticas_usuario(uid), False),
+        "obtener_estadisticas_usuario (reconstrucción)": (
+            lambda: borrar_resumen(db, uid), lambda: obtener_estadisticas_usuario(uid), False
+        ),
+        "guardar_plan_estudio": (nada, lambda: guardar_plan_estudio({"uid": uid, "semanas": []}), False),
+    }
+
+
+def vaciar_estado_local(uid):
+    """Espera a las cargas en segundo plano y vacía el espejo y la caché de historial del usuario."""
+    from core.history_cache import history_cache
+    from core.offline_mirror import offline_mirror
+
+    offline_mirror._queue.join()
+    history_cache._queue.join()
+    offline_mirror.invalidate(uid)
+    history_cache.invalidate(uid)
+
+
+def medir(db, contadores, uid, repeticiones):
+    """Ejecuta cada operación y devuelve sus tiempos y operaciones por llamada."""
+    from core.profile_cache import profile_cache
+
+    resultados = {}
+    for nombre, (preparar, llamada, usa_espejo) in operaciones(db, uid).items():
+        # Sin mezclar en la mediana lecturas de Firestore y del espejo
+        variantes = [(nombre, False)]
+        if usa_espejo:
+            variantes.append((f"{nombre} (espejo)", True))
+        for fila, con_espejo in variantes:
+            tiempos, lecturas, escrituras = [], [], []
+            for _ in range(repeticiones):
+                preparar()
+                vaciar_estado_local(uid)
+                if con_espejo:
+                    # Cargar el espejo con una llamada previa que no se mide
+                    llamada()
+                    preparar()
+                profile_cache.clear()
+                if contadores:
+                    contadores.reiniciar()
+                inicio = time.perf_counter()
+                llamada()
+                tiempos.append(time.perf_counter() - inicio)
+                if contadores:
+                    lecturas.append(contadores.lecturas)
+                    escrituras.append(contadores.escrituras)
+            resultados[fila] = {
+                "ms": statistics.median(tiempos) * 1000,
+                "lecturas": statistics.median(lecturas) if lecturas else None,
+                "escrituras": statistics.median(escrituras) if escrituras else None,
+            }
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanos", type=int, nargs="+", default=TAMANOS,
+                        help="Número de correcciones sembradas por usuario")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+
+    from core.firebase_client import firestore_registry
+    from core.history_cache import history_cache
+    from core.offline_mirror import offline_mirror
+
+    directorio = tempfile.mkdtemp()
+    offline_mirror.path = os.path.join(directorio, "espejo_benchmark.sqlite3")
+    history_cache.path = os.path.join(directorio, "cache_historial")
+    db, contadores = crear_cliente()
+    firestore_registry.use_client(db)
+    origen = "emulador" if contadores is None else "Firestore en memoria"
+    print(f"Benchmark de persistencia ({origen}, {args.repeticiones} repeticiones, mediana)\n")
+
+    def formato(valor):
+        return "-" if valor is None else f"{valor:g}"
+
+    for tamano in args.tamanos:
+        uid = f"bench_{tamano}_{int(time.time())}"
+        sembrar_usuario(db, uid, tamano)
+        print(f"Usuario con {tamano} correcciones")
+        print(f"  {'operación':<48} {'ms':>10} {'lecturas':>9} {'escrituras':>10}")
+        for nombre, r in medir(db, contadores, uid, args.repeticiones).items():
+            print(f"  {nombre:<48} {r['ms']:>10.2f} {formato(r['lecturas']):>9} {formato(r['escrituras']):>10}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,422 @@
+"""
+Firestore en memoria para los benchmarks de persistencia.
+
+Implementa el subconjunto del cliente de Firestore que usa core.firebase_client
+(documentos, subcolecciones, consultas con where/order_by/select/start_after/
+limit, transacciones, lotes y las transformaciones Increment/Maximum/Minimum)
+y cuenta las lecturas y escrituras como las factura Firestore: una lectura por
+documento devuelto (mínimo una por consulta) y una escritura por documento.
+
+No pretende reproducir la latencia de red, sino el número de operaciones y el
+coste de CPU de las funciones del cliente a medida que crece el historial.
+"""
+
+import bisect
+import copy
+import itertools
+import uuid
+
+from google.api_core.exceptions import AlreadyExists, FailedPrecondition, NotFound
+from google.cloud.firestore_v1 import transforms
+
+
+class Contadores:
+    """Lecturas y escrituras realizadas contra el Firestore en memoria."""
+
+    def __init__(self):
+        self.lecturas = 0
+        self.escrituras = 0
+
+    def reiniciar(self):
+        self.lecturas = 0
+        self.escrituras = 0
+
+    def instantanea(self):
+        return {"lecturas": self.lecturas, "escrituras": self.escrituras}
+
+
+def _clave_orden(valor):
+    """Orden de tipos de Firestore: null < bool < número < fecha < texto < resto."""
+    if valor is None:
+        return (0, 0)
+    if isinstance(valor, bool):
+        return (1, valor)
+    if isinstance(valor, (int, float)):
+        return (2, valor)
+    if hasattr(valor, "timestamp"):
+        return (3, valor.timestamp())
+    if isinstance(valor, str):
+        return (4, valor)
+    return (5, str(valor))
+
+
+_AUSENTE = object()
+
+
+def _leer_campo(datos, campo):
+    actual = datos
+    for parte in campo.split("."):
+        if not isinstance(actual, dict) or parte not in actual:
+            return _AUSENTE
+        actual = actual[parte]
+    return actual
+
+
+def _aplicar_valor(destino, clave, valor):
+    """Escribe un valor en destino[clave] resolviendo las transformaciones."""
+    actual = destino.get(clave)
+    if valor is transforms.DELETE_FIELD:
+        destino.pop(clave, None)
+    elif isinstance(valor, transforms.Increment):
+        destino[clave] = (actual if isinstance(actual, (int, float)) else 0) + valor.value
+    elif isinstance(valor, transforms.Maximum):
+        destino[clave] = valor.value if not isinstance(actual, (int, float)) else max(actual, valor.value)
+    elif isinstance(valor, transforms.Minimum):
+        destino[clave] = valor.value if not isinstance(actual, (int, float)) else min(actual, valor.value)
+    elif isinstance(valor, transforms.ArrayUnion):
+        lista = list(actual) if isinstance(actual, list) else []
+        lista.extend(v for v in valor.values if v not in lista)
+        destino[clave] = lista
+    elif isinstance(valor, transforms.ArrayRemove):
+        destino[clave] = [v for v in (actual or []) if v not in valor.values]
+    else:
+        destino[clave] = copy.deepcopy(valor)
+
+
+def _fusionar(destino, datos):
+    """Fusión recursiva de set(..., merge=True)."""
+    for clave, valor in datos.items():
+        if isinstance(valor, dict) and valor:
+            if not isinstance(destino.get(clave), dict):
+                destino[clave] = {}
+            _fusionar(destino[clave], valor)
+        else:
+            _aplicar_valor(destino, clave, valor)
+
+
+def _resolver(datos):
+    """Documento de set() sin merge: las transformaciones parten de cero."""
+    resultado = {}
+    _fusionar(resultado, datos)
+    return resultado
+
+
+class FakeSnapshot:
+    def __init__(self, referencia, datos, update_time, campos=None):
+        self.reference = referencia
+        self.id = referencia.id
+        self._datos = datos
+        self.update_time = update_time
+        self._campos = campos
+
+    @property
+    def exists(self):
+        return self._datos is not None
+
+    def to_dict(self):
+        if self._datos is None:
+            return None
+        if self._campos is None:
+            return copy.deepcopy(self._datos)
+        resultado = {}
+        for campo in self._campos:
+            valor = _leer_campo(self._datos, campo)
+            if valor is not _AUSENTE:
+                resultado[campo] = copy.deepcopy(valor)
+        return resultado
+
+    def get(self, campo):
+        valor = _leer_campo(self._datos or {}, campo)
+        if valor is _AUSENTE:
+            raise KeyError(campo)
+        return copy.deepcopy(valor)
+
+
+class FakeDocumentReference:
+    def __init__(self, db, ruta):
+        self._db = db
+        self._ruta = ruta
+        self.id = ruta[-1]
+
+    @property
+    def path(self):
+        return "/".join(self._ruta)
+
+    def collection(self, nombre):
+        return FakeCollectionReference(self._db, self._ruta + (nombre,))
+
+    def get(self, transaction=None, field_paths=None):
+        self._db.contadores.lecturas += 1
+        return self._db._snapshot(self, campos=field_paths)
+
+    def set(self, datos, merge=False, option=None):
+        self._db._escribir([("set", self, datos, merge, option)])
+
+    def update(self, datos, option=None):
+        self._db._escribir([("update", self, datos, False, option)])
+
+    def create(self, datos):
+        self._db._escribir([("create", self, datos, False, None)])
+
+    def delete(self, option=None):
+        self._db._escribir([("delete", self, None, False, option)])
+
+
+class FakeQuery:
+    def __init__(self, db, ruta, filtros=(), ordenes=(), limite=None, cursor=None, campos=None):
+        self._db = db
+        self._ruta = ruta
+        self._filtros = tuple(filtros)
+        self._ordenes = tuple(ordenes)
+        self._limite = limite
+        self._cursor = cursor
+        self._campos = campos
+
+    def _copia(self, **cambios):
+        valores = dict(filtros=self._filtros, ordenes=self._ordenes, limite=self._limite,
+                       cursor=self._cursor, campos=self._campos)
+        valores.update(cambios)
+        return FakeQuery(self._db, self._ruta, **valores)
+
+    def where(self, campo, operador, valor):
+        return self._copia(filtros=self._filtros + ((campo, operador, valor),))
+
+    def order_by(self, campo, direction="ASCENDING"):
+        return self._copia(ordenes=self._ordenes + ((campo, direction),))
+
+    def limit(self, limite):
+        return self._copia(limite=limite)
+
+    def select(self, campos):
+        return self._copia(campos=list(campos))
+
+    def start_after(self, cursor):
+        if isinstance(cursor, FakeSnapshot):
+            cursor = dict(cursor._datos, __name__=cursor.id)
+        return self._copia(cursor=cursor)
+
+    def _valor_orden(self, doc_id, datos, campo):
+        return doc_id if campo == "__name__" else _leer_campo(datos, campo)
+
+    def _cumple(self, datos):
+        for campo, operador, valor in self._filtros:
+            actual = _leer_campo(datos, campo)
+            if actual is _AUSENTE:
+                return False
+            if operador == "==" and actual != valor:
+                return False
+            if operador == "!=" and actual == valor:
+                return False
+            if operador in ("<", "<=", ">", ">=", "in", "array-contains"):
+                if operador == "in":
+                    if actual not in valor:
+                        return False
+                elif operador == "array-contains":
+                    if not isinstance(actual, list) or valor not in actual:
+                        return False
+                else:
+                    a, b = _clave_orden(actual), _clave_orden(valor)
+                    if not {"<": a < b, "<=": a <= b, ">": a > b, ">=": a >= b}[operador]:
+                        return False
+        return True
+
+    def _clave(self, doc_id, datos):
+        if not self._ordenes:
+            return (doc_id,)
+        clave = []
+        for campo, direccion in self._ordenes:
+            tipo, valor = _clave_orden(self._valor_orden(doc_id, datos, campo))
+            if direccion == "DESCENDING":
+                # Invertir el orden sin depender del tipo del valor
+                clave.append(_Inverso((tipo, valor)))
+            else:
+                clave.append((tipo, valor))
+        return tuple(clave)
+
+    def _documentos(self):
+        # Candidatos ordenados, reutilizados entre páginas mientras la colección no cambie
+        clave_cache = (self._ruta, self._filtros, self._ordenes)
+        version = self._db._versiones_coleccion.get(self._ruta, 0)
+        en_cache = self._db._orden_cache.get(clave_cache)
+        if en_cache is None or en_cache[0] != version:
+            candidatos = []
+            for doc_id, datos in self._db._hijos(self._ruta):
+                if not self._cumple(datos):
+                    continue
+                # Firestore excluye los documentos sin el campo de ordenación
+                if any(campo != "__name__" and _leer_campo(datos, campo) is _AUSENTE for campo, _ in self._ordenes):
+                    continue
+                candidatos.append((self._clave(doc_id, datos), doc_id, datos))
+            candidatos.sort(key=lambda item: item[0])
+            en_cache = (version, [item[0] for item in candidatos], [item[1:] for item in candidatos])
+            self._db._orden_cache[clave_cache] = en_cache
+
+        _, claves, candidatos = en_cache
+        inicio = 0
+        if self._cursor is not None:
+            inicio = bisect.bisect_right(claves, self._clave(self._cursor.get("__name__"), self._cursor))
+        fin = len(candidatos) if self._limite is None else inicio + self._limite
+        return candidatos[inicio:fin]
+
+    def stream(self, transaction=None):
+        documentos = self._documentos()
+        self._db.contadores.lecturas += max(1, len(documentos))
+        for doc_id, _ in documentos:
+            referencia = FakeDocumentReference(self._db, self._ruta + (doc_id,))
+            yield self._db._snapshot(referencia, campos=self._campos)
+
+    def get(self, transaction=None):
+        return list(self.stream(transaction=transaction))
+
+
+class _Inverso:
+    """Envoltorio que invierte la comparación (orden descendente)."""
+    __slots__ = ("valor",)
+
+    def __init__(self, valor):
+        self.valor = valor
+
+    def __lt__(self, otro):
+        return self.valor > otro.valor
+
+    def __gt__(self, otro):
+        return self.valor < otro.valor
+
+    def __eq__(self, otro):
+        return self.valor == otro.valor
+
+    def __le__(self, otro):
+        return self.valor >= otro.valor
+
+    def __ge__(self, otro):
+        return self.valor <= otro.valor
+
+
+class FakeCollectionReference(FakeQuery):
+    def __init__(self, db, ruta):
+        super().__init__(db, ruta)
+        self.id = ruta[-1]
+
+    def document(self, doc_id=None):
+        return FakeDocumentReference(self._db, self._ruta + (doc_id or uuid.uuid4().hex[:20],))
+
+    def add(self, datos):
+        referencia = self.document()
+        referencia.set(datos)
+        return None, referencia
+
+
+class FakeWriteBatch:
+    def __init__(self, db):
+        self._db = db
+        self._operaciones = []
+
+    def set(self, referencia, datos, merge=False):
+        self._operaciones.append(("set", referencia, datos, merge, None))
+
+    def update(self, referencia, datos, option=None):
+        self._operaciones.append(("update", referencia, datos, False, option))
+
+    def create(self, referencia, datos):
+        self._operaciones.append(("create", referencia, datos, False, None))
+
+    def delete(self, referencia, option=None):
+        self._operaciones.append(("delete", referencia, None, False, option))
+
+    def commit(self):
+        operaciones, self._operaciones = self._operaciones, []
+        self._db._escribir(operaciones)
+        return []
+
+
+class FakeTransaction(FakeWriteBatch):
+    """Transacción compatible con firestore.transactional (sin concurrencia real)."""
+
+    _read_only = False
+    _max_attempts = 5
+
+    def __init__(self, db):
+        super().__init__(db)
+        self._id = None
+
+    def _clean_up(self):
+        self._operaciones = []
+        self._id = None
+
+    def _begin(self, retry_id=None):
+        self._id = uuid.uuid4().bytes
+
+    def _commit(self):
+        self.commit()
+        self._id = None
+
+    def _rollback(self):
+        self._clean_up()
+
+
+class FakeFirestore:
+    """Cliente de Firestore en memoria con contadores de operaciones."""
+
+    def __init__(self):
+        self._documentos = {}  # ruta -> (datos, update_time)
+        self._indice = {}  # ruta de colección -> conjunto de ids
+        self._versiones = itertools.count(1)
+        self._versiones_coleccion = {}  # ruta de colección -> número de escrituras
+        self._orden_cache = {}
+        self.contadores = Contadores()
+
+    def collection(self, nombre):
+        return FakeCollectionReference(self, (nombre,))
+
+    def batch(self):
+        return FakeWriteBatch(self)
+
+    def transaction(self, **kwargs):
+        return FakeTransaction(self)
+
+    def _snapshot(self, referencia, campos=None):
+        datos, update_time = self._documentos.get(referencia._ruta, (None, None))
+        return FakeSnapshot(referencia, datos, update_time, campos)
+
+    def _hijos(self, ruta_coleccion):
+        for doc_id in self._indice.get(ruta_coleccion, ()):
+            yield doc_id, self._documentos[ruta_coleccion + (doc_id,)][0]
+
+    def _escribir(self, operaciones):
+        """Aplica las operaciones de forma atómica: se validan todas antes de escribir."""
+        for tipo, referencia, _, _, option in operaciones:
+            existente = self._documentos.get(referencia._ruta)
+            if tipo == "create" and existente is not None:
+                raise AlreadyExists(f"Documento ya existe: {referencia.path}")
+            if tipo == "update" and existente is None:
+                raise NotFound(f"Documento no encontrado: {referencia.path}")
+            esperado = getattr(option, "_last_update_time", None)
+            if esperado is not None and (existente is None or existente[1] != esperado):
+                raise FailedPrecondition(f"Documento modificado: {referencia.path}")
+
+        for tipo, referencia, datos, merge, _ in operaciones:
+            ruta = referencia._ruta
+            self.contadores.escrituras += 1
+            self._versiones_coleccion[ruta[:-1]] = self._versiones_coleccion.get(ruta[:-1], 0) + 1
+            if tipo == "delete":
+                if self._documentos.pop(ruta, None) is not None:
+                    self._indice[ruta[:-1]].discard(ruta[-1])
+                continue
+
+            if tipo == "update":
+                actual = copy.deepcopy(self._documentos[ruta][0])
+                for campo, valor in datos.items():
+                    *padres, hoja = campo.split(".")
+                    destino = actual
+                    for padre in padres:
+                        destino = destino.setdefault(padre, {})
+                    _aplicar_valor(destino, hoja, valor)
+                nuevo = actual
+            elif merge and ruta in self._documentos:
+                nuevo = copy.deepcopy(self._documentos[ruta][0])
+                _fusionar(nuevo, datos)
+            else:
+                nuevo = _resolver(datos)
+
+            self._documentos[ruta] = (nuevo, next(self._versiones))
+            self._indice.setdefault(ruta[:-1], set()).add(ruta[-1])
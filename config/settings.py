@@ -140,6 +140,54 @@ FIREBASE_COLLECTION_CORRECTIONS = "correcciones"
 FIREBASE_COLLECTION_EXERCISES = "ejercicios"
 FIREBASE_COLLECTION_SIMULATIONS = "simulacros"
 
+# Caché de perfiles de usuario
+PROFILE_CACHE_TTL = 30  # Segundos que un perfil leído se considera válido
+PROFILE_CACHE_MAX_ENTRIES = 1000  # Número máximo de perfiles en memoria
+
+# Buffer de métricas de modelos
+METRICS_BATCH_SIZE = 50  # Métricas por escritura en lote
+METRICS_FLUSH_INTERVAL = 10  # Segundos máximos antes de vaciar el buffer
+METRICS_QUEUE_MAX = 5000  # Métricas máximas en memoria antes de descartar
+
+# Consultas concurrentes del panel de progreso
+DASHBOARD_FETCH_TIMEOUT = 8  # Segundos máximos de espera por consulta
+DASHBOARD_FETCH_WORKERS = 8  # Hilos compartidos para las consultas
+
+# Compresión de los campos voluminosos de las correcciones
+CORRECTION_COMPRESSION = True
+CORRECTION_COMPRESSION_MIN_BYTES = 1024  # Tamaño mínimo (JSON) para comprimir
+
+# Fragmentos de los contadores de correcciones de cada usuario
+COUNTER_SHARDS = 10
+
+# Directorio del estado local del proceso (diario, espejo y caché del historial)
+LOCAL_STATE_DIR = os.getenv("LOCAL_STATE_DIR", "datos")
+
+# Diario local de correcciones pendientes de guardar en Firestore (un fichero por proceso)
+CORRECTION_JOURNAL_DIR = os.getenv("CORRECTION_JOURNAL_DIR", os.path.join(LOCAL_STATE_DIR, "diario_correcciones"))
+CORRECTION_JOURNAL_MAX_ATTEMPTS = 5  # Intentos fallidos antes de apartar una corrección
+
+# Tokens de Firebase Auth (el ID token caduca a la hora)
+TOKEN_REFRESH_MARGIN = 300  # Segundos antes de la caducidad en que se renueva
+TOKEN_REFRESH_TIMEOUT = 10  # Segundos máximos de la petición de renovación
+
+# Espejo local (SQLite) del historial de los usuarios
+OFFLINE_MIRROR_PATH = os.getenv("OFFLINE_MIRROR_PATH", os.path.join(LOCAL_STATE_DIR, "espejo_local.sqlite3"))
+OFFLINE_MIRROR_REFRESH = 300  # Segundos antes de reconciliar una colección con Firestore
+
+# Caché columnar (ficheros por columna) del historial para las analíticas
+HISTORY_CACHE_PATH = os.getenv("HISTORY_CACHE_PATH", os.path.join(LOCAL_STATE_DIR, "cache_historial"))
+HISTORY_CACHE_REFRESH = 300  # Segundos antes de reconstruir la caché de un usuario
+
+# Analíticas de grupo (informe de la clase para el profesor)
+COHORT_FETCH_TIMEOUT = 60  # Segundos máximos para reunir los historiales de la clase
+COHORT_FETCH_WORKERS = 4  # Hilos propios para los historiales (no ocupan los del panel)
+COHORT_OUTLIER_THRESHOLD = 3.5  # Puntuación z robusta a partir de la que un estudiante es atípico
+
+# Caché de figuras de Plotly (serializadas a JSON)
+FIGURE_CACHE_TTL = 600  # Segundos que una figura se considera válida
+FIGURE_CACHE_MAX_BYTES = 64 * 1024 * 1024  # Tamaño máximo del JSON almacenado
+
 # Configuración de logging
 LOG_LEVEL = "INFO"
 LOG_FILE = "textocorrector_ele.log"
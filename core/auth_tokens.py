@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tokens de autenticación de Firebase
+-----------------------------------
+Guarda en la sesión el ID token, el refresh token y la caducidad devueltos por
+el inicio de sesión REST de Firebase y los renueva antes de que caduquen.
+
+El ID token de Firebase dura una hora. get_valid_token() devuelve el token
+vigente y, si le quedan menos de TOKEN_REFRESH_MARGIN segundos, lo renueva con
+el endpoint securetoken. Las renovaciones simultáneas del mismo refresh token
+(varios hilos o pestañas de la misma sesión) comparten una única petición.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import Future
+
+import requests
+
+from config.settings import TOKEN_REFRESH_MARGIN, TOKEN_REFRESH_TIMEOUT
+from core.circuit_breaker import circuit_breaker
+from core.session_manager import get_session_var, set_session_var
+
+logger = logging.getLogger(__name__)
+
+# Clave de la sesión donde se guardan los tokens
+SESSION_KEY = "auth_tokens"
+
+# Marca de sesión caducada (Firebase rechazó el refresh token)
+SESSION_EXPIRED_KEY = "auth_sesion_caducada"
+
+REFRESH_URL = "https://securetoken.googleapis.com/v1/token?key={api_key}"
+
+# Errores de renovación que invalidan la sesión (hay que volver a iniciar sesión)
+ERRORES_DEFINITIVOS = {
+    "TOKEN_EXPIRED", "INVALID_REFRESH_TOKEN", "USER_DISABLED", "USER_NOT_FOUND", "INVALID_GRANT_TYPE"
+}
+
+class TokenRefreshError(Exception):
+    """Error al renovar el ID token. definitivo=True si la sesión ya no es válida."""
+
+    def __init__(self, mensaje, definitivo=False):
+        super().__init__(mensaje)
+        self.definitivo = definitivo
+
+class TokenManager:
+    """
+    Gestor de los tokens de Firebase de cada sesión. Los tokens viven en la
+    sesión de Streamlit; la instancia solo coordina las renovaciones en curso,
+    compartidas por todas las sesiones del proceso.
+    """
+
+    def __init__(self, margin=TOKEN_REFRESH_MARGIN, timeout=TOKEN_REFRESH_TIMEOUT):
+        """
+        Inicializa el gestor.
+
+        Args:
+            margin (float): Segundos antes de la caducidad en que se renueva el token
+            timeout (float): Segundos máximos de la petición de renovación
+        """
+        self.margin = margin
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._en_curso = {}  # refresh_token -> Future con la respuesta de la renovación
+        self.refreshes = 0
+        self.coalesced = 0
+
+    def store(self, respuesta):
+        """
+        Guarda en la sesión los tokens de una respuesta de Firebase Auth
+        (signInWithPassword, signUp o securetoken).
+
+        Args:
+            respuesta (dict): Respuesta JSON de Firebase
+
+        Returns:
+            str: ID token guardado, o None si la respuesta no trae tokens
+        """
+        # Los endpoints de identitytoolkit y securetoken usan nombres distintos
+        id_token = respuesta.get("idToken") or respuesta.get("id_token")
+        refresh_token = respuesta.get("refreshToken") or respuesta.get("refresh_token")
+        if not id_token or not refresh_token:
+            return None
+
+        try:
+            expira_en = int(respuesta.get("expiresIn") or respuesta.get("expires_in") or 3600)
+        except (TypeError, ValueError):
+            expira_en = 3600
+
+        set_session_var(SESSION_KEY, {
+            "id_token": id_token,
+            "refresh_token": refresh_token,
+            "uid": respuesta.get("localId") or respuesta.get("user_id"),
+            "expires_at": time.time() + expira_en,
+        })
+        set_session_var(SESSION_EXPIRED_KEY, False)
+        return id_token
+
+    def clear(self):
+        """Elimina los tokens de la sesión."""
+        set_session_var(SESSION_KEY, None)
+
+    def session_expired(self):
+        """bool: True si Firebase rechazó la renovación y hay que volver a iniciar sesión."""
+        return bool(get_session_var(SESSION_EXPIRED_KEY, False))
+
+    def get_valid_token(self, force_refresh=False):
+        """
+        Devuelve un ID token vigente para la sesión actual, renovándolo si está
+        a punto de caducar.
+
+        Args:
+            force_refresh (bool): Renovar aunque el token siga vigente
+                (por ejemplo, tras un 401 del servicio)
+
+        Returns:
+            str: ID token, o None si no hay sesión autenticada o no se pudo renovar
+        """
+        tokens = get_session_var(SESSION_KEY)
+        if not tokens:
+            return None
+
+        restante = tokens["expires_at"] - time.time()
+        if restante > self.margin and not force_refresh:
+            return tokens["id_token"]
+
+        try:
+            respuesta = self._refresh(tokens["refresh_token"])
+        except TokenRefreshError as e:
+            if e.definitivo:
+                logger.warning(f"Sesión de Firebase caducada: {e}")
+                self.clear()
+                set_session_var(SESSION_EXPIRED_KEY, True)
+                return None
+            # Fallo transitorio: el token actual sirve mientras no haya caducado
+            logger.error(f"Error renovando el token de Firebase: {e}")
+            return tokens["id_token"] if restante > 0 else None
+
+        # Conservar el uid si la respuesta no lo trae
+        respuesta.setdefault("user_id", tokens.get("uid"))
+        return self.store(respuesta)
+
+    def _refresh(self, refresh_token):
+        """
+        Renueva el ID token. Si ya hay una renovación en curso del mismo refresh
+        token, espera su resultado en lugar de lanzar otra petición.
+
+        Args:
+            refresh_token (str): Refresh token de la sesión
+
+        Returns:
+            dict: Respuesta de securetoken (id_token, refresh_token, expires_in, user_id)
+
+        Raises:
+            TokenRefreshError: Si la renovación falla
+        """
+        with self._lock:
+            futuro = self._en_curso.get(refresh_token)
+            propietario = futuro is None
+            if propietario:
+                futuro = Future()
+                self._en_curso[refresh_token] = futuro
+                self.refreshes += 1
+            else:
+                self.coalesced += 1
+
+        if not propietario:
+            try:
+                return dict(futuro.result(timeout=self.timeout + 1))
+            except TokenRefreshError:
+                raise
+            except Exception as e:
+                raise TokenRefreshError(f"Renovación compartida sin respuesta: {e}")
+
+        try:
+            respuesta = self._solicitar_renovacion(refresh_token)
+            futuro.set_result(respuesta)
+            return dict(respuesta)
+        except Exception as e:
+            futuro.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._en_curso.pop(refresh_token, None)
+
+    def _solicitar_renovacion(self, refresh_token):
+        """Petición HTTP al endpoint securetoken de Firebase."""
+        if not circuit_breaker.can_execute("firebase_auth"):
+            raise TokenRefreshError("Servicio de autenticación temporalmente no disponible")
+
+        # Importar dinámicamente para evitar dependencias circulares
+        from core.firebase_client import get_firebase_web_api_key
+
+        api_key = get_firebase_web_api_key()
+        if not api_key:
+            raise TokenRefreshError("Firebase Web API Key no configurada")
+
+        try:
+            response = requests.post(
+                REFRESH_URL.format(api_key=api_key),
+                data={"grant_type": "refresh_token", "refresh_token": refresh_token},
+                timeout=self.timeout
+            )
+        except requests.RequestException as e:
+            circuit_breaker.record_failure("firebase_auth", error_type="refresh")
+            raise TokenRefreshError(f"Error de comunicación con Firebase: {e}")
+
+        if response.status_code == 200:
+            circuit_breaker.record_success("firebase_auth")
+            return response.json()
+
+        try:
+            mensaje = response.json().get("error", {}).get("message", "")
+        except ValueError:
+            mensaje = ""
+        codigo = mensaje.split(":")[0].strip()
+        if codigo in ERRORES_DEFINITIVOS:
+            raise TokenRefreshError(codigo, definitivo=True)
+
+        circuit_breaker.record_failure("firebase_auth", error_type=codigo or "refresh")
+        raise TokenRefreshError(f"Código {response.status_code}: {mensaje or response.text[:100]}")
+
+# Instancia global compartida por todas las sesiones
+token_manager = TokenManager()
+
+def get_valid_token(force_refresh=False):
+    """
+    Devuelve un ID token de Firebase vigente para la sesión actual.
+
+    Args:
+        force_refresh (bool): Renovar aunque el token siga vigente
+
+    Returns:
+        str: ID token, o None si no hay sesión autenticada
+    """
+    return token_manager.get_valid_token(force_refresh=force_refresh)
+
+def auth_headers():
+    """
+    Cabeceras de autorización para las llamadas REST autenticadas a Firebase.
+
+    Returns:
+        dict: {"Authorization": "Bearer <ID token>"}, o vacío si no hay sesión
+    """
+    token = get_valid_token()
+    return {"Authorization": f"Bearer {token}"} if token else {}
@@ -21,6 +21,7 @@ import importlib
 # Importar dependencias del proyecto
 from config.settings import MAX_RETRIES, DEFAULT_TIMEOUT
 from core.circuit_breaker import circuit_breaker
+from core.json_extractor import extract_json_safely
 
 # Configurar logger
 logger = logging.getLogger(__name__)
@@ -31,205 +32,6 @@ MESSAGES_API_TIMEOUT = 60      # Timeout para obtener mensajes
 RUN_API_TIMEOUT = 60           # Timeout para ejecutar asistentes
 POLLING_API_TIMEOUT = 30       # Timeout para polling de estado
 
-def extract_json_safely(content):
-    """
-    Extrae JSON válido de una cadena de texto con manejo de errores mejorado y reparación.
-    Versión optimizada y robusta para manejar respuestas del asistente.
-    
-    Args:
-        content (str): Contenido que puede incluir JSON
-        
-    Returns:
-        dict: Diccionario con el JSON extraído o diccionario vacío si no se encuentra
-    """
-    if not content:
-        logger.warning("Contenido vacío, no se puede extraer JSON")
-        return {}
-    
-    # Guardar las primeras 100 caracteres para diagnóstico
-    preview = content[:100].replace('\n', ' ') + "..." if len(content) > 100 else content
-    logger.info(f"Intentando extraer JSON del contenido. Vista previa: {preview}")
-    
-    try:
-        # 1. Primero intentar parsear directamente todo el contenido
-        try:
-            result = json.loads(content)
-            logger.info("✅ Éxito: JSON extraído directamente del contenido completo")
-            return result
-        except json.JSONDecodeError as e:
-            logger.debug(f"No se pudo parsear directamente como JSON: {str(e)}")
-            # Mostrar detalles del error para diagnóstico
-            error_position = e.pos
-            error_line, error_column = 0, 0
-            lines = content[:error_position].splitlines()
-            if lines:
-                error_line = len(lines)
-                error_column = len(lines[-1]) + 1
-            context_start = max(0, error_position - 20)
-            context_end = min(len(content), error_position + 20)
-            error_context = content[context_start:context_end]
-            logger.debug(f"Error JSON en línea {error_line}, columna {error_column}: '{error_context}'")
-        
-        # 2. Buscar bloques de código JSON con formato markdown
-        import re
-        
-        # 2.1 Buscar bloques de código con etiqueta json explícita
-        json_code_blocks = re.findall(r'```json\s*([\s\S]*?)```', content)
-        if json_code_blocks:
-            logger.info(f"Encontrados {len(json_code_blocks)} bloques de código JSON explícitos")
-            for i, block in enumerate(json_code_blocks):
-                try:
-                    result = json.loads(block.strip())
-                    logger.info(f"✅ Éxito: JSON extraído del bloque de código JSON explícito #{i+1}")
-                    return result
-                except json.JSONDecodeError as e:
-                    logger.debug(f"Bloque JSON explícito #{i+1} no es JSON válido: {str(e)}")
-        
-        # 2.2 Buscar bloques de código genéricos que podrían contener JSON
-        generic_code_blocks = re.findall(r'```\s*([\s\S]*?)```', content)
-        if generic_code_blocks:
-            logger.info(f"Encontrados {len(generic_code_blocks)} bloques de código genéricos")
-            for i, block in enumerate(generic_code_blocks):
-                try:
-                    # Verificar si el bloque empieza con '{'
-                    if block.strip().startswith('{'):
-                        result = json.loads(block.strip())
-                        logger.info(f"✅ Éxito: JSON extraído del bloque de código genérico #{i+1}")
-                        return result
-                except json.JSONDecodeError as e:
-                    logger.debug(f"Bloque genérico #{i+1} no es JSON válido: {str(e)}")
-        
-        # 3. Buscar cualquier estructura con forma de JSON en el texto
-        # Es importante encontrar el JSON completo, desde el primer { hasta el último }
-        # que forme un objeto JSON válido completo
-        
-        # 3.1 Buscar desde el primer { hasta el último }
-        first_brace = content.find('{')
-        last_brace = content.rfind('}')
-        
-        if first_brace >= 0 and last_brace > first_brace:
-            potential_json = content[first_brace:last_brace+1]
-            logger.debug(f"Encontrada posible estructura JSON desde posición {first_brace} hasta {last_brace}")
-            
-            try:
-                result = json.loads(potential_json)
-                logger.info(f"✅ Éxito: JSON extraído desde '{{{' hasta último '}}}'")
-                return result
-            except json.JSONDecodeError as e:
-                logger.debug(f"La estructura encontrada no es JSON válido: {str(e)}")
-        
-        # 4. Extraer todas las estructuras que parecen JSON y probar cada una
-        all_json_like = re.findall(r'({[^{]*})', content)
-        if all_json_like:
-            logger.info(f"Encontrados {len(all_json_like)} fragmentos potenciales de JSON")
-            
-            # Ordenar por longitud (preferir fragmentos más largos primero)
-            all_json_like.sort(key=len, reverse=True)
-            
-            for i, json_fragment in enumerate(all_json_like):
-                try:
-                    result = json.loads(json_fragment)
-                    logger.info(f"✅ Éxito: JSON extraído de fragmento potencial #{i+1}")
-                    return result
-                except json.JSONDecodeError:
-                    pass
-        
-        # 5. Buscar estructuras que tengan las clave esperadas para una corrección
-        expected_keys = ["errores", "texto_corregido", "saludo", "tipo_texto", "analisis_contextual", "consejo_final"]
-        
-        # Contar cuántas claves esperadas aparecen en el contenido
-        keys_present = [key for key in expected_keys if f'"{key}"' in content or f"'{key}'" in content]
-        
-        if len(keys_present) >= 3:  # Si al menos 3 claves están presentes, podría ser una corrección
-            logger.info(f"Encontradas {len(keys_present)} claves esperadas en el contenido: {', '.join(keys_present)}")
-            
-            # 5.1 Intentar una reparación agresiva
-            # Extraer el contenido entre el primer { y el último }
-            if first_brace >= 0 and last_brace > first_brace:
-                potential_json = content[first_brace:last_brace+1]
-                
-                # Limpiar caracteres problemáticos
-                cleaned_json = re.sub(r'[\x00-\x1F\x7F-\x9F]', '', potential_json)
-                
-                # Normalizar comillas
-                # Reemplazar " por " si hay un desequilibrio
-                quote_count = cleaned_json.count('"')
-                if quote_count % 2 != 0:
-                    logger.info("Detectado número impar de comillas, intentando normalizar")
-                    cleaned_json = cleaned_json.replace('"', '"')
-                
-                # Intentar parsear el JSON limpio
-                try:
-                    result = json.loads(cleaned_json)
-                    logger.info("✅ Éxito: JSON extraído después de limpieza extensiva")
-                    return result
-                except json.JSONDecodeError:
-                    logger.debug("La limpieza extensiva no fue suficiente")
-            
-            # 5.2 Si todo falla, crear manualmente un JSON con estructura mínima
-            logger.warning("No se pudo extraer JSON válido. Creando estructura mínima.")
-            
-            # Intenta extraer el texto corregido
-            texto_corregido_match = re.search(r'"texto_corregido"\s*:\s*"([^"]*)"', content)
-            texto_corregido = texto_corregido_match.group(1) if texto_corregido_match else ""
-            
-            # Intenta extraer el consejo final
-            consejo_final_match = re.search(r'"consejo_final"\s*:\s*"([^"]*)"', content)
-            consejo_final = consejo_final_match.group(1) if consejo_final_match else ""
-            
-            # Crear estructura mínima
-            minimal_json = {
-                "texto_corregido": texto_corregido or content,
-                "errores": {
-                    "Gramática": [],
-                    "Léxico": [],
-                    "Puntuación": [],
-                    "Estructura textual": []
-                },
-                "consejo_final": consejo_final or "No se pudo extraer el consejo final."
-            }
-            
-            logger.info("✅ Creada estructura JSON mínima como fallback")
-            return minimal_json
-        
-        # Si llegamos aquí, no hay JSON válido
-        logger.warning("❌ No se pudo extraer JSON válido del contenido después de múltiples intentos")
-        
-        # Mostrar fragmentos del contenido para diagnóstico
-        if len(content) > 500:
-            logger.debug(f"Primeros 250 caracteres del contenido: {content[:250]}")
-            logger.debug(f"Últimos 250 caracteres del contenido: {content[-250:]}")
-        else:
-            logger.debug(f"Contenido completo: {content}")
-        
-        # Proporcionar un objeto de respuesta mínimo que evite errores posteriores
-        return {
-            "texto_corregido": "No se pudo procesar la respuesta correctamente.",
-            "errores": {
-                "Gramática": [],
-                "Léxico": [],
-                "Puntuación": [],
-                "Estructura textual": []
-            },
-            "consejo_final": "Hubo un problema al procesar la respuesta. Por favor, intenta nuevamente."
-        }
-        
-    except Exception as e:
-        logger.error(f"❌ Error inesperado extrayendo JSON del contenido: {str(e)}")
-        logger.error(traceback.format_exc())
-        
-        # Proporcionar un objeto de respuesta mínimo que evite errores posteriores
-        return {
-            "texto_corregido": "Error interno procesando la respuesta.",
-            "errores": {
-                "Gramática": [],
-                "Léxico": [],
-                "Puntuación": [],
-                "Estructura textual": []
-            },
-            "consejo_final": "Ocurrió un error interno. Por favor, intenta nuevamente."
-        }
-
 def guardar_metricas_modelo(modelo, tiempo_respuesta, longitud_texto, resultado_exitoso):
     """
     Guarda métricas de uso de modelos.
@@ -415,6 +217,47 @@ class CleanOpenAIAssistants:
                     logger.error(f"Status: {e.response.status_code}, Contenido: {e.response.content}")
             return {"error": str(e), "error_type": "request"}
     
+    def _api_stream(self, endpoint, data=None, timeout=RUN_API_TIMEOUT):
+        """
+        Realiza una petición POST en modo streaming (Server-Sent Events).
+        
+        Args:
+            endpoint: Endpoint de la API (sin el prefijo /v1)
+            data: Datos para enviar en el cuerpo
+            timeout: Timeout en segundos entre eventos
+            
+        Yields:
+            tuple: (nombre_evento, datos) por cada evento recibido
+        """
+        url = f"{self.BASE_URL}{endpoint}"
+        payload = dict(data or {})
+        payload["stream"] = True
+        
+        try:
+            with requests.post(url, headers=self.headers, json=payload, timeout=timeout, stream=True) as response:
+                response.raise_for_status()
+                # text/event-stream no declara charset; forzar UTF-8 para los acentos
+                response.encoding = "utf-8"
+                
+                evento = None
+                for linea in response.iter_lines(decode_unicode=True):
+                    if not linea:
+                        continue
+                    if linea.startswith("event:"):
+                        evento = linea[len("event:"):].strip()
+                    elif linea.startswith("data:"):
+                        contenido = linea[len("data:"):].strip()
+                        if contenido == "[DONE]":
+                            return
+                        try:
+                            yield evento, json.loads(contenido)
+                        except json.JSONDecodeError:
+                            logger.debug(f"Evento SSE no parseable ({evento}): {contenido[:100]}")
+                            
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error en petición streaming a {url}: {e}")
+            yield "error", {"error": str(e), "error_type": "request"}
+    
     def list_assistants(self, limit=20):
         """
         Lista los asistentes disponibles.
@@ -629,6 +472,39 @@ Por favor, adapta tus respuestas según este perfil actualizado.
         data = {"assistant_id": assistant_id}
         return self._api_request("POST", f"/threads/{thread_id}/runs", data=data, timeout=RUN_API_TIMEOUT)
     
+    def stream_run(self, thread_id, assistant_id, **options):
+        """
+        Ejecuta un asistente en un thread recibiendo los eventos en streaming.
+        
+        Args:
+            thread_id: ID del thread
+            assistant_id: ID del asistente
+            **options: Parámetros adicionales de la ejecución (tools, response_format...)
+            
+        Returns:
+            generator: Eventos (nombre_evento, datos) de la ejecución
+        """
+        data = {"assistant_id": assistant_id}
+        data.update(options)
+        return self._api_stream(f"/threads/{thread_id}/runs", data=data)
+    
+    def stream_tool_outputs(self, thread_id, run_id, tool_outputs):
+        """
+        Envía los resultados de las funciones y continúa la ejecución en streaming.
+        
+        Args:
+            thread_id: ID del thread
+            run_id: ID de la ejecución
+            tool_outputs: Lista de resultados de las llamadas a funciones
+            
+        Returns:
+            generator: Eventos (nombre_evento, datos) de la ejecución
+        """
+        return self._api_stream(
+            f"/threads/{thread_id}/runs/{run_id}/submit_tool_outputs",
+            data={"tool_outputs": tool_outputs}
+        )
+    
     def get_run(self, thread_id, run_id):
         """
         Obtiene el estado de una ejecución.
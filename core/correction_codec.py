@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Codificación compacta de documentos de corrección
+-------------------------------------------------
+Los campos voluminosos de una corrección (textos, resultado completo del
+asistente, análisis contextual) se guardan comprimidos en un único campo
+binario, mientras que los campos pequeños que se consultan, ordenan o
+proyectan (fecha, nivel, puntuación, recuento de errores) se mantienen en
+claro junto con un resumen (número de palabras y extracto del texto).
+
+La lectura es transparente: decode_correction devuelve el documento original
+y deja intactos los documentos guardados sin codificar.
+"""
+
+import json
+import logging
+import zlib
+
+from config.settings import CORRECTION_COMPRESSION, CORRECTION_COMPRESSION_MIN_BYTES
+
+logger = logging.getLogger(__name__)
+
+# Identificador del formato guardado en el campo "codec"
+CODEC_ZLIB_JSON = "zlib-json-v1"
+
+# Campo binario con los campos comprimidos
+CAMPO_COMPRIMIDO = "datos_comprimidos"
+
+# Campos que se comprimen si están presentes
+CAMPOS_VOLUMINOSOS = (
+    "texto_original", "texto_corregido", "resultado", "errores_detalle",
+    "analisis_contextual", "consejo_final", "saludo"
+)
+
+# Longitud del extracto del texto original que se mantiene en claro
+LONGITUD_EXTRACTO = 160
+
+# Nivel de compresión de zlib (6 equilibra tamaño y tiempo)
+NIVEL_COMPRESION = 6
+
+def encode_correction(datos, min_bytes=None):
+    """
+    Comprime los campos voluminosos de un documento de corrección.
+
+    Args:
+        datos (dict): Documento de corrección sin codificar
+        min_bytes (int, opcional): Tamaño mínimo (bytes de JSON) para comprimir
+
+    Returns:
+        dict: Documento listo para guardar (el original si no compensa comprimir)
+    """
+    if not CORRECTION_COMPRESSION or not isinstance(datos, dict) or "codec" in datos:
+        return datos
+
+    voluminosos = {campo: datos[campo] for campo in CAMPOS_VOLUMINOSOS if campo in datos}
+    if not voluminosos:
+        return datos
+
+    serializado = json.dumps(voluminosos, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    umbral = CORRECTION_COMPRESSION_MIN_BYTES if min_bytes is None else min_bytes
+    if len(serializado) < umbral:
+        return datos
+
+    comprimido = zlib.compress(serializado, NIVEL_COMPRESION)
+    if len(comprimido) >= len(serializado):
+        return datos
+
+    codificado = {campo: valor for campo, valor in datos.items() if campo not in voluminosos}
+    texto = datos.get("texto_original")
+    if isinstance(texto, str):
+        # Resumen en claro para listados y búsquedas sin descomprimir
+        codificado.setdefault("palabras", len(texto.split()))
+        codificado.setdefault("extracto", texto[:LONGITUD_EXTRACTO])
+    codificado["codec"] = CODEC_ZLIB_JSON
+    codificado[CAMPO_COMPRIMIDO] = comprimido
+    return codificado
+
+def decode_correction(datos):
+    """
+    Restaura los campos comprimidos de un documento de corrección.
+
+    Args:
+        datos (dict): Documento leído de Firestore (codificado o no)
+
+    Returns:
+        dict: Documento con los campos originales; si el documento viene de una
+            consulta con proyección y no incluye el blob, se devuelve tal cual
+    """
+    if not isinstance(datos, dict) or datos.get("codec") != CODEC_ZLIB_JSON or CAMPO_COMPRIMIDO not in datos:
+        return datos
+
+    try:
+        voluminosos = json.loads(zlib.decompress(bytes(datos[CAMPO_COMPRIMIDO])).decode("utf-8"))
+    except (zlib.error, ValueError) as e:
+        logger.error(f"Error descomprimiendo corrección: {e}")
+        return datos
+
+    decodificado = {campo: valor for campo, valor in datos.items() if campo not in (CAMPO_COMPRIMIDO, "codec")}
+    decodificado.update(voluminosos)
+    return decodificado
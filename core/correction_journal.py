@@ -0,0 +1,378 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Diario de correcciones pendientes
+---------------------------------
+Guardado diferido de las correcciones: el resultado se devuelve al estudiante
+en cuanto está listo y la escritura en Firestore se hace en segundo plano.
+
+Antes de devolver el resultado, cada corrección se anota en un diario local
+(un fichero JSON Lines con fsync) junto con su clave de idempotencia, que es
+también el ID de su documento en Firestore. Un hilo en segundo plano la escribe
+con reintentos y, cuando Firestore la confirma, anota la confirmación en el
+diario. Las entradas sin confirmar se vuelven a enviar al arrancar el proceso;
+como la escritura es idempotente, reenviar una corrección ya guardada no
+duplica el documento ni las estadísticas.
+
+Cada proceso tiene su propio diario en CORRECTION_JOURNAL_DIR, bloqueado
+mientras el proceso vive; al arrancar, un proceso adopta los diarios de los
+procesos que ya terminaron y nunca reescribe el de otro proceso en marcha.
+
+Una corrección que falla pasa detrás de las más recientes, para que no bloquee
+al resto. Un fallo solo cuenta como intento si desde el anterior se ha guardado
+otra corrección (Firestore funcionaba); tras CORRECTION_JOURNAL_MAX_ATTEMPTS
+intentos la corrección se aparta a un fichero de descartadas, junto al diario,
+para revisarla a mano.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from config.settings import CORRECTION_JOURNAL_DIR, CORRECTION_JOURNAL_MAX_ATTEMPTS
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Tipos de entrada del diario
+ENTRADA_PENDIENTE = "pendiente"
+ENTRADA_CONFIRMADA = "confirmada"
+ENTRADA_FALLIDA = "fallida"
+ENTRADA_DESCARTADA = "descartada"
+
+# Espera entre reintentos (segundos): exponencial hasta el máximo
+REINTENTO_BASE = 1.0
+REINTENTO_MAXIMO = 60.0
+
+# Prefijos de los ficheros de cada proceso en el directorio del diario
+PREFIJO_DIARIO = "pendientes_"
+PREFIJO_DESCARTADAS = "descartadas_"
+
+def _bloquear_sin_esperar(path):
+    """
+    Toma el bloqueo exclusivo de un fichero sin esperar.
+
+    Args:
+        path (str): Ruta del fichero de bloqueo (se crea si no existe)
+
+    Returns:
+        file: Fichero abierto que mantiene el bloqueo (se libera al cerrarlo),
+            o None si lo tiene otro proceso o no hay bloqueo entre procesos
+    """
+    if fcntl is None:
+        return None
+    fichero = open(path, "a")
+    try:
+        fcntl.flock(fichero.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        fichero.close()
+        return None
+    return fichero
+
+class CorrectionJournal:
+    """
+    Diario local de correcciones pendientes con un escritor en segundo plano.
+    """
+
+    def __init__(self, directory=CORRECTION_JOURNAL_DIR, max_attempts=CORRECTION_JOURNAL_MAX_ATTEMPTS):
+        """
+        Inicializa el diario (no lee los ficheros hasta replay()).
+
+        Cada proceso escribe su propio diario (pendientes_<pid>.jsonl) y lo
+        mantiene bloqueado mientras vive, de modo que otro proceso solo adopta
+        los diarios de procesos terminados.
+
+        Args:
+            directory (str): Directorio de los diarios
+            max_attempts (int): Intentos fallidos tras los que una corrección
+                se aparta al fichero de descartadas
+        """
+        self.directory = directory
+        self.path = os.path.join(directory, f"{PREFIJO_DIARIO}{os.getpid()}.jsonl")
+        self.dead_letter_path = os.path.join(directory, f"{PREFIJO_DESCARTADAS}{os.getpid()}.jsonl")
+        self._lock_file = None
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._pending = OrderedDict()  # correction_id -> datos
+        self._attempts = {}  # correction_id -> intentos fallidos
+        # correction_id -> correcciones guardadas en su último fallo (o al encolarla)
+        self._written_at = {}
+        self._thread = None
+        self._replayed = False
+        self.written = 0
+        self.retries = 0
+        self.discarded = 0
+
+    def _lock_journal(self):
+        """Crea el directorio y bloquea el diario de este proceso. Requiere self._lock."""
+        if self._lock_file is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock_file = _bloquear_sin_esperar(f"{self.path}.lock")
+        if self._lock_file is None and fcntl is not None:
+            logger.warning(f"No se pudo bloquear el diario de correcciones {self.path}")
+
+    def _append(self, entrada, path=None):
+        """Añade una línea al diario (o a otro fichero) y la lleva a disco. Requiere self._lock."""
+        self._lock_journal()
+        with open(path or self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entrada, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _compact(self):
+        """Reescribe el diario solo con las entradas pendientes. Requiere self._lock."""
+        self._lock_journal()
+        temporal = f"{self.path}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            for correction_id, datos in self._pending.items():
+                entrada = {"tipo": ENTRADA_PENDIENTE, "id": correction_id, "datos": datos}
+                if self._attempts.get(correction_id):
+                    entrada["intentos"] = self._attempts[correction_id]
+                f.write(json.dumps(entrada, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, self.path)
+
+    def _ensure_worker(self):
+        """Arranca el hilo escritor si no está vivo. Requiere self._lock."""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._worker, name="correction-journal", daemon=True)
+            self._thread.start()
+
+    def submit(self, datos):
+        """
+        Anota una corrección en el diario y la encola para guardarla en Firestore.
+
+        Args:
+            datos (dict): Argumentos de save_correction_with_stats (serializables en JSON)
+
+        Returns:
+            str: ID de la corrección (clave de idempotencia e ID del documento)
+        """
+        correction_id = datos.get("correction_id") or uuid.uuid4().hex
+        datos = dict(datos, correction_id=correction_id)
+        with self._cond:
+            self._append({"tipo": ENTRADA_PENDIENTE, "id": correction_id, "datos": datos})
+            self._pending[correction_id] = datos
+            self._written_at[correction_id] = self.written
+            self._ensure_worker()
+            self._cond.notify()
+        return correction_id
+
+    def _read(self, path):
+        """
+        Lee un diario y devuelve sus correcciones sin confirmar.
+
+        Args:
+            path (str): Ruta del diario
+
+        Returns:
+            tuple: (OrderedDict correction_id -> datos, dict correction_id -> intentos)
+        """
+        recuperadas = OrderedDict()
+        intentos = {}
+        with open(path, encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    entrada = json.loads(linea)
+                except ValueError:
+                    # Última línea a medio escribir si el proceso se interrumpió
+                    logger.warning("Línea corrupta ignorada en el diario de correcciones")
+                    continue
+                if entrada.get("tipo") == ENTRADA_PENDIENTE:
+                    recuperadas[entrada["id"]] = entrada["datos"]
+                    intentos[entrada["id"]] = entrada.get("intentos", 0)
+                elif entrada.get("tipo") == ENTRADA_FALLIDA:
+                    intentos[entrada["id"]] = intentos.get(entrada["id"], 0) + 1
+                elif entrada.get("tipo") in (ENTRADA_CONFIRMADA, ENTRADA_DESCARTADA):
+                    recuperadas.pop(entrada["id"], None)
+        return recuperadas, intentos
+
+    def replay(self):
+        """
+        Carga las correcciones sin confirmar de este proceso y de los diarios de
+        procesos que ya han terminado (su bloqueo está libre), las pasa al diario
+        propio y las vuelve a encolar. Los diarios de procesos vivos no se tocan.
+        Solo tiene efecto la primera vez que se llama en el proceso.
+
+        Returns:
+            int: Número de correcciones pendientes recuperadas
+        """
+        with self._cond:
+            if self._replayed:
+                return 0
+            self._replayed = True
+
+            if not os.path.isdir(self.directory):
+                return 0
+            try:
+                self._lock_journal()
+            except OSError as e:
+                logger.error(f"Error bloqueando el diario de correcciones: {e}")
+                return 0
+
+            recuperadas = OrderedDict()
+            intentos = {}
+            adoptados = []
+            for nombre in sorted(os.listdir(self.directory)):
+                path = os.path.join(self.directory, nombre)
+                if not (nombre.startswith(PREFIJO_DIARIO) and nombre.endswith(".jsonl")):
+                    continue
+                bloqueo = None
+                if path != self.path:
+                    bloqueo = _bloquear_sin_esperar(f"{path}.lock")
+                    if bloqueo is None:
+                        # Diario de otro proceso en marcha
+                        continue
+                try:
+                    leidas, fallos = self._read(path)
+                except OSError as e:
+                    # Otro proceso pudo adoptarlo y borrarlo mientras tanto
+                    logger.error(f"Error leyendo el diario de correcciones {path}: {e}")
+                    if bloqueo is not None:
+                        bloqueo.close()
+                    continue
+                recuperadas.update(leidas)
+                intentos.update(fallos)
+                if bloqueo is not None:
+                    adoptados.append((path, bloqueo))
+
+            for correction_id, datos in recuperadas.items():
+                self._pending.setdefault(correction_id, datos)
+                self._written_at.setdefault(correction_id, self.written)
+                if intentos.get(correction_id):
+                    self._attempts[correction_id] = intentos[correction_id]
+            try:
+                self._compact()
+            except OSError as e:
+                logger.error(f"Error reescribiendo el diario de correcciones: {e}")
+                adoptados = [(None, bloqueo) for _, bloqueo in adoptados]
+
+            # Las entradas adoptadas ya están en el diario propio
+            for path, bloqueo in adoptados:
+                if path is not None:
+                    for fichero in (path, f"{path}.lock"):
+                        try:
+                            os.remove(fichero)
+                        except OSError:
+                            pass
+                bloqueo.close()
+
+            if recuperadas:
+                logger.info(f"Recuperadas {len(recuperadas)} correcciones pendientes de guardar")
+                self._ensure_worker()
+                self._cond.notify()
+            return len(recuperadas)
+
+    def _acknowledge(self, correction_id, tipo=ENTRADA_CONFIRMADA):
+        """Marca una corrección como guardada en Firestore (o como descartada)."""
+        with self._cond:
+            self._pending.pop(correction_id, None)
+            self._attempts.pop(correction_id, None)
+            self._written_at.pop(correction_id, None)
+            if tipo == ENTRADA_CONFIRMADA:
+                self.written += 1
+            try:
+                if self._pending:
+                    self._append({"tipo": tipo, "id": correction_id})
+                else:
+                    # Sin pendientes el diario puede vaciarse
+                    self._compact()
+            except OSError as e:
+                logger.error(f"Error anotando confirmación en el diario de correcciones: {e}")
+
+    def _record_failure(self, correction_id):
+        """
+        Pasa una corrección fallida detrás de las demás pendientes y, si desde su
+        fallo anterior se ha guardado otra, suma un intento; al llegar a
+        max_attempts la aparta.
+
+        Args:
+            correction_id (str): ID de la corrección
+
+        Returns:
+            bool: True si la corrección se ha apartado al fichero de descartadas
+        """
+        with self._cond:
+            datos = self._pending.get(correction_id)
+            if datos is None:
+                return False
+            self._pending.move_to_end(correction_id)
+            # Si no se ha guardado nada desde entonces, Firestore puede estar caído
+            contar = self.written > self._written_at.get(correction_id, self.written)
+            self._written_at[correction_id] = self.written
+            if not contar:
+                return False
+
+            intentos = self._attempts.get(correction_id, 0) + 1
+            self._attempts[correction_id] = intentos
+            try:
+                if intentos < self.max_attempts:
+                    self._append({"tipo": ENTRADA_FALLIDA, "id": correction_id})
+                    return False
+                self._append({"id": correction_id, "datos": datos, "intentos": intentos,
+                              "descartada_en": time.time()}, path=self.dead_letter_path)
+            except OSError as e:
+                logger.error(f"Error anotando el fallo de la corrección {correction_id}: {e}")
+                return False
+
+        self.discarded += 1
+        logger.error(f"Corrección {correction_id} descartada tras {intentos} intentos; "
+                     f"guardada en {self.dead_letter_path}")
+        self._acknowledge(correction_id, ENTRADA_DESCARTADA)
+        return True
+
+    def _worker(self):
+        # Importar dinámicamente para evitar dependencias circulares
+        from core.firebase_client import save_correction_with_stats
+
+        espera = REINTENTO_BASE
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                correction_id, datos = next(iter(self._pending.items()))
+
+            try:
+                guardado = save_correction_with_stats(**datos) is not None
+            except Exception as e:
+                logger.error(f"Error guardando corrección {correction_id} en segundo plano: {e}")
+                guardado = False
+
+            if guardado:
+                self._acknowledge(correction_id)
+                espera = REINTENTO_BASE
+                continue
+
+            if self._record_failure(correction_id):
+                continue
+
+            # Reintentar más tarde con espera exponencial
+            self.retries += 1
+            logger.warning(f"Corrección {correction_id} no guardada, reintento en {espera:.0f}s")
+            time.sleep(espera)
+            espera = min(espera * 2, REINTENTO_MAXIMO)
+
+    def stats(self):
+        """
+        Resumen del estado del diario.
+
+        Returns:
+            dict: Correcciones pendientes, guardadas, reintentos y descartadas
+        """
+        with self._lock:
+            return {"pending": len(self._pending), "written": self.written, "retries": self.retries,
+                    "discarded": self.discarded}
+
+# Instancia global compartida por todas las sesiones
+correction_journal = CorrectionJournal()
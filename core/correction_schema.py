@@ -0,0 +1,327 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Esquema de los resultados de corrección
+---------------------------------------
+Este módulo describe de forma declarativa la estructura que debe tener el JSON
+de corrección devuelto por el asistente y la compila una sola vez en un
+validador que, en una única pasada, comprueba tipos, completa campos que faltan,
+normaliza claves y devuelve un diagnóstico de todo lo que ha tenido que reparar.
+"""
+
+import copy
+import logging
+from collections import Counter
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+# Categorías de error (sus claves se conservan tal cual para la presentación)
+CATEGORIAS_ERROR = ["Gramática", "Léxico", "Puntuación", "Estructura textual"]
+
+# Componentes del análisis contextual
+COMPONENTES_ANALISIS = ["coherencia", "cohesion", "registro_linguistico", "adecuacion_cultural"]
+
+# Acciones de reparación registradas en el diagnóstico
+REPARACION_AÑADIDO = "añadido"
+REPARACION_TIPO = "tipo"
+REPARACION_RANGO = "rango"
+REPARACION_CLAVE = "clave"
+REPARACION_DESCARTADO = "descartado"
+REPARACION_RAIZ = "raiz"
+
+_ERROR_SCHEMA = {
+    "tipo": "objeto",
+    "descartar_invalido": True,
+    "campos": {
+        "fragmento_erroneo": {"tipo": "texto", "defecto": ""},
+        "correccion": {"tipo": "texto", "defecto": ""},
+        "explicacion": {"tipo": "texto", "defecto": ""},
+    }
+}
+
+_COMPONENTE_ANALISIS_SCHEMA = {
+    "tipo": "objeto",
+    "campos": {
+        "puntuacion": {"tipo": "numero", "defecto": 5, "minimo": 0, "maximo": 10},
+        "comentario": {"tipo": "texto", "defecto": "No disponible"},
+        "sugerencias": {"tipo": "lista", "elementos": {"tipo": "texto", "defecto": ""}, "opcional": True},
+        "elementos_destacables": {"tipo": "lista", "elementos": {"tipo": "texto", "defecto": ""}, "opcional": True},
+    }
+}
+
+CORRECTION_SCHEMA = {
+    "tipo": "objeto",
+    "campos": {
+        "saludo": {"tipo": "texto", "defecto": "¡Hola! He revisado tu texto."},
+        "tipo_texto": {"tipo": "texto", "defecto": "Texto general"},
+        "errores": {
+            "tipo": "objeto",
+            "campos": {
+                categoria: {"tipo": "lista", "elementos": _ERROR_SCHEMA}
+                for categoria in CATEGORIAS_ERROR
+            }
+        },
+        "texto_corregido": {
+            "tipo": "texto",
+            "defecto": "No se generó texto corregido.",
+            # Si falta el texto corregido pero tenemos el original, usarlo
+            "defecto_desde": "texto_original"
+        },
+        "analisis_contextual": {
+            "tipo": "objeto",
+            "campos": {componente: _COMPONENTE_ANALISIS_SCHEMA for componente in COMPONENTES_ANALISIS}
+        },
+        "consejo_final": {"tipo": "texto", "defecto": "Continúa practicando tu español."},
+        "texto_original": {"tipo": "texto", "opcional": True},
+    }
+}
+
+# Valores con los que se sustituye una respuesta que no es un objeto JSON
+_RESPUESTA_INVALIDA = {
+    "texto_corregido": "No se pudo procesar la respuesta correctamente.",
+    "consejo_final": "Hubo un problema al procesar la respuesta."
+}
+
+# Marca para elementos de lista que deben descartarse
+_DESCARTAR = object()
+
+_SIN_TILDES = str.maketrans("áéíóúÁÉÍÓÚ", "aeiouAEIOU")
+
+
+@lru_cache(maxsize=2048)
+def _forma_comparable(clave):
+    """Forma sin tildes y en minúsculas con la que se comparan las claves."""
+    return clave.translate(_SIN_TILDES).lower() if isinstance(clave, str) else clave
+
+
+def normalizar_clave(clave):
+    """
+    Normaliza una clave: elimina tildes y la convierte a minúsculas.
+    Las categorías de error se mantienen tal cual para la presentación.
+
+    Args:
+        clave (str): Clave a normalizar
+
+    Returns:
+        str: Clave normalizada
+    """
+    if clave in CATEGORIAS_ERROR:
+        return clave
+    return _forma_comparable(clave)
+
+
+def normalizar_claves(obj):
+    """
+    Normaliza recursivamente las claves de diccionarios anidados.
+
+    Args:
+        obj: Valor JSON (dict, list o primitivo)
+
+    Returns:
+        Valor con las claves normalizadas
+    """
+    if isinstance(obj, dict):
+        return {normalizar_clave(clave): normalizar_claves(valor) for clave, valor in obj.items()}
+    if isinstance(obj, list):
+        return [normalizar_claves(item) for item in obj]
+    return obj
+
+
+def _compilar(spec, ruta):
+    """Compila un nodo del esquema en una función validar(valor, reparaciones)."""
+    tipo = spec["tipo"]
+    if tipo == "texto":
+        return _compilar_texto(spec, ruta)
+    if tipo == "numero":
+        return _compilar_numero(spec, ruta)
+    if tipo == "lista":
+        return _compilar_lista(spec, ruta)
+    if tipo == "objeto":
+        return _compilar_objeto(spec, ruta)
+    raise ValueError(f"Tipo de esquema desconocido en '{ruta}': {tipo}")
+
+
+def _compilar_texto(spec, ruta):
+    defecto = spec.get("defecto", "")
+
+    def validar(valor, reparaciones):
+        if isinstance(valor, str):
+            return valor
+        reparaciones.append((ruta, REPARACION_TIPO))
+        if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+            return str(valor)
+        return defecto
+
+    validar.defecto = lambda: defecto
+    return validar
+
+
+def _compilar_numero(spec, ruta):
+    defecto = spec.get("defecto", 0)
+    minimo = spec.get("minimo")
+    maximo = spec.get("maximo")
+
+    def validar(valor, reparaciones):
+        if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+            reparaciones.append((ruta, REPARACION_TIPO))
+            try:
+                valor = float(valor)
+                if valor.is_integer():
+                    valor = int(valor)
+            except (TypeError, ValueError):
+                return defecto
+        if minimo is not None and valor < minimo:
+            reparaciones.append((ruta, REPARACION_RANGO))
+            return minimo
+        if maximo is not None and valor > maximo:
+            reparaciones.append((ruta, REPARACION_RANGO))
+            return maximo
+        return valor
+
+    validar.defecto = lambda: defecto
+    return validar
+
+
+def _compilar_lista(spec, ruta):
+    validar_elemento = _compilar(spec["elementos"], f"{ruta}[]")
+
+    def validar(valor, reparaciones):
+        if not isinstance(valor, list):
+            reparaciones.append((ruta, REPARACION_TIPO))
+            # Un único elemento suelto se envuelve en una lista
+            valor = [valor] if isinstance(valor, dict) else []
+        resultado = []
+        for elemento in valor:
+            elemento = validar_elemento(elemento, reparaciones)
+            if elemento is not _DESCARTAR:
+                resultado.append(elemento)
+        return resultado
+
+    validar.defecto = list
+    return validar
+
+
+def _compilar_objeto(spec, ruta):
+    prefijo = f"{ruta}." if ruta else ""
+    campos = {
+        nombre: _compilar(subspec, f"{prefijo}{nombre}")
+        for nombre, subspec in spec["campos"].items()
+    }
+    # Campos que se completan si faltan, con su ruta y su origen alternativo
+    obligatorios = [
+        (nombre, f"{prefijo}{nombre}", subspec.get("defecto_desde"))
+        for nombre, subspec in spec["campos"].items()
+        if not subspec.get("opcional")
+    ]
+    # Alias: clave canónica y su forma normalizada apuntan al mismo campo
+    alias = {}
+    for nombre in campos:
+        alias[nombre] = nombre
+        alias.setdefault(_forma_comparable(nombre), nombre)
+    descartar_invalido = spec.get("descartar_invalido", False)
+
+    def validar(valor, reparaciones):
+        if not isinstance(valor, dict):
+            if descartar_invalido:
+                reparaciones.append((ruta, REPARACION_DESCARTADO))
+                return _DESCARTAR
+            reparaciones.append((ruta, REPARACION_TIPO))
+            valor = {}
+
+        resultado = {}
+        for clave, contenido in valor.items():
+            nombre = alias.get(clave)
+            if nombre is None:
+                nombre = alias.get(_forma_comparable(clave))
+                if nombre is None:
+                    # Campo no descrito en el esquema: se conserva normalizado
+                    resultado[normalizar_clave(clave)] = normalizar_claves(contenido)
+                    continue
+                reparaciones.append((f"{prefijo}{nombre}", REPARACION_CLAVE))
+            resultado[nombre] = campos[nombre](contenido, reparaciones)
+
+        for nombre, ruta_campo, defecto_desde in obligatorios:
+            if nombre not in resultado:
+                reparaciones.append((ruta_campo, REPARACION_AÑADIDO))
+                alternativo = valor.get(defecto_desde) if defecto_desde else None
+                if isinstance(alternativo, str) and alternativo:
+                    resultado[nombre] = alternativo
+                else:
+                    resultado[nombre] = campos[nombre].defecto()
+        return resultado
+
+    # Valor por defecto completo, calculado una vez y copiado en cada uso
+    plantilla = validar({}, [])
+    validar.defecto = lambda: copy.deepcopy(plantilla)
+    return validar
+
+
+def compile_schema(schema):
+    """
+    Compila un esquema declarativo en un validador reutilizable.
+
+    Args:
+        schema (dict): Esquema con nodos "objeto", "lista", "texto" y "numero"
+
+    Returns:
+        callable: Función que recibe los datos y devuelve (datos reparados, diagnóstico)
+    """
+    validar_raiz = _compilar(schema, "")
+
+    def validar(datos):
+        reparaciones = []
+        if not isinstance(datos, dict) or not datos:
+            reparaciones.append(("", REPARACION_RAIZ))
+            datos = dict(_RESPUESTA_INVALIDA)
+        resultado = validar_raiz(datos, reparaciones)
+        return resultado, _crear_diagnostico(reparaciones)
+
+    return validar
+
+
+def _crear_diagnostico(reparaciones):
+    """
+    Resume la lista de reparaciones realizadas.
+
+    Args:
+        reparaciones (list): Pares (ruta del campo, acción)
+
+    Returns:
+        dict: Diagnóstico con el total, el conteo por acción y el detalle por campo
+    """
+    return {
+        "reparado": bool(reparaciones),
+        "total": len(reparaciones),
+        "por_accion": dict(Counter(accion for _, accion in reparaciones)),
+        "reparaciones": [{"campo": ruta, "accion": accion} for ruta, accion in reparaciones]
+    }
+
+
+_validar_correccion = compile_schema(CORRECTION_SCHEMA)
+
+
+def validate_correction_result(json_data, texto_original=None):
+    """
+    Valida, completa y normaliza un resultado de corrección contra CORRECTION_SCHEMA.
+
+    Args:
+        json_data (dict): Resultado de corrección devuelto por el asistente
+        texto_original (str, opcional): Texto original para incluir si falta
+
+    Returns:
+        tuple: (resultado reparado, diagnóstico de reparaciones)
+    """
+    if texto_original and isinstance(json_data, dict) and json_data and "texto_original" not in json_data:
+        json_data = {**json_data, "texto_original": texto_original}
+
+    resultado, diagnostico = _validar_correccion(json_data)
+
+    if texto_original and "texto_original" not in resultado:
+        resultado["texto_original"] = texto_original
+
+    if diagnostico["reparado"]:
+        campos = sorted({r["campo"] or "<raíz>" for r in diagnostico["reparaciones"]})
+        logger.warning(f"Resultado de corrección reparado ({diagnostico['total']} reparaciones): {', '.join(campos)}")
+
+    return resultado, diagnostico
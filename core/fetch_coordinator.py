@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Coordinador de consultas concurrentes
+-------------------------------------
+Lanza en paralelo consultas independientes (p. ej. las colecciones que necesita
+el panel de progreso) y entrega cada resultado en cuanto llega, de modo que la
+latencia del panel sea la de la consulta más lenta y no la suma de todas.
+Cada consulta tiene su propio tiempo límite; las que lo superan se entregan
+como error (y se cancelan si aún no habían empezado) y la interfaz puede
+mostrar el resto. Las cargas masivas (informe de la clase) usan su propio
+pool para no dejar sin hilos al panel de las demás sesiones.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from config.settings import DASHBOARD_FETCH_TIMEOUT, DASHBOARD_FETCH_WORKERS, COHORT_FETCH_WORKERS
+
+logger = logging.getLogger(__name__)
+
+# Prefijo de los hilos del pool
+_THREAD_PREFIX = "fetch-coordinator"
+
+# Hilos de cada pool
+POOL_WORKERS = {
+    "panel": DASHBOARD_FETCH_WORKERS,
+    "cohorte": COHORT_FETCH_WORKERS,
+}
+
+# Pools compartidos por todas las sesiones del proceso
+_executors = {}
+_executor_lock = threading.Lock()
+
+def _get_executor(pool):
+    with _executor_lock:
+        if pool not in _executors:
+            _executors[pool] = ThreadPoolExecutor(
+                max_workers=POOL_WORKERS[pool], thread_name_prefix=f"{_THREAD_PREFIX}-{pool}"
+            )
+        return _executors[pool]
+
+class FetchTimeoutError(Exception):
+    """Excepción entregada cuando una consulta supera su tiempo límite"""
+    pass
+
+class FetchCoordinator:
+    """
+    Agrupa consultas independientes lanzadas en paralelo.
+    """
+
+    def __init__(self, timeout=DASHBOARD_FETCH_TIMEOUT, pool="panel"):
+        """
+        Inicializa un grupo vacío de consultas.
+
+        Args:
+            timeout (float): Tiempo límite por defecto de cada consulta (segundos)
+            pool (str): Pool de hilos en el que se ejecutan (clave de POOL_WORKERS)
+        """
+        self.timeout = timeout
+        self.pool = pool
+        self._futures = {}  # future -> (nombre, límite)
+        # Contexto de Streamlit de la sesión que lanza las consultas, para que
+        # las funciones que consultan st.session_state funcionen en los hilos
+        self._ctx = self._script_run_ctx()
+
+    @staticmethod
+    def _script_run_ctx():
+        try:
+            from streamlit.runtime.scriptrunner import get_script_run_ctx
+            return get_script_run_ctx()
+        except Exception:
+            return None
+
+    def _run(self, funcion, args, kwargs):
+        if self._ctx is not None:
+            from streamlit.runtime.scriptrunner import add_script_run_ctx
+            add_script_run_ctx(threading.current_thread(), self._ctx)
+        return funcion(*args, **kwargs)
+
+    def submit(self, nombre, funcion, *args, timeout=None, **kwargs):
+        """
+        Lanza una consulta en segundo plano.
+
+        Args:
+            nombre (str): Identificador del resultado
+            funcion (callable): Función que realiza la consulta
+            *args, **kwargs: Argumentos de la función
+            timeout (float, opcional): Tiempo límite de esta consulta
+
+        Returns:
+            FetchCoordinator: El propio coordinador (para encadenar llamadas)
+        """
+        limite = time.monotonic() + (timeout if timeout is not None else self.timeout)
+        if threading.current_thread().name.startswith(_THREAD_PREFIX):
+            # Consulta anidada dentro de otra: ejecutarla en el mismo hilo para
+            # no bloquear el pool esperando a hilos del propio pool
+            future = Future()
+            try:
+                future.set_result(funcion(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+        else:
+            future = _get_executor(self.pool).submit(self._run, funcion, args, kwargs)
+        self._futures[future] = (nombre, limite)
+        return self
+
+    def as_completed(self):
+        """
+        Entrega los resultados en orden de llegada.
+
+        Yields:
+            tuple: (nombre, resultado, error); error es None si la consulta terminó bien
+        """
+        pendientes = dict(self._futures)
+        while pendientes:
+            ahora = time.monotonic()
+
+            # Consultas que han superado su tiempo límite
+            for future, (nombre, limite) in list(pendientes.items()):
+                if limite <= ahora and not future.done():
+                    del pendientes[future]
+                    # Si sigue en cola no llega a ocupar un hilo
+                    future.cancel()
+                    logger.warning(f"Consulta '{nombre}' sin respuesta tras el tiempo límite")
+                    yield nombre, None, FetchTimeoutError(nombre)
+            if not pendientes:
+                break
+
+            proximo_limite = min(limite for _, limite in pendientes.values())
+            terminados, _ = wait(pendientes, timeout=max(0, proximo_limite - ahora),
+                                 return_when=FIRST_COMPLETED)
+            for future in terminados:
+                nombre, _ = pendientes.pop(future)
+                error = future.exception()
+                if error is not None:
+                    logger.error(f"Error en la consulta '{nombre}': {error}")
+                    yield nombre, None, error
+                else:
+                    yield nombre, future.result(), None
+
+    def results(self, default=None):
+        """
+        Espera a todas las consultas (cada una hasta su límite).
+
+        Args:
+            default: Valor para las consultas fallidas o sin respuesta
+
+        Returns:
+            dict: nombre -> resultado
+        """
+        return {
+            nombre: default if error is not None else resultado
+            for nombre, resultado, error in self.as_completed()
+        }
@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Caché de figuras de Plotly
+--------------------------
+Cada recarga de Streamlit vuelve a construir los gráficos del perfil y de los
+informes (DataFrames, agrupaciones, líneas de tendencia y validación de Plotly)
+aunque los datos no hayan cambiado. Esta caché guarda cada figura serializada
+a JSON una sola vez, con una clave formada por la función, los parámetros del
+gráfico y una huella de los datos de entrada.
+
+- El tamaño total (bytes de JSON) está acotado; se descartan las figuras
+  usadas hace más tiempo.
+- Las figuras pueden asociarse a un usuario y se descartan cuando se guarda
+  una actividad suya nueva (core.firebase_client llama a invalidate).
+- Las entradas caducan a los FIGURE_CACHE_TTL segundos, porque algunos
+  gráficos filtran por periodos relativos a la fecha actual.
+"""
+
+import functools
+import hashlib
+import json
+import logging
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from config.settings import FIGURE_CACHE_TTL, FIGURE_CACHE_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+# Usuarios cuya generación se recuerda por separado
+MAX_GENERACIONES = 10000
+
+def huella(*objetos):
+    """
+    Huella de unos datos de entrada (listas de diccionarios, DataFrames, etc.).
+
+    Args:
+        *objetos: Datos y parámetros que determinan el gráfico
+
+    Returns:
+        str: Resumen hexadecimal; datos iguales dan la misma huella
+    """
+    resumen = hashlib.blake2b(digest_size=16)
+    for objeto in objetos:
+        try:
+            resumen.update(pickle.dumps(objeto, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            # Objetos no serializables (p. ej. centinelas de Firestore)
+            resumen.update(repr(objeto).encode("utf-8", "replace"))
+    return resumen.hexdigest()
+
+class FigureCache:
+    """
+    Caché de figuras en JSON, compartida por todas las sesiones del proceso.
+    """
+
+    def __init__(self, ttl=FIGURE_CACHE_TTL, max_bytes=FIGURE_CACHE_MAX_BYTES):
+        """
+        Inicializa una caché vacía.
+
+        Args:
+            ttl (float): Segundos que una figura se considera válida
+            max_bytes (int): Tamaño máximo del JSON almacenado
+        """
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # clave -> (expira_en, uid, json)
+        self._por_usuario = {}  # uid -> claves de sus figuras
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        # Generación de cada usuario; evita guardar figuras construidas con datos anteriores
+        self._contador = 0
+        self._generaciones = OrderedDict()  # uid -> generación
+        # Generación de los usuarios descartados de _generaciones (la mayor descartada)
+        self._generacion_base = 0
+
+    def generation(self, uid):
+        """
+        Generación actual de un usuario; tomarla antes de construir la figura y pasarla a set().
+
+        Args:
+            uid (str): ID del usuario
+
+        Returns:
+            int: Generación del usuario
+        """
+        with self._lock:
+            return self._generaciones.get(uid, self._generacion_base)
+
+    def _quitar(self, clave):
+        _, uid, texto = self._entries.pop(clave)
+        self._bytes -= len(texto)
+        if uid is not None:
+            claves = self._por_usuario.get(uid)
+            if claves is not None:
+                claves.discard(clave)
+                if not claves:
+                    del self._por_usuario[uid]
+
+    def get_json(self, clave):
+        """
+        JSON de una figura en caché si sigue vigente.
+
+        Args:
+            clave (str): Clave de la figura
+
+        Returns:
+            str: Figura serializada, o None si no está o ha caducado
+        """
+        with self._lock:
+            entrada = self._entries.get(clave)
+            if entrada is None or entrada[0] < time.monotonic():
+                if entrada is not None:
+                    self._quitar(clave)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(clave)
+            self.hits += 1
+            return entrada[2]
+
+    def get(self, clave):
+        """
+        Figura en caché (un objeto nuevo en cada llamada, que se puede modificar).
+
+        Args:
+            clave (str): Clave de la figura
+
+        Returns:
+            plotly.graph_objects.Figure: Figura, o None si no está o ha caducado
+        """
+        texto = self.get_json(clave)
+        if texto is None:
+            return None
+        # El JSON lo generó Plotly a partir de una figura válida: no hace falta volver a validarlo
+        return go.Figure(json.loads(texto), _validate=False)
+
+    def set(self, clave, figura, uid=None, generation=None):
+        """
+        Serializa y guarda una figura.
+
+        Args:
+            clave (str): Clave de la figura
+            figura (plotly.graph_objects.Figure): Figura construida
+            uid (str, opcional): Usuario cuyos datos muestra la figura
+            generation (int, opcional): Generación del usuario tomada antes de
+                construirla; si se invalidó desde entonces, no se guarda
+
+        Returns:
+            str: La figura serializada a JSON
+        """
+        texto = pio.to_json(figura, validate=False)
+        if len(texto) > self.max_bytes:
+            return texto
+        with self._lock:
+            if generation is not None and generation != self._generaciones.get(uid, self._generacion_base):
+                return texto
+            if clave in self._entries:
+                self._quitar(clave)
+            self._entries[clave] = (time.monotonic() + self.ttl, uid, texto)
+            self._bytes += len(texto)
+            if uid is not None:
+                self._por_usuario.setdefault(uid, set()).add(clave)
+            while self._bytes > self.max_bytes:
+                self._quitar(next(iter(self._entries)))
+        return texto
+
+    def invalidate(self, uid):
+        """
+        Descarta las figuras de un usuario tras guardar una actividad suya.
+
+        Args:
+            uid (str): ID del usuario
+        """
+        with self._lock:
+            self._contador += 1
+            self._generaciones[uid] = self._contador
+            self._generaciones.move_to_end(uid)
+            # Acotar la memoria: los usuarios descartados pasan a la generación base,
+            # que no baja nunca (como mucho se descarta alguna figura de más)
+            while len(self._generaciones) > MAX_GENERACIONES:
+                _, self._generacion_base = self._generaciones.popitem(last=False)
+            claves = self._por_usuario.pop(uid, set())
+            for clave in claves:
+                if clave in self._entries:
+                    _, _, texto = self._entries.pop(clave)
+                    self._bytes -= len(texto)
+            if claves:
+                self.invalidations += 1
+
+    def clear(self):
+        """Vacía la caché sin reiniciar las estadísticas."""
+        with self._lock:
+            self._entries.clear()
+            self._por_usuario.clear()
+            self._bytes = 0
+
+    @property
+    def hit_ratio(self):
+        """float: Proporción de figuras servidas desde la caché."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        """
+        Devuelve las estadísticas de uso de la caché.
+
+        Returns:
+            dict: Aciertos, fallos, invalidaciones, ratio de aciertos, tamaño y bytes
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_ratio": self.hit_ratio,
+                "entries": len(self._entries),
+                "bytes": self._bytes
+            }
+
+def figura_en_cache(uid_arg=None):
+    """
+    Decorador que sirve desde figure_cache las figuras de una función de
+    gráficos. La clave es el nombre de la función más la huella de todos sus
+    argumentos (datos y parámetros del gráfico).
+
+    Args:
+        uid_arg (str, opcional): Argumento con el ID del usuario cuyas figuras
+            se invalidan al guardar una actividad suya. Las funciones sin él
+            aceptan además el argumento con nombre cache_uid.
+
+    Returns:
+        callable: Decorador
+    """
+    def decorador(funcion):
+        nombre = f"{funcion.__module__}.{funcion.__qualname__}"
+        posicion = None
+        if uid_arg is not None:
+            posicion = funcion.__code__.co_varnames[:funcion.__code__.co_argcount].index(uid_arg)
+
+        @functools.wraps(funcion)
+        def envoltura(*args, cache_uid=None, **kwargs):
+            uid = cache_uid
+            if uid_arg is not None:
+                uid = kwargs.get(uid_arg, args[posicion] if posicion < len(args) else None)
+            clave = f"{nombre}:{huella(args, sorted(kwargs.items()))}"
+
+            figura = figure_cache.get(clave)
+            if figura is not None:
+                return figura
+
+            generacion = figure_cache.generation(uid)
+            figura = funcion(*args, **kwargs)
+            try:
+                figure_cache.set(clave, figura, uid=uid, generation=generacion)
+            except Exception as e:
+                logger.error(f"No se pudo guardar la figura de {nombre} en caché: {e}")
+            return figura
+
+        return envoltura
+    return decorador
+
+# Instancia global compartida por todas las sesiones
+figure_cache = FigureCache()
@@ -0,0 +1,731 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Caché columnar del historial para las analíticas
+------------------------------------------------
+Guarda por usuario las columnas ya extraídas de sus correcciones, simulacros y
+ejercicios (fechas interpretadas, puntuaciones, niveles, temas, palabras y
+errores), de modo que el perfil y el informe del profesor no vuelven a
+descargar ni a recorrer el historial en cada visita.
+
+Cada colección es un directorio de ficheros Arrow IPC inmutables, numerados
+en orden de escritura:
+
+    <HISTORY_CACHE_PATH>/<uid>/<coleccion>/0000000001.arrow, 0000000002.arrow, ...
+
+- Una reconstrucción escribe un fichero "base" con la colección completa; cada
+  actividad guardada después (escritura simultánea desde core.firebase_client)
+  se añade como un fichero "anexo" con una sola fila. Los errores de cada
+  corrección van en una columna de listas, en la misma fila.
+- Los ficheros se escriben con otro nombre y se publican con os.link, que falla
+  si el número ya existe: varios procesos pueden escribir a la vez sin
+  bloqueos y sin dejar nunca un fichero a medias a la vista.
+- Cargar un historial abre los ficheros con pa.memory_map: solo se leen las
+  páginas que usan las analíticas. Cuando se acumulan MAX_ANEXOS anexos, se
+  funden en una base nueva.
+- Una colección con más de HISTORY_CACHE_REFRESH segundos, con un documento
+  reescrito o que no se pudo descargar se sirve igualmente y se reconstruye en
+  segundo plano desde Firestore.
+
+Las filas se guardan de la más antigua a la más reciente; al cargarlas se
+invierten para obtener el orden de listar_historial (fecha descendente). Los
+valores de nivel, tema y categoría se guardan como JSON para conservar su tipo.
+"""
+
+import json
+import logging
+import os
+import queue
+import re
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from config.settings import (
+    HISTORY_CACHE_PATH, HISTORY_CACHE_REFRESH,
+    FIREBASE_COLLECTION_CORRECTIONS, FIREBASE_COLLECTION_SIMULATIONS, FIREBASE_COLLECTION_EXERCISES
+)
+from utils.analytics_engine import HistorialAnalitico
+
+logger = logging.getLogger(__name__)
+
+# Tipo de actividad del motor de analíticas para cada colección
+TIPOS_COLECCION = {
+    FIREBASE_COLLECTION_CORRECTIONS: "correccion",
+    FIREBASE_COLLECTION_SIMULATIONS: "simulacro",
+    FIREBASE_COLLECTION_EXERCISES: "ejercicio",
+}
+
+# Columnas de cada actividad
+COLUMNAS = [
+    ("id", pa.string()),
+    ("fecha", pa.timestamp("ns")),
+    ("fecha_invalida", pa.bool_()),
+    ("tiene_puntuacion", pa.bool_()),
+    ("puntuacion", pa.float64()),
+    ("nivel", pa.string()),
+    ("tiene_tema", pa.bool_()),
+    ("tema", pa.string()),
+]
+
+# Columnas adicionales de las correcciones (errores: una lista por corrección)
+COLUMNAS_CORRECCION = [
+    ("palabras", pa.int32()),
+    ("errores", pa.list_(pa.struct([
+        ("posicion", pa.int32()),
+        ("categoria", pa.string()),
+        ("cantidad", pa.float64()),
+    ]))),
+]
+
+MAX_EJEMPLOS = 5
+
+# Anexos que se acumulan antes de fundirlos en una base nueva
+MAX_ANEXOS = 32
+
+# Colecciones cuyos IDs se mantienen en memoria para las escrituras simultáneas
+MAX_IDS_EN_MEMORIA = 256
+
+# Ficheros temporales abandonados (de procesos que terminaron a medias) que se borran
+MAX_EDAD_TEMPORAL = 3600
+
+_SEGMENTO = re.compile(r"^(\d+)\.arrow$")
+_TEMPORAL = ".tmp-"
+_CADUCADA = "caducada"
+
+def _valor_json(valor):
+    """Valor de texto en forma serializable."""
+    if valor is None or isinstance(valor, (str, int, float, bool)):
+        return valor
+    return str(valor)
+
+def _a_json(valores):
+    """Lista de valores como texto JSON (conserva el tipo al decodificar)."""
+    return [json.dumps(_valor_json(valor), ensure_ascii=False) for valor in valores]
+
+def _decodificar(columna):
+    """
+    Valores de una columna de texto JSON (None donde es nula), decodificando
+    solo una vez cada valor distinto.
+    """
+    if isinstance(columna, pa.ChunkedArray):
+        columna = columna.combine_chunks()
+    codificada = pc.dictionary_encode(columna)
+    valores = np.empty(len(codificada.dictionary) + 1, dtype=object)
+    valores[:-1] = [json.loads(valor) for valor in codificada.dictionary.to_pylist()]
+    # El código -1 (nulo) toma el último elemento (None)
+    return valores[codificada.indices.fill_null(-1).to_numpy()]
+
+def _esquema(tipo):
+    return pa.schema(COLUMNAS + (COLUMNAS_CORRECCION if tipo == "correccion" else []))
+
+class HistoryCache:
+    """
+    Caché columnar en disco del historial de los usuarios, compartida por el proceso.
+    """
+
+    def __init__(self, path=HISTORY_CACHE_PATH, refresh=HISTORY_CACHE_REFRESH):
+        """
+        Inicializa la caché (los directorios se crean al escribir).
+
+        Args:
+            path (str): Directorio raíz de la caché
+            refresh (float): Segundos tras los que una colección se reconstruye
+        """
+        self.path = path
+        self.refresh = refresh
+        self._lock = threading.RLock()
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._thread = None
+        self._ids = OrderedDict()  # directorio -> (números de fichero leídos, IDs)
+
+    # ------------------------------------------------------------------
+    # Ficheros
+    # ------------------------------------------------------------------
+
+    def _raiz(self, uid):
+        return os.path.join(self.path, re.sub(r"[^\w-]", "_", uid))
+
+    def _directorio(self, uid, coleccion):
+        return os.path.join(self._raiz(uid), coleccion)
+
+    @staticmethod
+    def _segmentos(directorio):
+        """Ficheros publicados de una colección: lista de (número, ruta) en orden."""
+        try:
+            nombres = os.listdir(directorio)
+        except FileNotFoundError:
+            return []
+        segmentos = []
+        for nombre in nombres:
+            coincidencia = _SEGMENTO.match(nombre)
+            if coincidencia:
+                segmentos.append((int(coincidencia.group(1)), os.path.join(directorio, nombre)))
+        return sorted(segmentos)
+
+    @staticmethod
+    def _abrir(ruta):
+        """Tabla de un fichero mapeada en memoria y sus metadatos."""
+        tabla = pa.ipc.open_file(pa.memory_map(ruta)).read_all()
+        meta = json.loads((tabla.schema.metadata or {}).get(b"historial", b"{}"))
+        return tabla.replace_schema_metadata(None), meta
+
+    @staticmethod
+    def _publicar(directorio, tabla, meta, minimo=1):
+        """
+        Escribe una tabla en un fichero nuevo con el siguiente número libre.
+
+        Args:
+            directorio (str): Directorio de la colección
+            tabla (pa.Table): Filas a escribir
+            meta (dict): Metadatos del fichero
+            minimo (int): Número mínimo del fichero
+
+        Returns:
+            int: Número del fichero publicado
+        """
+        os.makedirs(directorio, exist_ok=True)
+        temporal = os.path.join(directorio, f"{_TEMPORAL}{uuid.uuid4().hex}")
+        tabla = tabla.replace_schema_metadata({"historial": json.dumps(meta, ensure_ascii=False)})
+        try:
+            with pa.OSFile(temporal, "wb") as salida:
+                with pa.ipc.new_file(salida, tabla.schema) as escritor:
+                    escritor.write_table(tabla)
+            segmentos = HistoryCache._segmentos(directorio)
+            numero = max(minimo, segmentos[-1][0] + 1 if segmentos else 1)
+            while True:
+                try:
+                    # Falla si otro proceso ya publicó ese número: probar el siguiente
+                    os.link(temporal, os.path.join(directorio, f"{numero:010d}.arrow"))
+                    return numero
+                except FileExistsError:
+                    numero += 1
+        finally:
+            try:
+                os.remove(temporal)
+            except FileNotFoundError:
+                pass
+
+    def _limpiar(self, directorio, base, cubre):
+        """Borra los ficheros que ya no usa una base recién publicada."""
+        for nombre in os.listdir(directorio):
+            ruta = os.path.join(directorio, nombre)
+            coincidencia = _SEGMENTO.match(nombre)
+            try:
+                if coincidencia:
+                    numero = int(coincidencia.group(1))
+                    if numero == base:
+                        continue
+                    # Los anexos publicados durante la descarga siguen en uso, y también
+                    # las bases de otras fusiones que cubren más anexos que esta
+                    if numero <= cubre:
+                        os.remove(ruta)
+                    else:
+                        meta = self._abrir(ruta)[1]
+                        if meta.get("tipo") == "base" and meta["cubre"] <= cubre:
+                            os.remove(ruta)
+                elif nombre.startswith(_TEMPORAL):
+                    if time.time() - os.path.getmtime(ruta) > MAX_EDAD_TEMPORAL:
+                        os.remove(ruta)
+                elif nombre != _CADUCADA:
+                    # Restos de formatos anteriores de la caché
+                    shutil.rmtree(ruta) if os.path.isdir(ruta) else os.remove(ruta)
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def _marcar_caducada(directorio):
+        """Marca una colección para reconstruirla aunque no haya pasado HISTORY_CACHE_REFRESH."""
+        temporal = os.path.join(directorio, f"{_TEMPORAL}{uuid.uuid4().hex}")
+        with open(temporal, "w", encoding="utf-8") as f:
+            f.write(repr(time.time()))
+        os.replace(temporal, os.path.join(directorio, _CADUCADA))
+
+    @staticmethod
+    def _caducada_desde(directorio):
+        try:
+            with open(os.path.join(directorio, _CADUCADA), encoding="utf-8") as f:
+                return float(f.read())
+        except (OSError, ValueError):
+            return None
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _tabla(tipo, columnas, ids):
+        """
+        Convierte las columnas del motor (en orden de fecha descendente) en la
+        tabla que se escribe (en orden ascendente).
+
+        Returns:
+            tuple: (pa.Table, metadatos de ejemplos y tipo de las cantidades)
+        """
+        n = len(columnas["fecha"])
+        inverso = slice(None, None, -1)
+
+        def invertida(nombre, dtype=None):
+            return np.ascontiguousarray(np.asarray(columnas[nombre], dtype=dtype)[inverso])
+
+        tiene_tema = invertida("tiene_tema", bool)
+        datos = {
+            "id": pa.array(list(ids)[inverso], pa.string()),
+            "fecha": pa.array(invertida("fecha", "datetime64[ns]").view(np.int64)).cast(pa.timestamp("ns")),
+            "fecha_invalida": pa.array(invertida("fecha_invalida", bool)),
+            "tiene_puntuacion": pa.array(invertida("tiene_puntuacion", bool)),
+            "puntuacion": pa.array(invertida("puntuacion", float)),
+            "nivel": pa.array(_a_json(invertida("nivel", object)), pa.string()),
+            "tiene_tema": pa.array(tiene_tema),
+            "tema": pa.array(
+                [texto if tiene else None for texto, tiene in zip(_a_json(invertida("tema", object)), tiene_tema)],
+                pa.string()
+            ),
+        }
+        meta = {}
+        if tipo == "correccion":
+            datos["palabras"] = pa.array(invertida("palabras", np.int32))
+
+            # Errores agrupados por fila (ya en orden ascendente) y posición
+            tabla = columnas["errores"]
+            fila = n - 1 - tabla["fila"].to_numpy(dtype=np.int64)
+            orden = np.lexsort((tabla["posicion"].to_numpy(), fila))
+            tabla = tabla.iloc[orden]
+            desplazamientos = np.concatenate([[0], np.cumsum(np.bincount(fila[orden], minlength=n))])
+            errores = pa.StructArray.from_arrays([
+                pa.array(tabla["posicion"].to_numpy(dtype=np.int32)),
+                pa.array(_a_json(tabla["categoria"].tolist()), pa.string()),
+                pa.array(tabla["cantidad"].to_numpy(dtype=float)),
+            ], fields=list(COLUMNAS_CORRECCION[1][1].value_type))
+            datos["errores"] = pa.ListArray.from_arrays(pa.array(desplazamientos, pa.int32()), errores)
+
+            meta["cantidad_entera"] = bool(tabla["cantidad"].dtype.kind in "iub")
+            meta["ejemplos"] = [
+                [_valor_json(categoria), [_valor_json(e) for e in ejemplos][:MAX_EJEMPLOS]]
+                for categoria, ejemplos in columnas["ejemplos"].items()
+            ]
+        return pa.table(datos, schema=_esquema(tipo)), meta
+
+    def checkpoint(self, uid):
+        """
+        Estado de la caché de un usuario antes de descargar su historial; se
+        pasa a rebuild() para conservar lo que se añada durante la descarga.
+
+        Args:
+            uid (str): ID del usuario
+
+        Returns:
+            dict: Momento de inicio y último fichero de cada colección
+        """
+        inicio = time.time()
+        cubre = {}
+        for coleccion in TIPOS_COLECCION:
+            segmentos = self._segmentos(self._directorio(uid, coleccion))
+            cubre[coleccion] = segmentos[-1][0] if segmentos else 0
+        return {"inicio": inicio, "cubre": cubre}
+
+    def rebuild(self, uid, correcciones, simulacros, ejercicios, caducadas=(), checkpoint=None):
+        """
+        Reconstruye la caché de un usuario a partir de su historial completo.
+
+        Args:
+            uid (str): ID del usuario
+            correcciones (list): Correcciones (en el orden de listar_historial)
+            simulacros (list): Simulacros
+            ejercicios (list): Ejercicios
+            caducadas (set): Colecciones que no se pudieron descargar; se guardan
+                ya caducadas para reconstruirlas en la próxima lectura
+            checkpoint (dict, opcional): Resultado de checkpoint() tomado antes
+                de descargar las listas (por defecto, el estado actual)
+
+        Returns:
+            HistorialAnalitico: Historial construido con esas listas
+        """
+        checkpoint = checkpoint or self.checkpoint(uid)
+        historial = HistorialAnalitico(correcciones, simulacros, ejercicios)
+        documentos = {
+            FIREBASE_COLLECTION_CORRECTIONS: correcciones,
+            FIREBASE_COLLECTION_SIMULATIONS: simulacros,
+            FIREBASE_COLLECTION_EXERCISES: ejercicios,
+        }
+        for coleccion, tipo in TIPOS_COLECCION.items():
+            directorio = self._directorio(uid, coleccion)
+            try:
+                tabla, meta = self._tabla(tipo, historial.columnas(tipo),
+                                          [doc.get("id") for doc in documentos[coleccion]])
+                meta.update({
+                    "tipo": "base",
+                    "construido": 0 if coleccion in caducadas else time.time(),
+                    "inicio": checkpoint["inicio"],
+                    "cubre": checkpoint["cubre"][coleccion],
+                })
+                self._publicar_base(directorio, tabla, meta)
+            except (OSError, pa.ArrowException) as e:
+                logger.error(f"No se pudo reconstruir la caché de {coleccion} de {uid}: {e}")
+        return historial
+
+    def _publicar_base(self, directorio, tabla, meta):
+        # Siempre por encima de lo que cubre, aunque el directorio se haya borrado entretanto
+        base = self._publicar(directorio, tabla, meta, minimo=meta["cubre"] + 1)
+        self._limpiar(directorio, base, meta["cubre"])
+        with self._lock:
+            self._ids.pop(directorio, None)
+
+    def _ids_de(self, directorio, segmentos):
+        """
+        IDs de una colección; de cada fichero solo se leen una vez por proceso.
+        Requiere self._lock.
+        """
+        leidos, ids = self._ids.get(directorio, (set(), set()))
+        numeros = {numero for numero, _ in segmentos}
+        if not leidos <= numeros:
+            # Se fundieron o reconstruyeron ficheros: volver a leerlos todos
+            leidos, ids = set(), set()
+        for numero, ruta in segmentos:
+            if numero not in leidos:
+                columna = pa.ipc.open_file(pa.memory_map(ruta)).read_all().column("id")
+                ids.update(doc_id for doc_id in columna.to_pylist() if doc_id)
+                leidos.add(numero)
+        self._ids[directorio] = (leidos, ids)
+        self._ids.move_to_end(directorio)
+        while len(self._ids) > MAX_IDS_EN_MEMORIA:
+            self._ids.popitem(last=False)
+        return leidos, ids
+
+    def append(self, uid, coleccion, doc_id, datos):
+        """
+        Añade una actividad recién guardada (escritura simultánea). Si la
+        colección aún no está en caché no se hace nada: se construirá completa
+        en la primera lectura.
+
+        Args:
+            uid (str): ID del usuario
+            coleccion (str): Colección de la actividad
+            doc_id (str): ID del documento
+            datos (dict): Contenido del documento
+        """
+        tipo = TIPOS_COLECCION.get(coleccion)
+        if not uid or tipo is None or not isinstance(datos, dict):
+            return
+
+        directorio = self._directorio(uid, coleccion)
+        try:
+            for _ in range(3):
+                segmentos = self._segmentos(directorio)
+                if not segmentos:
+                    return
+                try:
+                    with self._lock:
+                        leidos, ids = self._ids_de(directorio, segmentos)
+                    break
+                except FileNotFoundError:
+                    # Otro proceso fundió los ficheros mientras se leían: volver a listarlos
+                    continue
+            else:
+                raise OSError("los ficheros cambian mientras se leen")
+
+            if doc_id and doc_id in ids:
+                # Documento reescrito: se reconstruye la colección entera en la próxima lectura
+                self._marcar_caducada(directorio)
+                return
+
+            documentos = {tipo: [datos]}
+            historial = HistorialAnalitico(
+                documentos.get("correccion"), documentos.get("simulacro"), documentos.get("ejercicio")
+            )
+            tabla, meta = self._tabla(tipo, historial.columnas(tipo), [doc_id])
+            meta["tipo"] = "anexo"
+            numero = self._publicar(directorio, tabla, meta)
+            while self._absorbido(directorio, numero):
+                # El número era de un anexo ya fundido y borrado: la base que lo
+                # cubre ignoraría este, así que se publica con otro número
+                try:
+                    os.remove(os.path.join(directorio, f"{numero:010d}.arrow"))
+                except FileNotFoundError:
+                    pass
+                numero = self._publicar(directorio, tabla, meta, minimo=numero + 1)
+            with self._lock:
+                leidos.add(numero)
+                if doc_id:
+                    ids.add(doc_id)
+
+            if len(segmentos) >= MAX_ANEXOS:
+                self._fundir(directorio, tipo)
+        except (OSError, ValueError, KeyError, pa.ArrowException) as e:
+            logger.error(f"No se pudo añadir {doc_id} a la caché de {coleccion} de {uid}: {e}")
+            # Le falta la actividad: reconstruirla sin borrar la copia que usan otros procesos
+            try:
+                self._marcar_caducada(directorio)
+            except OSError:
+                self.invalidate(uid)
+
+    def _absorbido(self, directorio, numero):
+        """Si alguna base publicada cubre el número de un anexo recién publicado."""
+        for otro, ruta in self._segmentos(directorio):
+            if otro > numero:
+                try:
+                    meta = self._abrir(ruta)[1]
+                except FileNotFoundError:
+                    continue
+                if meta.get("tipo") == "base" and meta["cubre"] >= numero:
+                    return True
+        return False
+
+    def _fundir(self, directorio, tipo):
+        """Funde la base y sus anexos en una base nueva."""
+        try:
+            tabla, meta = self._leer_coleccion(directorio)
+        except FileNotFoundError:
+            # Otro proceso los está fundiendo a la vez
+            return
+        if tabla is None:
+            return
+        meta = {
+            "tipo": "base",
+            "construido": meta["construido"],
+            "inicio": meta["inicio"],
+            "cubre": meta["ultimo"],
+            "cantidad_entera": meta["cantidad_entera"],
+            "ejemplos": meta["ejemplos"],
+        }
+        self._publicar_base(directorio, tabla, meta)
+
+    def invalidate(self, uid):
+        """Elimina la caché de un usuario (se reconstruirá en la próxima lectura)."""
+        raiz = self._raiz(uid)
+        with self._lock:
+            for coleccion in TIPOS_COLECCION:
+                self._ids.pop(os.path.join(raiz, coleccion), None)
+        shutil.rmtree(raiz, ignore_errors=True)
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+
+    def _leer_coleccion(self, directorio):
+        """
+        Base de una colección que cubre más anexos y los anexos publicados después.
+
+        Returns:
+            tuple: (pa.Table en orden ascendente, metadatos combinados), o
+                (None, None) si la colección no está en caché
+        """
+        segmentos = self._segmentos(directorio)
+        # Vale la base que cubre más anexos: dos fusiones simultáneas pueden
+        # publicar primero la que cubre más. Una base siempre lleva un número
+        # mayor que lo que cubre, así que por debajo de eso no hay otra mejor.
+        abiertos = {}
+        base_numero = None
+        for numero, ruta in reversed(segmentos):
+            if base_numero is not None and numero <= meta["cubre"]:
+                break
+            tabla, meta_fichero = self._abrir(ruta)
+            abiertos[numero] = (tabla, meta_fichero)
+            if meta_fichero.get("tipo") == "base" and (base_numero is None or meta_fichero["cubre"] > meta["cubre"]):
+                base_numero, base, meta = numero, tabla, meta_fichero
+        if base_numero is None:
+            return None, None
+
+        tablas, metas = [base], [meta]
+        anexos = [
+            abiertos[numero] for numero in sorted(abiertos)
+            if numero > meta["cubre"] and abiertos[numero][1].get("tipo") == "anexo"
+        ]
+        if anexos:
+            # Un anexo puede estar ya en la base (publicado durante la descarga o
+            # fundido por otro proceso antes de volver a publicarse): se descarta
+            ids = pa.concat_tables([anexo for anexo, _ in anexos]).column("id")
+            repetidos = pc.fill_null(pc.is_in(ids, value_set=base.column("id")), False).to_pylist()
+            vistos = set()
+            for (anexo, meta_anexo), doc_id, repetido in zip(anexos, ids.to_pylist(), repetidos):
+                if repetido or (doc_id and doc_id in vistos):
+                    continue
+                vistos.add(doc_id)
+                tablas.append(anexo)
+                metas.append(meta_anexo)
+
+        # Los ejemplos más recientes van delante
+        ejemplos = {}
+        for meta_tabla in reversed(metas):
+            for categoria, lista in meta_tabla.get("ejemplos", []):
+                ejemplos[categoria] = (ejemplos.get(categoria, []) + lista)[:MAX_EJEMPLOS]
+        combinados = {
+            "construido": meta.get("construido", 0),
+            "inicio": meta.get("inicio", 0),
+            "ultimo": segmentos[-1][0],
+            "cantidad_entera": all(m.get("cantidad_entera", True) for m in metas),
+            "ejemplos": [[categoria, lista] for categoria, lista in ejemplos.items()],
+        }
+        return pa.concat_tables(tablas), combinados
+
+    def _cargar_coleccion(self, uid, coleccion):
+        """
+        Columnas de una colección en el formato de HistorialAnalitico.columnas().
+
+        Returns:
+            tuple: (columnas, meta), o (None, None) si la colección no está en caché
+        """
+        tipo = TIPOS_COLECCION[coleccion]
+        tabla, meta = self._leer_coleccion(self._directorio(uid, coleccion))
+        if tabla is None:
+            return None, None
+
+        n = tabla.num_rows
+        # Orden de listar_historial: de la más reciente a la más antigua
+        columnas = {
+            "fecha": tabla.column("fecha").to_numpy()[::-1],
+            "nivel": _decodificar(tabla.column("nivel"))[::-1],
+            "tema": _decodificar(tabla.column("tema"))[::-1],
+        }
+        for nombre in ("fecha_invalida", "tiene_puntuacion", "puntuacion", "tiene_tema"):
+            columnas[nombre] = tabla.column(nombre).to_numpy()[::-1]
+
+        if tipo == "correccion":
+            columnas["palabras"] = tabla.column("palabras").to_numpy()[::-1]
+            listas = tabla.column("errores").combine_chunks()
+            posicion, categoria, cantidad = pc.list_flatten(listas).flatten()
+            fila = n - 1 - pc.list_parent_indices(listas).to_numpy()
+            posicion = posicion.to_numpy()
+            orden = np.lexsort((posicion, fila))
+            cantidad = cantidad.to_numpy()[orden]
+            columnas["errores"] = pd.DataFrame({
+                "fila": fila[orden].astype(int),
+                "posicion": posicion[orden].astype(int),
+                "categoria": _decodificar(categoria)[orden],
+                "cantidad": cantidad.astype(np.int64) if meta["cantidad_entera"] else cantidad,
+            })
+            columnas["ejemplos"] = {categoria: lista for categoria, lista in meta["ejemplos"]}
+        return columnas, meta
+
+    def load(self, uid, ahora=None):
+        """
+        Historial de un usuario desde la caché. Si alguna colección ha caducado
+        se programa su reconstrucción y se devuelve la copia actual.
+
+        Args:
+            uid (str): ID del usuario
+            ahora (datetime, opcional): Momento de referencia para los periodos
+
+        Returns:
+            HistorialAnalitico: Historial, o None si el usuario no está en caché
+        """
+        columnas = {}
+        caducada = False
+        for _ in range(3):
+            try:
+                for coleccion, tipo in TIPOS_COLECCION.items():
+                    columnas[tipo], meta = self._cargar_coleccion(uid, coleccion)
+                    if meta is None:
+                        return None
+                    marcada = self._caducada_desde(self._directorio(uid, coleccion))
+                    caducada = caducada or time.time() - meta["construido"] > self.refresh or \
+                        (marcada is not None and marcada >= meta["inicio"])
+                break
+            except FileNotFoundError:
+                # Otro proceso fundió los ficheros mientras se leían: volver a listarlos
+                continue
+            except (OSError, ValueError, KeyError, IndexError, pa.ArrowException) as e:
+                logger.error(f"Caché de historial de {uid} ilegible: {e}")
+                return None
+        else:
+            return None
+
+        if caducada:
+            self.schedule_rebuild(uid)
+        return HistorialAnalitico.desde_columnas(columnas, ahora=ahora)
+
+    def schedule_rebuild(self, uid):
+        """
+        Encola la reconstrucción de la caché de un usuario.
+
+        Returns:
+            bool: True si se encoló, False si ya estaba pendiente
+        """
+        with self._lock:
+            if uid in self._pending:
+                return False
+            self._pending.add(uid)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._worker, name="history-cache", daemon=True)
+                self._thread.start()
+        self._queue.put(uid)
+        return True
+
+    def _worker(self):
+        while True:
+            uid = self._queue.get()
+            try:
+                # Lectura directa de Firestore: si falla se conserva la copia actual
+                checkpoint = self.checkpoint(uid)
+                self.rebuild(uid, *descargar_historial(uid, estricto=True), checkpoint=checkpoint)
+                logger.debug(f"Caché de historial reconstruida para {uid}")
+            except Exception as e:
+                logger.warning(f"No se pudo reconstruir la caché de historial de {uid}: {e}")
+            finally:
+                with self._lock:
+                    self._pending.discard(uid)
+                self._queue.task_done()
+
+def descargar_historial(uid, estricto=False, fallidas=None):
+    """
+    Correcciones, simulacros y ejercicios completos de un usuario.
+
+    Args:
+        uid (str): ID del usuario
+        estricto (bool): Si es True se leen de Firestore y los errores se
+            propagan; si no, se leen en paralelo con listar_historial (desde el
+            espejo local si está sincronizado) y una colección fallida (error o
+            tiempo agotado) queda vacía
+        fallidas (set, opcional): Recibe las colecciones fallidas (modo no estricto)
+
+    Returns:
+        tuple: (correcciones, simulacros, ejercicios)
+    """
+    # Importar dinámicamente para evitar dependencias circulares
+    from core.fetch_coordinator import FetchCoordinator
+    from core.firebase_client import listar_historial, load_mirror_collection
+
+    if estricto:
+        return tuple(load_mirror_collection(uid, coleccion) for coleccion in TIPOS_COLECCION)
+
+    datos = FetchCoordinator()
+    for coleccion in TIPOS_COLECCION:
+        datos.submit(coleccion, listar_historial, uid, coleccion, estricto=True)
+    resultados = {}
+    for coleccion, resultado, error in datos.as_completed():
+        resultados[coleccion] = resultado if error is None else []
+        if error is not None and fallidas is not None:
+            fallidas.add(coleccion)
+    return tuple(resultados[coleccion] for coleccion in TIPOS_COLECCION)
+
+def get_history(uid):
+    """
+    Historial analítico de un usuario: desde la caché columnar o, la primera
+    vez, descargándolo y guardándolo en ella.
+
+    Args:
+        uid (str): ID del usuario
+
+    Returns:
+        HistorialAnalitico: Historial del usuario
+    """
+    historial = history_cache.load(uid)
+    if historial is None:
+        # Una colección que no se pudo descargar se sirve vacía esta vez y se
+        # guarda caducada para que la próxima lectura la reconstruya
+        checkpoint = history_cache.checkpoint(uid)
+        fallidas = set()
+        historial = history_cache.rebuild(uid, *descargar_historial(uid, fallidas=fallidas),
+                                          caducadas=fallidas, checkpoint=checkpoint)
+    return historial
+
+# Instancia global compartida por todas las sesiones
+history_cache = HistoryCache()
@@ -8,13 +8,309 @@ JSON de respuestas de modelos de lenguaje, con énfasis en la recuperación
 y reparación de estructuras JSON parciales o mal formateadas.
 """
 
+import copy
 import json
 import re
 import logging
 import traceback
 
+from core.correction_schema import validate_correction_result, normalizar_claves
+
 logger = logging.getLogger(__name__)
 
+# Caracteres que interrumpen el escaneo rápido dentro y fuera de cadenas
+_ESPECIALES_CADENA = re.compile(r'["\\]')
+_ESTRUCTURALES = re.compile(r'["{}\[\],:]')
+
+# Respuesta mínima cuando no hay JSON recuperable en el contenido
+_RESPUESTA_FALLBACK = {
+    "texto_corregido": "No se pudo procesar la respuesta correctamente.",
+    "errores": {
+        "Gramática": [],
+        "Léxico": [],
+        "Puntuación": [],
+        "Estructura textual": []
+    },
+    "analisis_contextual": {
+        "coherencia": {"puntuacion": 5, "comentario": "No disponible"},
+        "cohesion": {"puntuacion": 5, "comentario": "No disponible"},
+        "registro_linguistico": {"puntuacion": 5, "comentario": "No disponible"},
+        "adecuacion_cultural": {"puntuacion": 5, "comentario": "No disponible"}
+    },
+    "consejo_final": "Hubo un problema al procesar la respuesta. Por favor, intenta nuevamente."
+}
+
+
+class IncrementalJSONExtractor:
+    """
+    Extractor de JSON de una sola pasada, alimentado por fragmentos.
+    
+    Recorre el contenido una única vez con una máquina de estados que conoce
+    llaves, corchetes y cadenas (incluidos los escapes), de modo que el texto
+    que rodea al JSON, como los bloques de código markdown o la prosa del
+    asistente, se ignora sin escaneos adicionales. Admite contenido recibido
+    en streaming mediante llamadas sucesivas a feed(), y al final repara las
+    respuestas truncadas cerrando las estructuras que quedaron abiertas.
+    
+    Uso:
+        extractor = IncrementalJSONExtractor()
+        for fragmento in stream:
+            extractor.feed(fragmento)
+            parcial = extractor.snapshot()
+        resultado = extractor.finish()
+    """
+    
+    def __init__(self):
+        self._texto = ""
+        self._pos = 0
+        self._resultado = None
+        self._longitud_resultado = 0
+        self._reiniciar_objeto()
+    
+    def _reiniciar_objeto(self):
+        """Reinicia el estado del objeto de nivel superior en curso."""
+        self._inicio = -1
+        # Cada marco es [cierre, fase]; fases: clave, puntos, valor, coma
+        self._pila = []
+        self._en_cadena = False
+        self._cadena_es_clave = False
+        self._escape = False
+        self._primitivo_fin = -1
+        self._ultima_coma = -1
+        self._comas_sobrantes = []
+        self._corte = (-1, "")
+    
+    @property
+    def complete(self):
+        """bool: True si ya se extrajo al menos un objeto JSON completo."""
+        return self._resultado is not None
+    
+    def feed(self, chunk):
+        """
+        Añade un fragmento de contenido y avanza el escaneo.
+        
+        Args:
+            chunk (str): Fragmento de texto recibido
+        """
+        if not chunk:
+            return
+        self._texto += chunk
+        self._escanear()
+    
+    def snapshot(self):
+        """
+        Devuelve la mejor estructura disponible sin cerrar el extractor.
+        
+        Returns:
+            dict: Objeto completo ya extraído, el objeto en curso reparado
+                  o None si todavía no hay nada utilizable
+        """
+        en_curso = len(self._texto) - self._inicio
+        if self._inicio >= 0 and (self._resultado is None or en_curso > self._longitud_resultado):
+            parcial = self._reparar()
+            if parcial is not None:
+                return parcial
+        return self._resultado
+    
+    def finish(self):
+        """
+        Finaliza la extracción reparando, si es necesario, el objeto truncado.
+        
+        Returns:
+            dict: Objeto JSON extraído o None si no se encontró ninguno
+        """
+        return self.snapshot()
+    
+    def _escanear(self):
+        """Avanza la máquina de estados desde la última posición procesada."""
+        texto = self._texto
+        n = len(texto)
+        i = self._pos
+        
+        while i < n:
+            # Fuera de cualquier objeto: saltar directamente a la siguiente llave
+            if self._inicio < 0:
+                i = texto.find('{', i)
+                if i < 0:
+                    i = n
+                    break
+                self._inicio = i
+                self._pila.append(['}', 'clave'])
+                self._corte = (i + 1, '}')
+                i += 1
+                continue
+            
+            # Dentro de una cadena: saltar hasta la siguiente comilla o escape
+            if self._en_cadena:
+                if self._escape:
+                    self._escape = False
+                    i += 1
+                    continue
+                m = _ESPECIALES_CADENA.search(texto, i)
+                if not m:
+                    i = n
+                    break
+                i = m.start()
+                if texto[i] == '\\':
+                    self._escape = True
+                    i += 1
+                    continue
+                # Cierre de cadena
+                self._en_cadena = False
+                marco = self._pila[-1]
+                if self._cadena_es_clave:
+                    marco[1] = 'puntos'
+                else:
+                    marco[1] = 'coma'
+                    self._marcar_corte(i + 1)
+                i += 1
+                continue
+            
+            # Dentro de un objeto, fuera de cadenas
+            m = _ESTRUCTURALES.search(texto, i)
+            fin_hueco = m.start() if m else n
+            if fin_hueco > i and self._pila[-1][1] == 'valor':
+                # Número, true, false o null entre dos signos estructurales
+                hueco = texto[i:fin_hueco].rstrip()
+                if hueco.strip():
+                    self._primitivo_fin = i + len(hueco)
+                    self._ultima_coma = -1
+            if not m:
+                i = n
+                break
+            i = fin_hueco
+            c = texto[i]
+            
+            if c == '"':
+                marco = self._pila[-1]
+                self._cadena_es_clave = marco[0] == '}' and marco[1] == 'clave'
+                self._en_cadena = True
+                self._ultima_coma = -1
+            elif c == ':':
+                self._pila[-1][1] = 'valor'
+            elif c == ',':
+                self._cerrar_primitivo()
+                marco = self._pila[-1]
+                marco[1] = 'clave' if marco[0] == '}' else 'valor'
+                self._ultima_coma = i
+            elif c in '{[':
+                self._ultima_coma = -1
+                self._pila.append(['}', 'clave'] if c == '{' else [']', 'valor'])
+                self._marcar_corte(i + 1)
+            else:
+                # Cierre de objeto o lista
+                self._cerrar_primitivo()
+                if self._ultima_coma >= 0:
+                    self._comas_sobrantes.append(self._ultima_coma)
+                    self._ultima_coma = -1
+                self._pila.pop()
+                if not self._pila:
+                    self._registrar_candidato(i + 1)
+                    i += 1
+                    continue
+                self._pila[-1][1] = 'coma'
+                self._marcar_corte(i + 1)
+            i += 1
+        
+        self._pos = i
+    
+    def _cerrar_primitivo(self):
+        """Registra como completo el valor primitivo pendiente, si lo hay."""
+        if self._primitivo_fin >= 0:
+            self._pila[-1][1] = 'coma'
+            self._marcar_corte(self._primitivo_fin)
+            self._primitivo_fin = -1
+    
+    def _marcar_corte(self, posicion):
+        """Recuerda la última posición donde el JSON puede cerrarse de forma válida."""
+        self._corte = (posicion, "".join(marco[0] for marco in reversed(self._pila)))
+    
+    def _componer(self, fin, sufijo=""):
+        """Construye el texto del objeto en curso omitiendo comas sobrantes."""
+        partes = []
+        desde = self._inicio
+        for coma in self._comas_sobrantes:
+            if coma >= fin:
+                break
+            partes.append(self._texto[desde:coma])
+            desde = coma + 1
+        partes.append(self._texto[desde:fin])
+        partes.append(sufijo)
+        return "".join(partes)
+    
+    def _cargar(self, texto_json):
+        """Intenta parsear un candidato; devuelve None si no es JSON válido."""
+        try:
+            return json.loads(texto_json, strict=False)
+        except json.JSONDecodeError:
+            return None
+    
+    def _registrar_candidato(self, fin):
+        """Parsea un objeto de nivel superior completo y conserva el más largo."""
+        longitud = fin - self._inicio
+        resultado = self._cargar(self._componer(fin))
+        if resultado is not None and longitud > self._longitud_resultado:
+            self._resultado = resultado
+            self._longitud_resultado = longitud
+        self._reiniciar_objeto()
+    
+    def _reparar(self):
+        """Cierra las estructuras abiertas del objeto en curso (respuesta truncada)."""
+        fin = len(self._texto)
+        # 1. Conservar todo lo recibido cerrando la cadena de valor abierta
+        if not self._en_cadena or not self._cadena_es_clave:
+            marco = self._pila[-1]
+            clave_sin_valor = (not self._en_cadena and marco[0] == '}'
+                               and marco[1] in ('puntos', 'valor') and self._primitivo_fin < 0)
+            if not clave_sin_valor:
+                fin_texto = fin - 1 if self._escape else fin
+                sufijo = '"' if self._en_cadena else ''
+                if not self._en_cadena and self._ultima_coma >= 0:
+                    fin_texto = self._ultima_coma
+                sufijo += "".join(m[0] for m in reversed(self._pila))
+                resultado = self._cargar(self._componer(fin_texto, sufijo))
+                if resultado is not None:
+                    return resultado
+        
+        # 2. Recortar hasta el último valor completo y cerrar desde ahí
+        corte, cierres = self._corte
+        if corte < 0:
+            return None
+        return self._cargar(self._componer(corte, cierres))
+
+
+def extract_json_object(content):
+    """
+    Extrae el objeto JSON de una respuesta sin aplicar estructuras por defecto.
+    
+    Args:
+        content (str): Contenido que puede incluir JSON
+        
+    Returns:
+        dict: JSON extraído (reparado si estaba truncado) o None si no hay JSON
+    """
+    if not content:
+        return None
+    
+    # Caso habitual con response_format json_object: el contenido ya es JSON
+    try:
+        return json.loads(content, strict=False)
+    except json.JSONDecodeError:
+        pass
+    
+    extractor = IncrementalJSONExtractor()
+    extractor.feed(content)
+    result = extractor.finish()
+    
+    # Respuestas con comillas simples al estilo de diccionario Python
+    if result is None and "'" in content and '"' not in content:
+        extractor = IncrementalJSONExtractor()
+        extractor.feed(content.replace("'", '"'))
+        result = extractor.finish()
+    
+    return result
+
+
 def extract_json_safely(content):
     """
     Extrae JSON válido de una cadena de texto con manejo de errores mejorado y reparación.
@@ -35,173 +331,14 @@ def extract_json_safely(content):
     logger.info(f"Intentando extraer JSON del contenido. Vista previa: {preview}")
     
     try:
-        # 1. Primero intentar parsear directamente todo el contenido
-        try:
-            return json.loads(content)
-        except json.JSONDecodeError as e:
-            logger.debug(f"No se pudo parsear directamente como JSON: {str(e)}")
-            # Mostrar detalles del error para diagnóstico
-            error_position = e.pos
-            error_line, error_column = 0, 0
-            lines = content[:error_position].splitlines()
-            if lines:
-                error_line = len(lines)
-                error_column = len(lines[-1]) + 1
-            context_start = max(0, error_position - 20)
-            context_end = min(len(content), error_position + 20)
-            error_context = content[context_start:context_end]
-            logger.debug(f"Error JSON en línea {error_line}, columna {error_column}: '{error_context}'")
-        
-        # 2. Buscar bloques de código JSON con formato markdown
-        # 2.1 Buscar bloques de código con etiqueta json explícita
-        json_code_blocks = re.findall(r'```json\s*([\s\S]*?)```', content)
-        if json_code_blocks:
-            logger.info(f"Encontrados {len(json_code_blocks)} bloques de código JSON explícitos")
-            for i, block in enumerate(json_code_blocks):
-                try:
-                    result = json.loads(block.strip())
-                    logger.info(f"✅ Éxito: JSON extraído del bloque de código JSON explícito #{i+1}")
-                    return result
-                except json.JSONDecodeError as e:
-                    logger.debug(f"Bloque JSON explícito #{i+1} no es JSON válido: {str(e)}")
-        
-        # 2.2 Buscar bloques de código genéricos que podrían contener JSON
-        generic_code_blocks = re.findall(r'```\s*([\s\S]*?)```', content)
-        if generic_code_blocks:
-            logger.info(f"Encontrados {len(generic_code_blocks)} bloques de código genéricos")
-            for i, block in enumerate(generic_code_blocks):
-                try:
-                    # Verificar si el bloque empieza con '{'
-                    if block.strip().startswith('{'):
-                        result = json.loads(block.strip())
-                        logger.info(f"✅ Éxito: JSON extraído del bloque de código genérico #{i+1}")
-                        return result
-                except json.JSONDecodeError as e:
-                    logger.debug(f"Bloque genérico #{i+1} no es JSON válido: {str(e)}")
-        
-        # 3. Buscar entre llaves (más común para respuestas en formato JSON)
-        json_pattern = r'{[\s\S]*}'
-        match = re.search(json_pattern, content)
-        if match:
-            try:
-                json_str = match.group(0)
-                result = json.loads(json_str)
-                logger.info("✅ Éxito: JSON extraído con regex de llaves")
-                return result
-            except json.JSONDecodeError as e:
-                logger.debug(f"El contenido entre llaves no es JSON válido: {str(e)}")
-                
-                # Intentar limpiar y reparar el JSON
-                cleaned_json = re.sub(r'[\x00-\x1F\x7F-\x9F]', '', json_str)
-                # Reemplazar comillas simples por dobles si hay problema de comillas
-                if "'" in cleaned_json and '"' not in cleaned_json:
-                    cleaned_json = cleaned_json.replace("'", '"')
-                # Intentar parsear de nuevo
-                try:
-                    result = json.loads(cleaned_json)
-                    logger.info("✅ Éxito: JSON extraído después de limpieza")
-                    return result
-                except json.JSONDecodeError:
-                    logger.debug("La limpieza básica no fue suficiente")
-                    
-                    # Intentar reparaciones más agresivas
-                    # 1. Cerrar llaves/corchetes desbalanceados
-                    open_braces = cleaned_json.count('{')
-                    close_braces = cleaned_json.count('}')
-                    open_brackets = cleaned_json.count('[')
-                    close_brackets = cleaned_json.count(']')
-                    
-                    if open_braces > close_braces:
-                        # Faltan llaves de cierre
-                        cleaned_json += '}' * (open_braces - close_braces)
-                    
-                    if open_brackets > close_brackets:
-                        # Faltan corchetes de cierre
-                        cleaned_json += ']' * (open_brackets - close_brackets)
-                    
-                    # 2. Corregir comas finales en listas/objetos
-                    cleaned_json = re.sub(r',\s*}', '}', cleaned_json)
-                    cleaned_json = re.sub(r',\s*]', ']', cleaned_json)
-                    
-                    # Intentar parsear de nuevo
-                    try:
-                        result = json.loads(cleaned_json)
-                        logger.info("✅ Éxito: JSON extraído después de reparación estructural")
-                        return result
-                    except json.JSONDecodeError:
-                        logger.debug("La reparación estructural no fue suficiente")
-        
-        # 4. MÉTODO ESPECÍFICO para respuestas de corrección ELE
-        # Buscar estructura específica basada en las claves esperadas para correcciones
-        expected_keys = ["saludo", "tipo_texto", "errores", "texto_corregido", "analisis_contextual", "consejo_final"]
-        
-        # Si encontramos un patrón que parece incluir muchas de estas claves, intentar extraerlas manualmente
-        key_matches = [re.search(fr'["\']({key})["\']', content) is not None for key in expected_keys]
-        if sum(key_matches) >= 3:  # Si al menos 3 claves están presentes
-            logger.info(f"Detectada estructura de corrección ELE. Intentando reconstrucción manual.")
-            
-            # Construir un JSON mínimo viable con las claves que podamos encontrar
-            manual_json = {}
-            
-            # Extraer texto corregido
-            texto_corregido_match = re.search(r'["\']texto_corregido["\']\s*:\s*["\']([^"\']*)["\']', content)
-            if texto_corregido_match:
-                manual_json["texto_corregido"] = texto_corregido_match.group(1)
-            
-            # Extraer saludo
-            saludo_match = re.search(r'["\']saludo["\']\s*:\s*["\']([^"\']*)["\']', content)
-            if saludo_match:
-                manual_json["saludo"] = saludo_match.group(1)
-            
-            # Extraer tipo_texto
-            tipo_texto_match = re.search(r'["\']tipo_texto["\']\s*:\s*["\']([^"\']*)["\']', content)
-            if tipo_texto_match:
-                manual_json["tipo_texto"] = tipo_texto_match.group(1)
-            
-            # Extraer consejo_final
-            consejo_match = re.search(r'["\']consejo_final["\']\s*:\s*["\']([^"\']*)["\']', content)
-            if consejo_match:
-                manual_json["consejo_final"] = consejo_match.group(1)
-                
-            # Estructura mínima para errores
-            manual_json["errores"] = {
-                "Gramática": [],
-                "Léxico": [],
-                "Puntuación": [],
-                "Estructura textual": []
-            }
-            
-            # Estructura mínima para análisis contextual
-            manual_json["analisis_contextual"] = {
-                "coherencia": {"puntuacion": 5, "comentario": "Extracción manual"},
-                "cohesion": {"puntuacion": 5, "comentario": "Extracción manual"},
-                "registro_linguistico": {"puntuacion": 5, "comentario": "Extracción manual"},
-                "adecuacion_cultural": {"puntuacion": 5, "comentario": "Extracción manual"},
-            }
-            
-            logger.info("✅ Creada estructura JSON mínima mediante reconstrucción manual")
-            return manual_json
+        result = extract_json_object(content)
+        if result is not None:
+            logger.info("✅ Éxito: JSON extraído del contenido")
+            return result
         
-        # 5. Si todo falla, devolver un JSON mínimo para evitar errores
-        logger.warning("No se pudo extraer JSON válido del contenido después de múltiples intentos")
-        
-        # Proporcionar un objeto de respuesta mínimo que evite errores posteriores
-        return {
-            "texto_corregido": "No se pudo procesar la respuesta correctamente.",
-            "errores": {
-                "Gramática": [],
-                "Léxico": [],
-                "Puntuación": [],
-                "Estructura textual": []
-            },
-            "analisis_contextual": {
-                "coherencia": {"puntuacion": 5, "comentario": "No disponible"},
-                "cohesion": {"puntuacion": 5, "comentario": "No disponible"},
-                "registro_linguistico": {"puntuacion": 5, "comentario": "No disponible"},
-                "adecuacion_cultural": {"puntuacion": 5, "comentario": "No disponible"}
-            },
-            "consejo_final": "Hubo un problema al procesar la respuesta. Por favor, intenta nuevamente."
-        }
+        # Si todo falla, devolver un JSON mínimo para evitar errores
+        logger.warning("No se pudo extraer JSON válido del contenido")
+        return copy.deepcopy(_RESPUESTA_FALLBACK)
         
     except Exception as e:
         logger.error(f"❌ Error inesperado extrayendo JSON del contenido: {str(e)}")
@@ -219,6 +356,113 @@ def extract_json_safely(content):
             "consejo_final": "Ocurrió un error interno. Por favor, intenta nuevamente."
         }
 
+# Indicadores y patrones para cada tipo de error
+INDICADORES_CATEGORIA = {
+    "Léxico": [
+        "vocabulario", "palabra", "término", "significado", "léxico", 
+        "falso amigo", "selección léxica", "término incorrecto", 
+        "palabra inexistente", "palabra mal escrita", "confusión entre palabras"
+    ],
+    "Puntuación": [
+        "coma", "punto", "tilde", "acento", "mayúscula", "minúscula", 
+        "puntuación", "signo", "interrogación", "exclamación", "ortografía",
+        "acentuación", "mayúscula inicial"
+    ],
+    "Estructura textual": [
+        "párrafo", "estructura", "organización", "conectores", "coherencia", 
+        "orden", "distribución", "separación", "disposición", "cohesión",
+        "flujo textual", "ordenación"
+    ],
+    "Gramática": [
+        "conjugación", "verbo", "tiempo verbal", "concordancia", "género", 
+        "número", "preposición", "artículo", "pronombre", "adverbio", 
+        "subjuntivo", "condicional", "singular", "plural", "masculino", "femenino"
+    ]
+}
+
+# Pistas de puntuación que se buscan solo en la explicación
+PISTAS_PUNTUACION = ["coma", "punto", "signo", "interrogación", "exclamación", "mayúscula", "may", "min"]
+
+_SIGNOS_PUNTUACION = re.compile(r'[.,;:!¡?¿]')
+_PREPOSICIONES = re.compile(r'\b(a|de|en|por|para|con|sin)\b')
+
+
+# Una alternancia precompilada por categoría: descarta de una sola búsqueda las
+# categorías sin ninguna palabra clave en el texto
+_PATRONES_CATEGORIA = {
+    categoria: re.compile("|".join(map(re.escape, palabras)))
+    for categoria, palabras in INDICADORES_CATEGORIA.items()
+}
+_PATRON_PISTAS_PUNTUACION = re.compile("|".join(map(re.escape, PISTAS_PUNTUACION)))
+
+
+def clasificar_error(error, cat_original):
+    """
+    Determina la categoría de un error a partir de sus textos.
+    
+    Args:
+        error (dict): Error con fragmento_erroneo, correccion y explicacion
+        cat_original (str): Categoría asignada originalmente por el asistente
+        
+    Returns:
+        str: Categoría resultante
+    """
+    fragmento = error.get("fragmento_erroneo", "").lower()
+    correccion = error.get("correccion", "").lower()
+    explicacion = error.get("explicacion", "").lower()
+    
+    # Combinar todo el texto para análisis
+    texto_completo = f"{fragmento} {correccion} {explicacion}"
+    
+    # Determinar categoría basada en el análisis de palabras clave
+    nueva_categoria = None
+    max_score = 0
+    
+    for categoria, palabras_clave in INDICADORES_CATEGORIA.items():
+        # Calcular puntuación basada en coincidencias de palabras clave
+        if _PATRONES_CATEGORIA[categoria].search(texto_completo):
+            score = sum(1 for palabra in palabras_clave if palabra in texto_completo)
+        else:
+            score = 0
+        
+        # Dar prioridad a la categoría original si no hay una clara mejor opción
+        if categoria == cat_original:
+            score += 0.5
+        
+        if score > max_score:
+            max_score = score
+            nueva_categoria = categoria
+    
+    # Si no se encontró categoría clara, mantener la original o usar Gramática como fallback
+    if nueva_categoria is None or max_score == 0:
+        nueva_categoria = cat_original if cat_original else "Gramática"
+    
+    # Casos especiales basados en patrones específicos
+    # 1. Errores de puntuación
+    if _SIGNOS_PUNTUACION.search(fragmento) or _SIGNOS_PUNTUACION.search(correccion):
+        if _PATRON_PISTAS_PUNTUACION.search(explicacion):
+            nueva_categoria = "Puntuación"
+    
+    # 2. Errores de estructura claros
+    palabras_fragmento = len(fragmento.split())
+    palabras_correccion = len(correccion.split())
+    if palabras_fragmento >= 4 and palabras_correccion >= 4:
+        if abs(palabras_fragmento - palabras_correccion) <= 1 and "orden" in explicacion:
+            nueva_categoria = "Estructura textual"
+    
+    # 3. Errores de léxico claros
+    if fragmento in correccion or correccion in fragmento:
+        if len(fragmento) - len(correccion) <= 3 and len(correccion) - len(fragmento) <= 3:
+            if not _PATRONES_CATEGORIA["Gramática"].search(explicacion):
+                nueva_categoria = "Léxico"
+    
+    # 4. Preposiciones siempre son gramática
+    if _PREPOSICIONES.search(fragmento) and _PREPOSICIONES.search(correccion):
+        if palabras_fragmento <= 3 and palabras_correccion <= 3:
+            nueva_categoria = "Gramática"
+    
+    return nueva_categoria
+
 def validate_error_classification(correction_result):
     """
     Valida y mejora la clasificación de errores para garantizar que estén
@@ -288,85 +532,13 @@ def validate_error_classification(correction_result):
             # Vaciar la categoría
             errores[categoria] = []
         
-        # Indicadores y patrones para cada tipo de error
-        indicadores = {
-            "Léxico": [
-                "vocabulario", "palabra", "término", "significado", "léxico", 
-                "falso amigo", "selección léxica", "término incorrecto", 
-                "palabra inexistente", "palabra mal escrita", "confusión entre palabras"
-            ],
-            "Puntuación": [
-                "coma", "punto", "tilde", "acento", "mayúscula", "minúscula", 
-                "puntuación", "signo", "interrogación", "exclamación", "ortografía",
-                "acentuación", "mayúscula inicial"
-            ],
-            "Estructura textual": [
-                "párrafo", "estructura", "organización", "conectores", "coherencia", 
-                "orden", "distribución", "separación", "disposición", "cohesión",
-                "flujo textual", "ordenación"
-            ],
-            "Gramática": [
-                "conjugación", "verbo", "tiempo verbal", "concordancia", "género", 
-                "número", "preposición", "artículo", "pronombre", "adverbio", 
-                "subjuntivo", "condicional", "singular", "plural", "masculino", "femenino"
-            ]
-        }
-        
         # Reclasificar cada error basado en su explicación y fragmentos
         for error, cat_original in todos_errores:
             if not isinstance(error, dict):
                 logger.warning(f"Error con formato inválido ignorado: {error}")
                 continue
-                
-            fragmento = error.get("fragmento_erroneo", "").lower()
-            correccion = error.get("correccion", "").lower()
-            explicacion = error.get("explicacion", "").lower()
-            
-            # Combinar todo el texto para análisis
-            texto_completo = f"{fragmento} {correccion} {explicacion}"
-            
-            # Determinar categoría basada en el análisis de palabras clave
-            nueva_categoria = None
-            max_score = 0
-            
-            for categoria, palabras_clave in indicadores.items():
-                # Calcular puntuación basada en coincidencias de palabras clave
-                score = sum(1 for palabra in palabras_clave if palabra.lower() in texto_completo)
-                
-                # Dar prioridad a la categoría original si no hay una clara mejor opción
-                if categoria == cat_original:
-                    score += 0.5
-                
-                if score > max_score:
-                    max_score = score
-                    nueva_categoria = categoria
-            
-            # Si no se encontró categoría clara, mantener la original o usar Gramática como fallback
-            if nueva_categoria is None or max_score == 0:
-                nueva_categoria = cat_original if cat_original else "Gramática"
             
-            # Casos especiales basados en patrones específicos
-            # 1. Errores de puntuación
-            if re.search(r'[.,;:!¡?¿]', fragmento) or re.search(r'[.,;:!¡?¿]', correccion):
-                puntuacion_pattern = r'(?:coma|punto|signo|interrogación|exclamación|mayúscula)'
-                if re.search(puntuacion_pattern, explicacion) or "may" in explicacion or "min" in explicacion:
-                    nueva_categoria = "Puntuación"
-            
-            # 2. Errores de estructura claros
-            if len(fragmento.split()) >= 4 and len(correccion.split()) >= 4:
-                if abs(len(fragmento.split()) - len(correccion.split())) <= 1 and "orden" in explicacion:
-                    nueva_categoria = "Estructura textual"
-            
-            # 3. Errores de léxico claros
-            if fragmento in correccion or correccion in fragmento:
-                if len(fragmento) - len(correccion) <= 3 and len(correccion) - len(fragmento) <= 3:
-                    if not any(word in explicacion for word in indicadores["Gramática"]):
-                        nueva_categoria = "Léxico"
-            
-            # 4. Preposiciones siempre son gramática
-            if re.search(r'\b(a|de|en|por|para|con|sin)\b', fragmento) and re.search(r'\b(a|de|en|por|para|con|sin)\b', correccion):
-                if len(fragmento.split()) <= 3 and len(correccion.split()) <= 3:
-                    nueva_categoria = "Gramática"
+            nueva_categoria = clasificar_error(error, cat_original)
             
             # Añadir a la categoría correcta
             errores[nueva_categoria].append(error)
@@ -443,86 +615,14 @@ def validate_correction_json(json_data):
     Returns:
         dict: JSON validado y completado con campos por defecto si faltaban
     """
-    if not json_data or not isinstance(json_data, dict):
-        return {
-            "texto_corregido": "No se pudo procesar la respuesta correctamente.",
-            "errores": {
-                "Gramática": [],
-                "Léxico": [],
-                "Puntuación": [],
-                "Estructura textual": []
-            },
-            "analisis_contextual": {
-                "coherencia": {"puntuacion": 5, "comentario": "No disponible"},
-                "cohesion": {"puntuacion": 5, "comentario": "No disponible"},
-                "registro_linguistico": {"puntuacion": 5, "comentario": "No disponible"},
-                "adecuacion_cultural": {"puntuacion": 5, "comentario": "No disponible"}
-            },
-            "consejo_final": "Hubo un problema al procesar la respuesta."
-        }
-    
-    # Asegurar campos obligatorios existen
-    expected_fields = [
-        "saludo", 
-        "tipo_texto", 
-        "errores", 
-        "texto_corregido", 
-        "analisis_contextual", 
-        "consejo_final"
-    ]
-    
-    # Contar campos que faltan
-    missing_fields = [field for field in expected_fields if field not in json_data]
-    
-    if missing_fields:
-        logger.warning(f"Campos faltantes en JSON de corrección: {', '.join(missing_fields)}")
-        
-        # Completar campos faltantes con valores por defecto
-        for field in missing_fields:
-            if field == "saludo":
-                json_data["saludo"] = "¡Hola! He revisado tu texto."
-            elif field == "tipo_texto":
-                json_data["tipo_texto"] = "Texto general"
-            elif field == "errores":
-                json_data["errores"] = {
-                    "Gramática": [],
-                    "Léxico": [],
-                    "Puntuación": [],
-                    "Estructura textual": []
-                }
-            elif field == "texto_corregido":
-                # Si no tenemos texto corregido pero tenemos el original, usarlo
-                json_data["texto_corregido"] = json_data.get("texto_original", "No se generó texto corregido.")
-            elif field == "analisis_contextual":
-                json_data["analisis_contextual"] = {
-                    "coherencia": {"puntuacion": 5, "comentario": "No disponible"},
-                    "cohesion": {"puntuacion": 5, "comentario": "No disponible"},
-                    "registro_linguistico": {"puntuacion": 5, "comentario": "No disponible"},
-                    "adecuacion_cultural": {"puntuacion": 5, "comentario": "No disponible"}
-                }
-            elif field == "consejo_final":
-                json_data["consejo_final"] = "Continúa practicando tu español."
-    
-    # Asegurar estructura correcta del campo "errores"
-    if "errores" in json_data:
-        categorias_errores = ["Gramática", "Léxico", "Puntuación", "Estructura textual"]
-        for categoria in categorias_errores:
-            if categoria not in json_data["errores"]:
-                json_data["errores"][categoria] = []
-    
-    # Asegurar estructura correcta del campo "analisis_contextual"
-    if "analisis_contextual" in json_data:
-        componentes_analisis = ["coherencia", "cohesion", "registro_linguistico", "adecuacion_cultural"]
-        for componente in componentes_analisis:
-            if componente not in json_data["analisis_contextual"]:
-                json_data["analisis_contextual"][componente] = {"puntuacion": 5, "comentario": "No disponible"}
-    
+    json_data, _ = validate_correction_result(json_data)
     return json_data
 
 def normalize_json_keys(json_data):
     """
     Normaliza las claves del JSON para asegurar consistencia.
-    Por ejemplo, convierte claves como "Gramática" a "gramatica".
+    Por ejemplo, convierte claves como "Análisis" a "analisis"; las categorías
+    de error mantienen sus mayúsculas para presentación.
     
     Args:
         json_data (dict): Datos JSON a normalizar
@@ -533,62 +633,38 @@ def normalize_json_keys(json_data):
     if not json_data or not isinstance(json_data, dict):
         return json_data
     
-    # Función recursiva para normalizar claves
-    def normalize_keys(obj):
-        if isinstance(obj, dict):
-            new_obj = {}
-            for key, value in obj.items():
-                # Normalizar clave: eliminar tildes y convertir a minúsculas
-                normalized_key = key
-                # Si es una categoría de error, mantener mayúsculas para presentación
-                if key not in ["Gramática", "Léxico", "Puntuación", "Estructura textual"]:
-                    normalized_key = normalize_text(key)
-                new_obj[normalized_key] = normalize_keys(value)
-            return new_obj
-        elif isinstance(obj, list):
-            return [normalize_keys(item) for item in obj]
-        else:
-            return obj
-    
-    # Función para normalizar texto (eliminar tildes y convertir a minúsculas)
-    def normalize_text(text):
-        if not isinstance(text, str):
-            return text
-        # Tabla de reemplazo para caracteres acentuados
-        replacements = {
-            'á': 'a', 'é': 'e', 'í': 'i', 'ó': 'o', 'ú': 'u',
-            'Á': 'A', 'É': 'E', 'Í': 'I', 'Ó': 'O', 'Ú': 'U'
-        }
-        result = text
-        for original, replacement in replacements.items():
-            result = result.replace(original, replacement)
-        return result.lower()
-    
-    # Comenzar normalización
-    return normalize_keys(json_data)
+    return normalizar_claves(json_data)
 
-def ensure_correction_structure(json_data, texto_original=None):
+def validate_correction_structure(json_data, texto_original=None):
     """
-    Asegura que la estructura del JSON de corrección sea válida y completa.
+    Valida la estructura del JSON de corrección contra el esquema compilado
+    y reclasifica sus errores.
     
     Args:
         json_data (dict): Datos JSON a validar
         texto_original (str, opcional): Texto original para incluir si falta
         
     Returns:
-        dict: JSON con estructura completa y válida
+        tuple: (JSON con estructura completa y válida, diagnóstico de reparaciones)
     """
-    # Validar el JSON
-    json_data = validate_correction_json(json_data)
+    # Validar, completar y normalizar claves en una sola pasada
+    json_data, diagnostico = validate_correction_result(json_data, texto_original)
     
     # Aplicar la validación de clasificación de errores
     json_data = validate_error_classification(json_data)
     
-    # Normalizar claves para backend
-    normalized_json = normalize_json_keys(json_data)
+    return json_data, diagnostico
+
+def ensure_correction_structure(json_data, texto_original=None):
+    """
+    Asegura que la estructura del JSON de corrección sea válida y completa.
     
-    # Añadir texto original si se proporciona y no existe
-    if texto_original and "texto_original" not in normalized_json:
-        normalized_json["texto_original"] = texto_original
+    Args:
+        json_data (dict): Datos JSON a validar
+        texto_original (str, opcional): Texto original para incluir si falta
         
-    return normalized_json
+    Returns:
+        dict: JSON con estructura completa y válida
+    """
+    json_data, _ = validate_correction_structure(json_data, texto_original)
+    return json_data
@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Buffer de métricas de modelos
+-----------------------------
+Las métricas de uso de los modelos se acumulan en memoria y un hilo en segundo
+plano las escribe en Firestore por lotes, cuando se alcanza un tamaño de lote o
+pasa un intervalo máximo. Así registrar una métrica nunca añade la latencia de
+una escritura a la corrección del estudiante. La cola está acotada: si Firestore
+no responde, las métricas nuevas se descartan en lugar de acumular memoria.
+Al terminar el proceso se vacía el buffer.
+"""
+
+import atexit
+import logging
+import threading
+import time
+from collections import deque
+
+from config.settings import METRICS_BATCH_SIZE, METRICS_FLUSH_INTERVAL, METRICS_QUEUE_MAX
+
+logger = logging.getLogger(__name__)
+
+# Colección donde se guardan las métricas
+METRICS_COLLECTION = "metricas"
+
+# Máximo de escrituras por lote en Firestore
+FIRESTORE_MAX_BATCH = 500
+
+# Espera tras el primer vaciado fallido; se duplica con cada fallo hasta flush_interval
+METRICS_RETRY_DELAY = 0.5
+
+class MetricsSink:
+    """
+    Buffer acotado de métricas que se vacía por lotes en un hilo en segundo plano.
+    """
+
+    def __init__(self, batch_size=METRICS_BATCH_SIZE, flush_interval=METRICS_FLUSH_INTERVAL,
+                 max_queue=METRICS_QUEUE_MAX, collection=METRICS_COLLECTION):
+        """
+        Inicializa un buffer vacío.
+
+        Args:
+            batch_size (int): Métricas que provocan un vaciado inmediato
+            flush_interval (float): Segundos máximos que una métrica espera en el buffer
+            max_queue (int): Métricas máximas en memoria; las que excedan se descartan
+            collection (str): Colección de Firestore de destino
+        """
+        self.batch_size = min(batch_size, FIRESTORE_MAX_BATCH)
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.collection = collection
+        self._buffer = deque()
+        self._cond = threading.Condition()
+        # Serializa los vaciados del hilo y del cierre del proceso
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+        # Vaciados fallidos seguidos (sin conexión o error al escribir)
+        self._fallos_seguidos = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def record(self, metrics_data):
+        """
+        Añade una métrica al buffer sin bloquear.
+
+        Args:
+            metrics_data (dict): Documento de la métrica
+
+        Returns:
+            bool: True si se encoló, False si el buffer estaba lleno o cerrado
+        """
+        with self._cond:
+            if self._closed or len(self._buffer) >= self.max_queue:
+                self.dropped += 1
+                return False
+            self._buffer.append(metrics_data)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._worker, name="metrics-sink", daemon=True)
+                self._thread.start()
+            if len(self._buffer) >= self.batch_size:
+                self._cond.notify()
+        return True
+
+    def _espera_reintento(self):
+        """Segundos de espera tras los vaciados fallidos seguidos (0 si el último fue bien)."""
+        if not self._fallos_seguidos:
+            return 0
+        return min(self.flush_interval, METRICS_RETRY_DELAY * 2 ** (self._fallos_seguidos - 1))
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                # Tras un fallo, esperar antes de reintentar aunque haya un lote completo
+                espera = self._espera_reintento()
+                limite = time.time() + espera
+                while espera and not self._closed:
+                    restante = limite - time.time()
+                    if restante <= 0:
+                        break
+                    self._cond.wait(restante)
+                # Esperar a tener un lote completo o a que venza el intervalo
+                limite = time.time() + (self.flush_interval if not espera else 0)
+                while len(self._buffer) < self.batch_size and not self._closed:
+                    restante = limite - time.time()
+                    if restante <= 0:
+                        break
+                    self._cond.wait(restante)
+                if self._closed:
+                    return
+            self.flush()
+
+    def _take_batch(self):
+        with self._cond:
+            lote = []
+            while self._buffer and len(lote) < self.batch_size:
+                lote.append(self._buffer.popleft())
+            return lote
+
+    def flush(self):
+        """
+        Escribe en Firestore todas las métricas pendientes, por lotes.
+
+        Returns:
+            int: Número de métricas escritas
+        """
+        # Importar dinámicamente para evitar dependencias circulares
+        from core.firebase_client import firestore_registry
+
+        escritas = 0
+        with self._flush_lock:
+            lote = self._take_batch()
+            if not lote:
+                return 0
+
+            db = firestore_registry.get_client()
+            if db is None:
+                # Sin conexión: devolver el lote al buffer si cabe y reintentar más tarde
+                self._requeue(lote)
+                self._registrar_resultado(False)
+                return 0
+
+            fallo = False
+            while lote:
+                try:
+                    batch = db.batch()
+                    coleccion = db.collection(self.collection)
+                    for metrics_data in lote:
+                        batch.set(coleccion.document(), metrics_data)
+                    batch.commit()
+                    escritas += len(lote)
+                except Exception as e:
+                    logger.error(f"Error escribiendo lote de {len(lote)} métricas: {e}")
+                    firestore_registry.record_failure(e)
+                    self._requeue(lote)
+                    fallo = True
+                    break
+                lote = self._take_batch()
+            self._registrar_resultado(not fallo)
+
+        self.written += escritas
+        return escritas
+
+    def _registrar_resultado(self, correcto):
+        """Lleva la cuenta de vaciados fallidos seguidos que marca la espera del hilo."""
+        with self._cond:
+            self._fallos_seguidos = 0 if correcto else self._fallos_seguidos + 1
+
+    def _requeue(self, lote):
+        """Devuelve un lote fallido al principio del buffer, descartando lo que no quepa."""
+        with self._cond:
+            if self._closed:
+                self.failed += len(lote)
+                return
+            hueco = max(0, self.max_queue - len(self._buffer))
+            self.failed += max(0, len(lote) - hueco)
+            self._buffer.extendleft(reversed(lote[:hueco]))
+
+    def close(self):
+        """
+        Vacía el buffer y detiene el hilo (se llama al terminar el proceso).
+        """
+        with self._cond:
+            if self._closed:
+                return
+            self._cond.notify_all()
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Error vaciando métricas al cerrar: {e}")
+        with self._cond:
+            self._closed = True
+            self.failed += len(self._buffer)
+            self._buffer.clear()
+            self._cond.notify_all()
+
+    def stats(self):
+        """
+        Resumen del estado del buffer.
+
+        Returns:
+            dict: Métricas pendientes, escritas, descartadas y fallidas
+        """
+        with self._cond:
+            pendientes = len(self._buffer)
+        return {
+            "pending": pendientes,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed
+        }
+
+# Instancia global compartida por todas las sesiones
+metrics_sink = MetricsSink()
+atexit.register(metrics_sink.close)
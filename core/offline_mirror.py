@@ -0,0 +1,317 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Espejo local del historial de los usuarios
+------------------------------------------
+Copia en SQLite de los datos de cada usuario activo: perfil, correcciones,
+simulacros, ejercicios y planes de estudio. Las funciones de lectura de
+core.firebase_client consultan primero el espejo, de modo que las vistas de
+historial responden al instante y siguen funcionando durante una incidencia
+de Firestore.
+
+El espejo se mantiene al día de dos formas:
+- Escritura simultánea: cada guardado confirmado en Firestore se copia al espejo.
+- Reconciliación en segundo plano: cuando una colección del espejo tiene más
+  de OFFLINE_MIRROR_REFRESH segundos, un hilo la vuelve a leer de Firestore
+  y la sustituye (recoge los cambios hechos desde otros procesos o dispositivos).
+  Los documentos copiados al espejo mientras se leía Firestore se conservan:
+  son más recientes que la lectura.
+"""
+
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+
+from config.settings import OFFLINE_MIRROR_PATH, OFFLINE_MIRROR_REFRESH
+
+logger = logging.getLogger(__name__)
+
+# Colección del espejo donde se guarda el documento de perfil
+COLECCION_PERFIL = "perfil"
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS documentos (
+    uid TEXT NOT NULL,
+    coleccion TEXT NOT NULL,
+    doc_id TEXT NOT NULL,
+    orden REAL,
+    datos TEXT NOT NULL,
+    escrito REAL,
+    PRIMARY KEY (uid, coleccion, doc_id)
+);
+CREATE INDEX IF NOT EXISTS documentos_orden ON documentos (uid, coleccion, orden DESC, doc_id DESC);
+CREATE TABLE IF NOT EXISTS sincronizacion (
+    uid TEXT NOT NULL,
+    coleccion TEXT NOT NULL,
+    sincronizado REAL NOT NULL,
+    PRIMARY KEY (uid, coleccion)
+);
+"""
+
+def _serializar(valor):
+    """Convierte los tipos de Firestore no serializables en JSON."""
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, (bytes, bytearray)):
+        return None
+    return str(valor)
+
+def _orden(datos):
+    """Clave de orden del documento (su fecha como timestamp), o None si no tiene."""
+    # Importar dinámicamente para evitar dependencias circulares
+    from core.progress_rollup import to_timestamp
+
+    return to_timestamp(datos.get("fecha"))
+
+class OfflineMirror:
+    """
+    Espejo en SQLite de los datos de los usuarios, compartido por el proceso.
+    """
+
+    def __init__(self, path=OFFLINE_MIRROR_PATH, refresh=OFFLINE_MIRROR_REFRESH):
+        """
+        Inicializa el espejo (la base de datos se abre en el primer uso).
+
+        Args:
+            path (str): Ruta del fichero SQLite
+            refresh (float): Segundos tras los que una colección se reconcilia
+        """
+        self.path = path
+        self.refresh = refresh
+        self._lock = threading.Lock()
+        self._conn = None
+        self._disponible = True
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._thread = None
+
+    def _conexion(self):
+        """Abre la base de datos si hace falta. Requiere self._lock."""
+        if self._conn is None:
+            directorio = os.path.dirname(self.path)
+            if directorio:
+                os.makedirs(directorio, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_ESQUEMA)
+            columnas = {fila[1] for fila in self._conn.execute("PRAGMA table_info(documentos)")}
+            if "escrito" not in columnas:
+                # Espejos anteriores: momento de la última escritura simultánea
+                self._conn.execute("ALTER TABLE documentos ADD COLUMN escrito REAL")
+        return self._conn
+
+    def _ejecutar(self, operacion, defecto=None):
+        """Ejecuta una operación sobre la conexión; el espejo nunca rompe al llamador."""
+        if not self._disponible:
+            return defecto
+        with self._lock:
+            try:
+                return operacion(self._conexion())
+            except sqlite3.Error as e:
+                logger.error(f"Error en el espejo local: {e}")
+                return defecto
+            except OSError as e:
+                # Sin disco utilizable: desactivar el espejo para el resto del proceso
+                logger.error(f"Espejo local desactivado: {e}")
+                self._disponible = False
+                return defecto
+
+    def upsert(self, uid, coleccion, doc_id, datos, merge=False):
+        """
+        Copia un documento al espejo (escritura simultánea).
+
+        Args:
+            uid (str): ID del usuario
+            coleccion (str): Colección del documento
+            doc_id (str): ID del documento
+            datos (dict): Contenido del documento
+            merge (bool): Fusionar con la copia existente; si no existe, no se crea
+        """
+        if not uid or not doc_id or not isinstance(datos, dict):
+            return
+
+        def operacion(conn):
+            contenido = datos
+            if merge:
+                fila = conn.execute(
+                    "SELECT datos FROM documentos WHERE uid=? AND coleccion=? AND doc_id=?",
+                    (uid, coleccion, doc_id)
+                ).fetchone()
+                if fila is None:
+                    return
+                contenido = {**json.loads(fila[0]), **datos}
+            conn.execute(
+                "INSERT OR REPLACE INTO documentos (uid, coleccion, doc_id, orden, datos, escrito) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (uid, coleccion, doc_id, _orden(contenido),
+                 json.dumps(contenido, ensure_ascii=False, default=_serializar), time.time())
+            )
+
+        self._ejecutar(operacion)
+
+    def replace_collection(self, uid, coleccion, documentos, inicio=None):
+        """
+        Sustituye una colección completa del usuario y la marca como sincronizada.
+
+        Args:
+            uid (str): ID del usuario
+            coleccion (str): Colección
+            documentos (list): Documentos con su "id"
+            inicio (float, opcional): Momento en que empezó la lectura de
+                Firestore; los documentos copiados al espejo desde entonces se
+                conservan en lugar de sustituirse por la lectura
+        """
+        def operacion(conn):
+            filas = [
+                (uid, coleccion, doc["id"], _orden(doc),
+                 json.dumps({k: v for k, v in doc.items() if k != "id"}, ensure_ascii=False, default=_serializar))
+                for doc in documentos if doc.get("id")
+            ]
+            conn.execute("BEGIN")
+            try:
+                if inicio is None:
+                    conn.execute("DELETE FROM documentos WHERE uid=? AND coleccion=?", (uid, coleccion))
+                else:
+                    conn.execute(
+                        "DELETE FROM documentos WHERE uid=? AND coleccion=? AND (escrito IS NULL OR escrito < ?)",
+                        (uid, coleccion, inicio)
+                    )
+                # Los documentos conservados prevalecen sobre su versión leída
+                conn.executemany(
+                    "INSERT OR IGNORE INTO documentos (uid, coleccion, doc_id, orden, datos) VALUES (?, ?, ?, ?, ?)",
+                    filas
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO sincronizacion (uid, coleccion, sincronizado) VALUES (?, ?, ?)",
+                    (uid, coleccion, time.time())
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        self._ejecutar(operacion)
+
+    def synced_at(self, uid, coleccion):
+        """
+        Momento de la última sincronización completa de una colección.
+
+        Returns:
+            float: Timestamp, o None si nunca se ha sincronizado
+        """
+        def operacion(conn):
+            fila = conn.execute(
+                "SELECT sincronizado FROM sincronizacion WHERE uid=? AND coleccion=?", (uid, coleccion)
+            ).fetchone()
+            return fila[0] if fila else None
+
+        return self._ejecutar(operacion)
+
+    def list(self, uid, coleccion):
+        """
+        Documentos de una colección sincronizada, por fecha descendente.
+
+        Returns:
+            list: Documentos con su "id", o None si la colección no está en el espejo
+        """
+        if self.synced_at(uid, coleccion) is None:
+            return None
+
+        def operacion(conn):
+            filas = conn.execute(
+                "SELECT doc_id, datos FROM documentos WHERE uid=? AND coleccion=? "
+                "ORDER BY orden IS NULL, orden DESC, doc_id DESC",
+                (uid, coleccion)
+            ).fetchall()
+            return [dict(json.loads(datos), id=doc_id) for doc_id, datos in filas]
+
+        return self._ejecutar(operacion)
+
+    def get(self, uid, coleccion, doc_id):
+        """
+        Un documento del espejo.
+
+        Returns:
+            dict: Documento con su "id", o None si no está
+        """
+        def operacion(conn):
+            fila = conn.execute(
+                "SELECT datos FROM documentos WHERE uid=? AND coleccion=? AND doc_id=?", (uid, coleccion, doc_id)
+            ).fetchone()
+            return dict(json.loads(fila[0]), id=doc_id) if fila else None
+
+        return self._ejecutar(operacion)
+
+    def is_stale(self, uid, coleccion):
+        """bool: True si la colección no está sincronizada o su copia ha caducado."""
+        sincronizado = self.synced_at(uid, coleccion)
+        return sincronizado is None or time.time() - sincronizado > self.refresh
+
+    def schedule_reconcile(self, uid, coleccion):
+        """
+        Encola la reconciliación de una colección con Firestore.
+
+        Args:
+            uid (str): ID del usuario
+            coleccion (str): Colección a reconciliar
+
+        Returns:
+            bool: True si se encoló, False si ya estaba pendiente
+        """
+        clave = (uid, coleccion)
+        with self._lock:
+            if clave in self._pending or not self._disponible:
+                return False
+            self._pending.add(clave)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._worker, name="offline-mirror", daemon=True)
+                self._thread.start()
+        self._queue.put(clave)
+        return True
+
+    def invalidate(self, uid):
+        """
+        Elimina del espejo los datos de un usuario (se volverán a leer de Firestore).
+
+        Args:
+            uid (str): ID del usuario
+        """
+        def operacion(conn):
+            conn.execute("BEGIN")
+            try:
+                conn.execute("DELETE FROM documentos WHERE uid=?", (uid,))
+                conn.execute("DELETE FROM sincronizacion WHERE uid=?", (uid,))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        self._ejecutar(operacion)
+
+    def _worker(self):
+        # Importar dinámicamente para evitar dependencias circulares
+        from core.firebase_client import firestore_registry, load_mirror_collection
+
+        while True:
+            uid, coleccion = self._queue.get()
+            try:
+                if firestore_registry.get_client() is not None:
+                    inicio = time.time()
+                    documentos = load_mirror_collection(uid, coleccion)
+                    self.replace_collection(uid, coleccion, documentos, inicio=inicio)
+                    logger.debug(f"Espejo local reconciliado: {coleccion} de {uid} ({len(documentos)} documentos)")
+            except Exception as e:
+                logger.warning(f"No se pudo reconciliar {coleccion} de {uid} con Firestore: {e}")
+            finally:
+                with self._lock:
+                    self._pending.discard((uid, coleccion))
+                self._queue.task_done()
+
+# Instancia global compartida por todas las sesiones
+offline_mirror = OfflineMirror()
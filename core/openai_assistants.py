@@ -27,6 +27,7 @@ import openai
 # Importar dependencias del proyecto
 from config.settings import MAX_RETRIES, DEFAULT_TIMEOUT
 from core.circuit_breaker import circuit_breaker
+from core.json_extractor import extract_json_object
 
 # Configurar logger
 logger = logging.getLogger(__name__)
@@ -41,37 +42,12 @@ def extract_json_safely(content):
     Returns:
         dict: Diccionario con el JSON extraído o diccionario vacío si no se encuentra
     """
-    if not content:
-        return {}
-    
     try:
-        # Primero intentar parsear directamente
-        try:
-            return json.loads(content)
-        except json.JSONDecodeError:
-            pass
-        
-        # Buscar bloques de código JSON
-        import re
-        json_code_blocks = re.findall(r'```(?:json)?\s*([\s\S]*?)```', content)
-        for block in json_code_blocks:
-            try:
-                return json.loads(block.strip())
-            except json.JSONDecodeError:
-                continue
-        
-        # Buscar cualquier estructura JSON en el texto
-        json_match = re.search(r'({[\s\S]*})', content)
-        if json_match:
-            try:
-                return json.loads(json_match.group(1))
-            except json.JSONDecodeError:
-                pass
-        
-        # Si llegamos aquí, no hay JSON válido
-        logger.warning("No se pudo extraer JSON válido del contenido")
-        return {}
-        
+        json_data = extract_json_object(content)
+        if json_data is None:
+            logger.warning("No se pudo extraer JSON válido del contenido")
+            return {}
+        return json_data
     except Exception as e:
         logger.error(f"Error extrayendo JSON del contenido: {str(e)}")
         return {}
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Caché de perfiles de usuario
+----------------------------
+Caché de lectura a nivel de proceso para los documentos de perfil de Firestore.
+Los perfiles se guardan por uid durante unos segundos y se invalidan en cada
+escritura, de modo que las lecturas repetidas dentro de una misma corrección
+o vista no vuelvan a pagar una lectura de Firestore.
+"""
+
+import copy
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from config.settings import PROFILE_CACHE_TTL, PROFILE_CACHE_MAX_ENTRIES
+
+logger = logging.getLogger(__name__)
+
+class ProfileCache:
+    """
+    Caché de perfiles con caducidad, compartida por todas las sesiones del proceso.
+    """
+    
+    def __init__(self, ttl=PROFILE_CACHE_TTL, max_entries=PROFILE_CACHE_MAX_ENTRIES):
+        """
+        Inicializa una caché vacía.
+        
+        Args:
+            ttl (float): Segundos que una entrada se considera válida
+            max_entries (int): Número máximo de perfiles almacenados
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # uid -> (expira_en, datos)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        # Generación de cada usuario: el contador global en su última invalidación.
+        # Evita guardar lecturas que empezaron antes de una escritura del mismo usuario
+        self._contador = 0
+        self._generaciones = OrderedDict()  # uid -> generación
+        # Generación de los usuarios descartados de _generaciones (la mayor descartada)
+        self._generacion_base = 0
+    
+    def generation(self, uid):
+        """
+        Generación actual de un usuario; tomarla antes de leer de Firestore y pasarla a set().
+        
+        Args:
+            uid (str): ID del usuario
+            
+        Returns:
+            int: Generación del usuario
+        """
+        with self._lock:
+            return self._generaciones.get(uid, self._generacion_base)
+    
+    def get(self, uid):
+        """
+        Devuelve una copia del perfil en caché si sigue vigente.
+        
+        Args:
+            uid (str): ID del usuario
+            
+        Returns:
+            dict: Copia del perfil, o None si no está o ha caducado
+        """
+        with self._lock:
+            entrada = self._entries.get(uid)
+            if entrada is None or entrada[0] < time.monotonic():
+                if entrada is not None:
+                    del self._entries[uid]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(uid)
+            self.hits += 1
+            datos = entrada[1]
+        # Copia fuera del lock: los llamadores pueden modificar el resultado
+        return copy.deepcopy(datos)
+    
+    def set(self, uid, datos, generation=None):
+        """
+        Guarda una copia del perfil.
+        
+        Args:
+            uid (str): ID del usuario
+            datos (dict): Datos del perfil leídos de Firestore
+            generation (int, opcional): Generación del usuario tomada antes de la
+                lectura; si se invalidó desde entonces, la lectura no se guarda
+        """
+        datos = copy.deepcopy(datos)
+        with self._lock:
+            if generation is not None and generation != self._generaciones.get(uid, self._generacion_base):
+                return
+            self._entries[uid] = (time.monotonic() + self.ttl, datos)
+            self._entries.move_to_end(uid)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, uid):
+        """
+        Descarta el perfil de un usuario tras una escritura.
+        
+        Args:
+            uid (str): ID del usuario
+        """
+        with self._lock:
+            self._contador += 1
+            self._generaciones[uid] = self._contador
+            self._generaciones.move_to_end(uid)
+            # Acotar la memoria: los usuarios descartados pasan a la generación base,
+            # que no baja nunca (como mucho se descarta alguna lectura de más)
+            while len(self._generaciones) > self.max_entries:
+                _, self._generacion_base = self._generaciones.popitem(last=False)
+            if self._entries.pop(uid, None) is not None:
+                self.invalidations += 1
+    
+    def clear(self):
+        """Vacía la caché sin reiniciar las estadísticas."""
+        with self._lock:
+            self._entries.clear()
+    
+    @property
+    def hit_ratio(self):
+        """float: Proporción de lecturas servidas desde la caché."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+    
+    def stats(self):
+        """
+        Devuelve las estadísticas de uso de la caché.
+        
+        Returns:
+            dict: Aciertos, fallos, invalidaciones, ratio de aciertos y tamaño
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_ratio": self.hit_ratio,
+                "entries": len(self._entries)
+            }
+
+# Instancia global compartida por todas las sesiones
+profile_cache = ProfileCache()
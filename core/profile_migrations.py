@@ -0,0 +1,245 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Migraciones del esquema de perfil
+---------------------------------
+Los documentos de usuario guardan en "schema_version" la versión del esquema
+de perfil que cumplen. Este módulo contiene los pasos de migración entre
+versiones, un ejecutor que actualiza todos los perfiles de una vez y un
+migrador en segundo plano para los documentos que se encuentren desactualizados
+durante una lectura, de modo que las lecturas nunca escriban en línea.
+
+Uso (migración completa, una sola vez por versión):
+    python -m core.profile_migrations
+"""
+
+import copy
+import logging
+import queue
+import threading
+
+from config.settings import FIREBASE_COLLECTION_USERS
+
+logger = logging.getLogger(__name__)
+
+# Versión actual del esquema de perfil
+PROFILE_SCHEMA_VERSION = 1
+
+# Reintentos cuando otro proceso modifica el documento durante la migración
+MAX_MIGRATION_ATTEMPTS = 3
+
+def _v1_completar_campos(user_data, cambios):
+    """
+    Versión 1: todos los campos de STUDENT_PROFILE_SCHEMA existen y no son None.
+
+    Args:
+        user_data (dict): Datos del usuario (se modifican en el sitio)
+        cambios (dict): Campos a escribir en Firestore
+    """
+    # Importar dinámicamente para evitar dependencias circulares
+    from core.firebase_client import STUDENT_PROFILE_SCHEMA
+
+    for field, default_value in STUDENT_PROFILE_SCHEMA.items():
+        if user_data.get(field) is None:
+            valor = copy.deepcopy(default_value)
+            user_data[field] = valor
+            cambios[field] = valor
+
+# Pasos de migración en orden: (versión resultante, función)
+MIGRACIONES = [
+    (1, _v1_completar_campos),
+]
+
+def needs_migration(user_data):
+    """
+    Indica si un perfil está por debajo de la versión actual del esquema.
+
+    Args:
+        user_data (dict): Datos del usuario
+
+    Returns:
+        bool: True si hay que migrarlo
+    """
+    return user_data.get("schema_version", 0) < PROFILE_SCHEMA_VERSION
+
+def migrate_profile_data(user_data):
+    """
+    Aplica en memoria las migraciones pendientes de un perfil.
+
+    Args:
+        user_data (dict): Datos del usuario (se modifican en el sitio)
+
+    Returns:
+        dict: Campos a escribir en Firestore (vacío si ya estaba al día)
+    """
+    version = user_data.get("schema_version", 0)
+    if version >= PROFILE_SCHEMA_VERSION:
+        return {}
+
+    cambios = {}
+    for version_destino, paso in MIGRACIONES:
+        if version_destino > version:
+            paso(user_data, cambios)
+
+    user_data["schema_version"] = PROFILE_SCHEMA_VERSION
+    cambios["schema_version"] = PROFILE_SCHEMA_VERSION
+    return cambios
+
+def migrate_user_document(db, uid):
+    """
+    Migra el documento de un usuario con una escritura condicionada a que
+    nadie lo haya modificado desde su lectura.
+
+    Args:
+        db: Cliente de Firestore
+        uid (str): ID del usuario
+
+    Returns:
+        bool: True si se escribió la migración
+    """
+    # Importar dinámicamente para evitar dependencias circulares
+    from google.api_core.exceptions import FailedPrecondition
+    from core.firebase_client import firestore
+    from core.profile_cache import profile_cache
+
+    doc_ref = db.collection(FIREBASE_COLLECTION_USERS).document(uid)
+
+    for intento in range(MAX_MIGRATION_ATTEMPTS):
+        snapshot = doc_ref.get()
+        if not snapshot.exists:
+            return False
+
+        cambios = migrate_profile_data(snapshot.to_dict())
+        if not cambios:
+            return False
+
+        try:
+            doc_ref.update(
+                cambios,
+                option=firestore.Client.write_option(last_update_time=snapshot.update_time)
+            )
+        except FailedPrecondition:
+            logger.info(f"Perfil {uid} modificado durante la migración, reintentando ({intento + 1})")
+            continue
+
+        profile_cache.invalidate(uid)
+        logger.info(f"Perfil {uid} migrado a la versión {PROFILE_SCHEMA_VERSION} del esquema")
+        return True
+
+    logger.warning(f"No se pudo migrar el perfil {uid} tras {MAX_MIGRATION_ATTEMPTS} intentos")
+    return False
+
+def run_profile_migrations(db, batch_size=200):
+    """
+    Migra de una vez todos los perfiles desactualizados a la versión actual.
+
+    Args:
+        db: Cliente de Firestore
+        batch_size (int): Escrituras por lote (máximo 500 en Firestore)
+
+    Returns:
+        dict: Resumen con documentos revisados, migrados y errores
+    """
+    # Importar dinámicamente para evitar dependencias circulares
+    from core.profile_cache import profile_cache
+
+    resumen = {"revisados": 0, "migrados": 0, "errores": 0}
+    batch = db.batch()
+    pendientes = []
+
+    def confirmar():
+        try:
+            batch.commit()
+            resumen["migrados"] += len(pendientes)
+            for uid in pendientes:
+                profile_cache.invalidate(uid)
+        except Exception as e:
+            logger.error(f"Error confirmando lote de migración: {e}")
+            resumen["errores"] += len(pendientes)
+
+    for doc in db.collection(FIREBASE_COLLECTION_USERS).stream():
+        resumen["revisados"] += 1
+        cambios = migrate_profile_data(doc.to_dict() or {})
+        if not cambios:
+            continue
+
+        batch.update(doc.reference, cambios)
+        pendientes.append(doc.id)
+        if len(pendientes) >= batch_size:
+            confirmar()
+            batch = db.batch()
+            pendientes = []
+
+    if pendientes:
+        confirmar()
+
+    logger.info(
+        f"Migración de perfiles a la versión {PROFILE_SCHEMA_VERSION}: "
+        f"{resumen['revisados']} revisados, {resumen['migrados']} migrados, {resumen['errores']} errores"
+    )
+    return resumen
+
+class LazyProfileMigrator:
+    """
+    Migra en segundo plano los perfiles desactualizados detectados en lecturas.
+
+    Un único hilo consume la cola; cada uid se encola una sola vez mientras
+    su migración está pendiente.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def schedule(self, uid):
+        """
+        Encola la migración de un perfil.
+
+        Args:
+            uid (str): ID del usuario
+
+        Returns:
+            bool: True si se encoló, False si ya estaba pendiente
+        """
+        with self._lock:
+            if uid in self._pending:
+                return False
+            self._pending.add(uid)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._worker, name="profile-migrator", daemon=True
+                )
+                self._thread.start()
+        self._queue.put(uid)
+        return True
+
+    def _worker(self):
+        # Importar dinámicamente para evitar dependencias circulares
+        from core.firebase_client import firestore_registry
+
+        while True:
+            uid = self._queue.get()
+            try:
+                db = firestore_registry.get_client()
+                if db is not None:
+                    migrate_user_document(db, uid)
+            except Exception as e:
+                logger.error(f"Error migrando perfil {uid} en segundo plano: {e}")
+            finally:
+                with self._lock:
+                    self._pending.discard(uid)
+                self._queue.task_done()
+
+# Instancia global compartida por todas las sesiones
+profile_migrator = LazyProfileMigrator()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    from core.firebase_client import firestore_registry
+
+    cliente = firestore_registry.get_client()
+    if cliente is None:
+        raise SystemExit("No se pudo inicializar Firebase")
+    print(run_profile_migrations(cliente))
@@ -0,0 +1,593 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Resúmenes de progreso del usuario
+---------------------------------
+Cada usuario tiene un documento de resumen (usuarios/{uid}/estadisticas/progreso)
+que se actualiza de forma incremental, en la misma transacción que guarda cada
+simulacro o ejercicio. Las correcciones no lo leen al guardarse (para que una
+ráfaga de correcciones no compita por un único documento): cada una deja un
+documento pendiente con su resumen (pending_correction) en la subcolección
+ROLLUP_PENDING_COLLECTION, que se incorpora al resumen al leerlo o al guardar la
+siguiente actividad con resumen. Contiene recuentos diarios y semanales,
+totales de errores por categoría, sumas para medias de puntuación e historial
+de nivel, de modo que el panel de perfil no tenga que recorrer el historial.
+
+También mantiene medias móviles exponenciales (EWMA) de la puntuación, las
+palabras y los errores por categoría de las correcciones, y de la puntuación
+por nivel de correcciones y simulacros. Cada actividad las actualiza en tiempo
+constante y las tendencias y el nivel estimado se leen sin recorrer nada.
+
+Este módulo contiene solo la lógica de agregación, sin acceso a Firestore.
+"""
+
+import math
+from datetime import datetime, timedelta
+
+# Ubicación del documento de resumen dentro del usuario
+ROLLUP_COLLECTION = "estadisticas"
+ROLLUP_DOCUMENT = "progreso"
+
+ROLLUP_VERSION = 2
+
+# Correcciones pendientes de incorporar (usuarios/{uid}/estadisticas/progreso/pendientes)
+ROLLUP_PENDING_COLLECTION = "pendientes"
+
+# Tipos de actividad y su contador
+TIPOS_ACTIVIDAD = ("correcciones", "simulacros", "ejercicios")
+
+SEGUNDOS_DIA = 86400
+
+# Factores de suavizado de las medias móviles exponenciales (por corrección):
+# la rápida resume unas 10 correcciones recientes y la lenta unas 50
+EWMA_ALFA_RAPIDA = 0.1
+EWMA_ALFA_LENTA = 0.02
+
+NIVELES_MCER = ("A1", "A2", "B1", "B2", "C1", "C2")
+
+def _nueva_ewma():
+    return {"rapida": 0.0, "lenta": 0.0, "peso": 0}
+
+def new_rollup():
+    """
+    Crea un resumen vacío.
+
+    Returns:
+        dict: Resumen sin actividad
+    """
+    return {
+        "version": ROLLUP_VERSION,
+        "totales": {tipo: 0 for tipo in TIPOS_ACTIVIDAD},
+        "palabras": 0,
+        "errores_por_tipo": {},
+        "puntuacion": {"suma": 0.0, "cuenta": 0, "primera": None, "ultima": None},
+        "calificacion_simulacros": {"suma": 0.0, "cuenta": 0},
+        "por_dia": {},
+        "por_semana": {},
+        "historial_nivel": [],
+        "temas": {},
+        # Estadística acumulada (Welford) de los días entre actividades consecutivas
+        "intervalos": {"cuenta": 0, "media": 0.0, "m2": 0.0},
+        # Medias móviles exponenciales de las correcciones (ver apply_correction)
+        "ewma": {
+            "correcciones": 0,
+            "puntuacion": _nueva_ewma(),
+            "palabras": _nueva_ewma(),
+            "errores": {},
+            "niveles": {}
+        },
+        "primera_actividad": None,
+        "ultima_actividad": None,
+        "actualizado": None,
+        # True si se creó sin conocer el historial previo; se reconstruye al leerlo
+        "parcial": False
+    }
+
+def to_timestamp(fecha):
+    """
+    Convierte una fecha guardada (timestamp, ISO 8601 o datetime) a timestamp.
+
+    Args:
+        fecha: Fecha en cualquiera de los formatos usados en la aplicación
+
+    Returns:
+        float: Timestamp en segundos, o None si no se puede interpretar
+    """
+    if isinstance(fecha, (int, float)) and not isinstance(fecha, bool):
+        return float(fecha)
+    if isinstance(fecha, datetime):
+        return fecha.timestamp()
+    if isinstance(fecha, str):
+        try:
+            return datetime.fromisoformat(fecha.replace('Z', '+00:00')).timestamp()
+        except ValueError:
+            return None
+    return None
+
+def _claves_periodo(timestamp):
+    """Devuelve la clave diaria (AAAA-MM-DD) y semanal ISO (AAAA-Wss) de un timestamp."""
+    dia = datetime.fromtimestamp(timestamp).date()
+    anio, semana, _ = dia.isocalendar()
+    return dia.isoformat(), f"{anio}-W{semana:02d}"
+
+def _nuevo_bucket():
+    return {"correcciones": 0, "simulacros": 0, "ejercicios": 0,
+            "palabras": 0, "puntuacion_suma": 0.0, "puntuacion_cuenta": 0}
+
+def apply_activity(rollup, tipo, fecha, puntuacion=None, errores=None, palabras=0,
+                   nivel=None, tema=None, calificacion=None):
+    """
+    Incorpora una actividad al resumen.
+
+    Args:
+        rollup (dict): Resumen a actualizar (se modifica en el sitio)
+        tipo (str): "correcciones", "simulacros" o "ejercicios"
+        fecha: Fecha de la actividad (timestamp, ISO 8601 o datetime)
+        puntuacion (float, opcional): Puntuación de una corrección
+        errores (dict, opcional): Número de errores por categoría
+        palabras (int): Palabras del texto corregido (solo correcciones)
+        nivel (str, opcional): Nivel MCER con el que se realizó
+        tema (str, opcional): Tema de la actividad
+        calificacion (float, opcional): Calificación de un simulacro
+
+    Returns:
+        dict: El mismo resumen actualizado
+    """
+    timestamp = to_timestamp(fecha)
+    if timestamp is None:
+        timestamp = datetime.now().timestamp()
+
+    rollup["totales"][tipo] = rollup["totales"].get(tipo, 0) + 1
+    rollup["palabras"] += palabras
+
+    for categoria, cantidad in (errores or {}).items():
+        rollup["errores_por_tipo"][categoria] = rollup["errores_por_tipo"].get(categoria, 0) + cantidad
+
+    if puntuacion is not None:
+        acumulado = rollup["puntuacion"]
+        acumulado["suma"] += puntuacion
+        acumulado["cuenta"] += 1
+        if acumulado["primera"] is None:
+            acumulado["primera"] = puntuacion
+        acumulado["ultima"] = puntuacion
+
+    if calificacion is not None:
+        rollup["calificacion_simulacros"]["suma"] += calificacion
+        rollup["calificacion_simulacros"]["cuenta"] += 1
+
+    if tema:
+        rollup["temas"][tema] = rollup["temas"].get(tema, 0) + 1
+
+    # Recuentos diarios y semanales
+    clave_dia, clave_semana = _claves_periodo(timestamp)
+    for buckets, clave in ((rollup["por_dia"], clave_dia), (rollup["por_semana"], clave_semana)):
+        bucket = buckets.setdefault(clave, _nuevo_bucket())
+        bucket[tipo] += 1
+        bucket["palabras"] += palabras
+        if puntuacion is not None:
+            bucket["puntuacion_suma"] += puntuacion
+            bucket["puntuacion_cuenta"] += 1
+
+    # Historial de nivel: solo se registra cuando cambia
+    if nivel:
+        historial = rollup["historial_nivel"]
+        if not historial or historial[-1]["nivel"] != nivel:
+            historial.append({"fecha": timestamp, "nivel": nivel})
+
+    # Intervalos entre actividades (en días completos, como timedelta.days)
+    ultima = rollup["ultima_actividad"]
+    if ultima is not None and timestamp >= ultima:
+        intervalo = (timestamp - ultima) // SEGUNDOS_DIA
+        stats = rollup["intervalos"]
+        stats["cuenta"] += 1
+        delta = intervalo - stats["media"]
+        stats["media"] += delta / stats["cuenta"]
+        stats["m2"] += delta * (intervalo - stats["media"])
+
+    if rollup["primera_actividad"] is None or timestamp < rollup["primera_actividad"]:
+        rollup["primera_actividad"] = timestamp
+    if ultima is None or timestamp > ultima:
+        rollup["ultima_actividad"] = timestamp
+
+    rollup["actualizado"] = datetime.now().timestamp()
+    return rollup
+
+def _errores_por_categoria(errores):
+    """Número de errores por categoría de una corrección (formato lista o recuento)."""
+    if isinstance(errores, dict):
+        errores = [{"categoria": c, "cantidad": n} for c, n in errores.items()]
+    if not isinstance(errores, (list, tuple)):
+        return {}
+    por_categoria = {}
+    for error in errores:
+        if not isinstance(error, dict):
+            continue
+        cantidad = error.get("cantidad", 0)
+        if not isinstance(cantidad, (int, float)) or isinstance(cantidad, bool):
+            cantidad = 0
+        categoria = str(error.get("categoria", "Otro"))
+        por_categoria[categoria] = por_categoria.get(categoria, 0) + cantidad
+    return por_categoria
+
+def _actualizar_ewma(media, valor, peso=1):
+    """
+    Incorpora un valor a una media móvil exponencial (rápida y lenta).
+    Un peso de k equivale a observar el valor k veces seguidas.
+    """
+    for campo, alfa in (("rapida", EWMA_ALFA_RAPIDA), ("lenta", EWMA_ALFA_LENTA)):
+        retencion = (1 - alfa) ** peso
+        media[campo] = retencion * media[campo] + (1 - retencion) * valor
+    media["peso"] += peso
+
+def _valor_ewma(media, campo, pasos=None, ultimo_paso=None):
+    """
+    Valor corregido de una media móvil exponencial (sin el sesgo hacia cero
+    del arranque).
+
+    Args:
+        media (dict): Estado de la media
+        campo (str): "rapida" o "lenta"
+        pasos (int, opcional): Pasos totales de la serie, si la media solo se
+            actualiza cuando el valor es distinto de cero (errores por categoría)
+        ultimo_paso (int, opcional): Paso de su última actualización
+
+    Returns:
+        float: Media, o None si aún no tiene observaciones
+    """
+    alfa = EWMA_ALFA_RAPIDA if campo == "rapida" else EWMA_ALFA_LENTA
+    if pasos is None:
+        pasos, valor = media["peso"], media[campo]
+    else:
+        # Los pasos sin errores de la categoría equivalen a observar 0
+        valor = media[campo] * (1 - alfa) ** (pasos - ultimo_paso)
+    if not pasos:
+        return None
+    return valor / (1 - (1 - alfa) ** pasos)
+
+def _ewma(rollup):
+    """Medias móviles del resumen (los resúmenes anteriores a la versión 2 no las tienen)."""
+    if "ewma" not in rollup:
+        rollup["ewma"] = new_rollup()["ewma"]
+    return rollup["ewma"]
+
+def _actualizar_ewma_nivel(rollup, nivel, puntuacion, peso):
+    """Incorpora una puntuación a la media móvil de su nivel (para el nivel estimado)."""
+    if nivel not in NIVELES_MCER or not isinstance(puntuacion, (int, float)) or isinstance(puntuacion, bool):
+        return
+    niveles = _ewma(rollup)["niveles"]
+    _actualizar_ewma(niveles.setdefault(nivel, _nueva_ewma()), float(puntuacion), peso)
+
+def _actualizar_ewma_correccion(rollup, correccion, palabras):
+    """
+    Actualiza las medias móviles con una corrección: puntuación, palabras y
+    errores por categoría. Las categorías sin errores en esta corrección no se
+    tocan (su caída se aplica al leerlas), así que el coste no depende del
+    número de categorías conocidas.
+    """
+    ewma = _ewma(rollup)
+    ewma["correcciones"] += 1
+    paso = ewma["correcciones"]
+
+    puntuacion = correccion.get("puntuacion")
+    if isinstance(puntuacion, (int, float)) and not isinstance(puntuacion, bool):
+        _actualizar_ewma(ewma["puntuacion"], float(puntuacion))
+    _actualizar_ewma(ewma["palabras"], float(palabras))
+
+    for categoria, cantidad in _errores_por_categoria(correccion.get("errores")).items():
+        media = ewma["errores"].setdefault(categoria, {"rapida": 0.0, "lenta": 0.0, "paso": 0, "cuenta": 0})
+        for campo, alfa in (("rapida", EWMA_ALFA_RAPIDA), ("lenta", EWMA_ALFA_LENTA)):
+            # Caída de los pasos sin errores de la categoría más el valor de este
+            media[campo] = media[campo] * (1 - alfa) ** (paso - media["paso"]) + alfa * cantidad
+        media["paso"] = paso
+        media["cuenta"] += 1
+
+def apply_correction(rollup, correccion):
+    """
+    Incorpora un documento de corrección al resumen.
+
+    Args:
+        rollup (dict): Resumen a actualizar
+        correccion (dict): Documento de corrección guardado
+
+    Returns:
+        dict: Resumen actualizado
+    """
+    errores = correccion.get("errores")
+    if "texto_original" in correccion or not isinstance(correccion.get("palabras"), int):
+        palabras = len(str(correccion.get("texto_original", "")).split())
+    else:
+        # Resumen sin el texto (pending_correction o documento comprimido)
+        palabras = correccion["palabras"]
+    _actualizar_ewma_correccion(rollup, correccion, palabras)
+    _actualizar_ewma_nivel(rollup, correccion.get("nivel"), correccion.get("puntuacion"), peso=1)
+    return apply_activity(
+        rollup, "correcciones", correccion.get("fecha"),
+        puntuacion=correccion.get("puntuacion"),
+        errores=errores if isinstance(errores, dict) else None,
+        palabras=palabras,
+        nivel=correccion.get("nivel"),
+        tema=correccion.get("tema")
+    )
+
+def pending_correction(correccion):
+    """
+    Resumen de una corrección con los campos que usa apply_correction, para
+    guardarlo como pendiente sin el texto.
+
+    Args:
+        correccion (dict): Documento de corrección
+
+    Returns:
+        dict: Fecha, puntuación, errores, nivel, tema y palabras
+    """
+    return {
+        "fecha": correccion.get("fecha"),
+        "puntuacion": correccion.get("puntuacion"),
+        "errores": correccion.get("errores"),
+        "nivel": correccion.get("nivel"),
+        "tema": correccion.get("tema"),
+        "palabras": len(str(correccion.get("texto_original", "")).split())
+    }
+
+def apply_simulacro(rollup, simulacro):
+    """
+    Incorpora un resultado de simulacro al resumen.
+
+    Args:
+        rollup (dict): Resumen a actualizar
+        simulacro (dict): Documento de simulacro guardado
+
+    Returns:
+        dict: Resumen actualizado
+    """
+    # Para el nivel estimado los simulacros pesan el doble que las correcciones
+    _actualizar_ewma_nivel(rollup, simulacro.get("nivel"), simulacro.get("puntuacion"), peso=2)
+    return apply_activity(
+        rollup, "simulacros", simulacro.get("fecha"),
+        nivel=simulacro.get("nivel"),
+        tema=simulacro.get("tema"),
+        calificacion=simulacro.get("calificacion")
+    )
+
+def apply_ejercicio(rollup, ejercicio):
+    """
+    Incorpora un ejercicio al resumen.
+
+    Args:
+        rollup (dict): Resumen a actualizar
+        ejercicio (dict): Documento de ejercicio guardado
+
+    Returns:
+        dict: Resumen actualizado
+    """
+    return apply_activity(
+        rollup, "ejercicios", ejercicio.get("fecha") or ejercicio.get("fecha_generacion"),
+        nivel=ejercicio.get("nivel"),
+        tema=ejercicio.get("tema")
+    )
+
+def build_rollup(correcciones, simulacros, ejercicios):
+    """
+    Reconstruye un resumen completo a partir del historial (usuarios sin resumen previo).
+
+    Args:
+        correcciones (list): Correcciones del usuario
+        simulacros (list): Simulacros del usuario
+        ejercicios (list): Ejercicios del usuario
+
+    Returns:
+        dict: Resumen equivalente a haber aplicado cada actividad al guardarla
+    """
+    actividades = [(c, apply_correction) for c in correcciones] + \
+                  [(s, apply_simulacro) for s in simulacros] + \
+                  [(e, apply_ejercicio) for e in ejercicios]
+    # Aplicar en orden cronológico, como si se hubieran ido guardando
+    actividades.sort(key=lambda item: to_timestamp(item[0].get("fecha")) or 0)
+
+    rollup = new_rollup()
+    for documento, aplicar in actividades:
+        aplicar(rollup, documento)
+    return rollup
+
+def _diversidad(temas):
+    """Índice de diversidad de temas (entropía de Shannon escalada a 0-10)."""
+    total = sum(temas.values())
+    if not total:
+        return None
+    diversidad = -sum((n / total) * math.log(n / total) for n in temas.values() if n)
+    return min(10, diversidad * 3)
+
+def metrics_from_rollup(rollup, periodo_dias=None):
+    """
+    Calcula las métricas de progreso del panel a partir del resumen.
+
+    Sin periodo, las métricas coinciden con utils.analytics.calcular_metricas_progreso
+    sobre el historial completo. Con periodo, se calculan con los recuentos diarios,
+    por lo que la consistencia es una aproximación a resolución de días y la
+    diversidad de temas se refiere a todo el historial.
+
+    Args:
+        rollup (dict): Resumen de progreso
+        periodo_dias (int, opcional): Limitar a los últimos N días
+
+    Returns:
+        dict: {"total_correcciones", "total_simulacros", "total_ejercicios", "metricas"}
+    """
+    if periodo_dias is None:
+        totales = rollup["totales"]
+        metricas = {}
+
+        acumulado = rollup["puntuacion"]
+        if totales["correcciones"] >= 2 and acumulado["cuenta"] >= 2 and acumulado["primera"]:
+            tasa_mejora = (acumulado["ultima"] - acumulado["primera"]) / acumulado["primera"] * 100
+            metricas["tasa_mejora"] = max(0, min(100, tasa_mejora))
+
+        if totales["correcciones"]:
+            metricas["palabras_por_sesion"] = rollup["palabras"] / totales["correcciones"]
+
+        intervalos = rollup["intervalos"]
+        if intervalos["cuenta"]:
+            desviacion = math.sqrt(intervalos["m2"] / intervalos["cuenta"]) if intervalos["cuenta"] > 1 else 0
+            metricas["consistencia"] = 10.0 if desviacion == 0 else min(10.0, 10.0 / (1 + 0.5 * desviacion))
+
+            total_actividades = sum(totales.values())
+            dias_totales = int((rollup["ultima_actividad"] - rollup["primera_actividad"]) // SEGUNDOS_DIA)
+            if dias_totales > 0:
+                metricas["sesiones_por_semana"] = min(7, total_actividades / dias_totales * 7)
+
+        diversidad = _diversidad(rollup["temas"])
+        if diversidad is not None:
+            metricas["diversidad_temas"] = diversidad
+
+        return {
+            "total_correcciones": totales["correcciones"],
+            "total_simulacros": totales["simulacros"],
+            "total_ejercicios": totales["ejercicios"],
+            "metricas": metricas
+        }
+
+    # Periodo: agregar los días dentro de la ventana
+    desde = (datetime.now() - timedelta(days=periodo_dias)).date().isoformat()
+    dias = sorted((dia, bucket) for dia, bucket in rollup["por_dia"].items() if dia >= desde)
+
+    totales = {tipo: sum(bucket[tipo] for _, bucket in dias) for tipo in TIPOS_ACTIVIDAD}
+    metricas = {}
+
+    puntuaciones = [b["puntuacion_suma"] / b["puntuacion_cuenta"] for _, b in dias if b["puntuacion_cuenta"]]
+    if totales["correcciones"] >= 2 and len(puntuaciones) >= 2 and puntuaciones[0] > 0:
+        tasa_mejora = (puntuaciones[-1] - puntuaciones[0]) / puntuaciones[0] * 100
+        metricas["tasa_mejora"] = max(0, min(100, tasa_mejora))
+
+    if totales["correcciones"]:
+        metricas["palabras_por_sesion"] = sum(b["palabras"] for _, b in dias) / totales["correcciones"]
+
+    # Fechas de actividad a resolución de días
+    fechas = []
+    for dia, bucket in dias:
+        fechas.extend([datetime.fromisoformat(dia)] * sum(bucket[tipo] for tipo in TIPOS_ACTIVIDAD))
+    if len(fechas) >= 2:
+        diferencias = [(fechas[i + 1] - fechas[i]).days for i in range(len(fechas) - 1)]
+        media = sum(diferencias) / len(diferencias)
+        desviacion = math.sqrt(sum((d - media) ** 2 for d in diferencias) / len(diferencias)) if len(diferencias) > 1 else 0
+        metricas["consistencia"] = 10.0 if desviacion == 0 else min(10.0, 10.0 / (1 + 0.5 * desviacion))
+
+        dias_totales = (fechas[-1] - fechas[0]).days
+        if dias_totales > 0:
+            metricas["sesiones_por_semana"] = min(7, len(fechas) / dias_totales * 7)
+
+    diversidad = _diversidad(rollup["temas"])
+    if diversidad is not None:
+        metricas["diversidad_temas"] = diversidad
+
+    return {
+        "total_correcciones": totales["correcciones"],
+        "total_simulacros": totales["simulacros"],
+        "total_ejercicios": totales["ejercicios"],
+        "metricas": metricas
+    }
+
+def average_score(rollup):
+    """
+    Puntuación media de las correcciones del resumen.
+
+    Args:
+        rollup (dict): Resumen de progreso
+
+    Returns:
+        float: Media, o 0 si no hay puntuaciones
+    """
+    acumulado = rollup["puntuacion"]
+    return acumulado["suma"] / acumulado["cuenta"] if acumulado["cuenta"] else 0
+
+def _clasificar(reciente, historica, subida, bajada, etiquetas):
+    """Etiqueta de tendencia comparando la media reciente con la histórica."""
+    if reciente > historica * subida:
+        return etiquetas[0]
+    if reciente < historica * bajada:
+        return etiquetas[1]
+    return "estable"
+
+def trends_from_rollup(rollup):
+    """
+    Tendencias de las correcciones a partir de las medias móviles del resumen:
+    la media rápida (últimas correcciones) frente a la lenta (historial), con
+    los mismos umbrales que utils.analytics.analizar_tendencias.
+
+    Args:
+        rollup (dict): Resumen de progreso
+
+    Returns:
+        dict: {"tendencia_general", "tendencias_detalladas"}, o {} sin correcciones
+    """
+    ewma = rollup.get("ewma")
+    if not ewma or not ewma["correcciones"]:
+        return {}
+    if ewma["correcciones"] < 2:
+        return {"tendencia_general": "estable"}
+
+    tendencias = {}
+    if ewma["puntuacion"]["peso"] >= 2:
+        tendencias["puntuacion"] = _clasificar(
+            _valor_ewma(ewma["puntuacion"], "rapida"), _valor_ewma(ewma["puntuacion"], "lenta"),
+            1.1, 0.9, ("mejora", "deterioro")
+        )
+    tendencias["palabras"] = _clasificar(
+        _valor_ewma(ewma["palabras"], "rapida"), _valor_ewma(ewma["palabras"], "lenta"),
+        1.2, 0.8, ("aumento", "disminución")
+    )
+
+    pasos = ewma["correcciones"]
+    tendencias_errores = {}
+    for categoria, media in ewma["errores"].items():
+        if media["cuenta"] < 2:
+            continue
+        reciente = _valor_ewma(media, "rapida", pasos, media["paso"])
+        historica = _valor_ewma(media, "lenta", pasos, media["paso"])
+        if historica == 0:
+            tendencias_errores[categoria] = "aumento" if reciente > 0 else "estable"
+        else:
+            # Menos errores recientes es una mejora
+            tendencias_errores[categoria] = _clasificar(reciente, historica, 1.3, 0.7, ("deterioro", "mejora"))
+
+    if tendencias.get("puntuacion") == "mejora" and all(v != "deterioro" for v in tendencias_errores.values()):
+        tendencia_general = "mejora"
+    elif tendencias.get("puntuacion") == "deterioro" or any(v == "deterioro" for v in tendencias_errores.values()):
+        tendencia_general = "deterioro"
+    else:
+        tendencia_general = "estable"
+
+    return {
+        "tendencia_general": tendencia_general,
+        "tendencias_detalladas": {**tendencias, "errores": tendencias_errores}
+    }
+
+def level_from_rollup(rollup):
+    """
+    Nivel estimado a partir de las medias móviles de puntuación por nivel
+    (correcciones y simulacros, que pesan el doble), con el mismo criterio
+    que utils.analytics.calcular_nivel_estimado pero dando más peso a la
+    actividad reciente.
+
+    Args:
+        rollup (dict): Resumen de progreso
+
+    Returns:
+        dict: {"nivel", "confianza", "puntuacion"}
+    """
+    sin_nivel = {"nivel": None, "confianza": 0, "puntuacion": 0}
+    niveles = (rollup.get("ewma") or {}).get("niveles") or {}
+    promedios = {nivel: 0.0 for nivel in NIVELES_MCER}
+    for nivel, media in niveles.items():
+        if nivel in promedios:
+            promedios[nivel] = _valor_ewma(media, "lenta") or 0.0
+
+    nivel = max(promedios, key=promedios.get)
+    if promedios[nivel] <= 0:
+        return sin_nivel
+
+    ordenados = sorted(promedios.values(), reverse=True)
+    if ordenados[1] > 0:
+        confianza = min(100, (ordenados[0] / ordenados[1] - 1) * 100)
+    else:
+        confianza = 90
+    return {"nivel": nivel, "confianza": confianza, "puntuacion": promedios[nivel]}
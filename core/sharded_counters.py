@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Contadores distribuidos de estadísticas de usuario
+--------------------------------------------------
+Firestore limita la frecuencia de escritura sostenida sobre un mismo documento,
+así que los contadores que cambian con cada corrección (numero_correcciones,
+errores_por_tipo y ultima_correccion) no se escriben en el documento del
+usuario, sino como incrementos atómicos sobre uno de varios fragmentos
+(usuarios/{uid}/contadores/{n}) elegido al azar. Varias correcciones
+simultáneas del mismo usuario ya no compiten por un único documento.
+
+El valor de cada contador es el guardado en el documento del usuario (valor
+base, que conserva los datos anteriores a los fragmentos) más la suma de todos
+los fragmentos. La lectura agregada se sirve desde la caché de perfiles.
+"""
+
+import logging
+import random
+
+from config.settings import COUNTER_SHARDS
+
+logger = logging.getLogger(__name__)
+
+# Subcolección de fragmentos dentro del documento del usuario
+COUNTERS_COLLECTION = "contadores"
+
+def shard_ref(user_ref, shard=None):
+    """
+    Referencia a un fragmento de contadores del usuario.
+
+    Args:
+        user_ref: Referencia al documento del usuario
+        shard (int, opcional): Número de fragmento (al azar si no se indica)
+
+    Returns:
+        DocumentReference: usuarios/{uid}/contadores/{n}
+    """
+    if shard is None:
+        shard = random.randrange(COUNTER_SHARDS)
+    return user_ref.collection(COUNTERS_COLLECTION).document(str(shard))
+
+def correction_increments(errores, fecha):
+    """
+    Operaciones atómicas que registran una corrección en un fragmento.
+    Se aplican con set(..., merge=True), sin leer el fragmento.
+
+    Args:
+        errores (dict): Número de errores por categoría (claves normalizadas)
+        fecha (float): Timestamp de la corrección
+
+    Returns:
+        dict: Campos con transformaciones Increment/Maximum de Firestore
+    """
+    # Importar dinámicamente para evitar dependencias circulares
+    from firebase_admin import firestore
+
+    return {
+        "numero_correcciones": firestore.Increment(1),
+        "errores_por_tipo": {
+            categoria: firestore.Increment(cantidad)
+            for categoria, cantidad in errores.items() if cantidad
+        },
+        "ultima_correccion": firestore.Maximum(fecha)
+    }
+
+def sum_shards(shards):
+    """
+    Suma los contadores de varios fragmentos.
+
+    Args:
+        shards (iterable): Diccionarios de los fragmentos
+
+    Returns:
+        dict: {"numero_correcciones", "errores_por_tipo", "ultima_correccion"}
+    """
+    totales = {"numero_correcciones": 0, "errores_por_tipo": {}, "ultima_correccion": None}
+    for datos in shards:
+        totales["numero_correcciones"] += datos.get("numero_correcciones", 0)
+        for categoria, cantidad in (datos.get("errores_por_tipo") or {}).items():
+            totales["errores_por_tipo"][categoria] = totales["errores_por_tipo"].get(categoria, 0) + cantidad
+        ultima = datos.get("ultima_correccion")
+        if ultima is not None and (totales["ultima_correccion"] is None or ultima > totales["ultima_correccion"]):
+            totales["ultima_correccion"] = ultima
+    return totales
+
+def read_counters(user_ref, transaction=None):
+    """
+    Lee y suma todos los fragmentos de contadores de un usuario.
+
+    Args:
+        user_ref: Referencia al documento del usuario
+        transaction: Transacción en curso (opcional)
+
+    Returns:
+        dict: Totales de los fragmentos (ver sum_shards)
+    """
+    docs = user_ref.collection(COUNTERS_COLLECTION).stream(transaction=transaction)
+    return sum_shards(doc.to_dict() or {} for doc in docs)
+
+def merge_counters(user_data, totales):
+    """
+    Añade los totales de los fragmentos a los valores base del perfil.
+
+    Args:
+        user_data (dict): Datos del usuario (se modifican en el sitio)
+        totales (dict): Totales de los fragmentos
+
+    Returns:
+        dict: Los mismos datos del usuario con los contadores completos
+    """
+    user_data["numero_correcciones"] = (user_data.get("numero_correcciones") or 0) + totales["numero_correcciones"]
+
+    errores = dict(user_data.get("errores_por_tipo") or {})
+    for categoria, cantidad in totales["errores_por_tipo"].items():
+        errores[categoria] = errores.get(categoria, 0) + cantidad
+    user_data["errores_por_tipo"] = errores
+
+    ultima = totales["ultima_correccion"]
+    if ultima is not None and (user_data.get("ultima_correccion") or 0) < ultima:
+        user_data["ultima_correccion"] = ultima
+    return user_data
+
+def set_base_counters(db, uid, numero_correcciones):
+    """
+    Fija el número total de correcciones de un usuario (p. ej. una corrección
+    manual), ajustando el valor base para que la suma con los fragmentos dé el total.
+
+    Args:
+        db: Cliente de Firestore
+        uid (str): ID del usuario
+        numero_correcciones (int): Total deseado
+
+    Returns:
+        bool: True si se actualizó
+    """
+    # Importar dinámicamente para evitar dependencias circulares
+    from firebase_admin import firestore
+    from config.settings import FIREBASE_COLLECTION_USERS
+
+    user_ref = db.collection(FIREBASE_COLLECTION_USERS).document(uid)
+
+    @firestore.transactional
+    def ajustar(transaction):
+        totales = read_counters(user_ref, transaction=transaction)
+        transaction.update(user_ref, {
+            "numero_correcciones": numero_correcciones - totales["numero_correcciones"]
+        })
+
+    try:
+        ajustar(db.transaction())
+        return True
+    except Exception as e:
+        logger.error(f"Error fijando contadores del usuario {uid}: {e}")
+        return False
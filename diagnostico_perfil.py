@@ -219,18 +219,24 @@ def diagnosticar_perfil_estudiante():
         
         if submitted:
             try:
-                from core.firebase_client import update_user_profile
+                from core.firebase_client import update_user_profile, initialize_firebase
+                from core.profile_cache import profile_cache
+                from core.sharded_counters import set_base_counters
                 
                 # Preparar datos actualizados
                 profile_data = {
                     "nivel": nivel_input,
-                    "idioma_nativo": idioma_input,
-                    "numero_correcciones": int(num_correcciones)
+                    "idioma_nativo": idioma_input
                 }
                 
                 # Actualizar perfil
                 success = update_user_profile(user_id, profile_data)
                 
+                # El número de correcciones se reparte entre fragmentos: ajustar su valor base
+                db, firebase_ok = initialize_firebase()
+                success = success and firebase_ok and set_base_counters(db, user_id, int(num_correcciones))
+                profile_cache.invalidate(user_id)
+                
                 if success:
                     st.success("✅ Perfil actualizado correctamente")
                     st.info("Recarga esta página para ver los cambios")
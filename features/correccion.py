@@ -80,13 +80,6 @@ def get_student_profile(user_id):
         if "preferencias_feedback" in user_data:
             profile["preferencias_feedback"] = user_data["preferencias_feedback"]
         
-        # Asegurar que el usuario tenga todos los campos necesarios para futuras correcciones
-        try:
-            from core.firebase_client import ensure_profile_fields
-            ensure_profile_fields(user_id)
-        except Exception as e:
-            logger.warning(f"No se pudieron asegurar campos de perfil: {e}")
-            
         return profile
     
     except Exception as e:
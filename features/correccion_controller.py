@@ -16,11 +16,11 @@ import traceback
 # Importaciones del proyecto
 from core.session_manager import get_user_info, get_session_var, set_session_var
 from features.correccion_service import corregir_texto
-from core.json_extractor import ensure_correction_structure
+from core.json_extractor import validate_correction_structure
 
 logger = logging.getLogger(__name__)
 
-def handle_correction_request(text, level, detail="Intermedio", language="español"):
+def handle_correction_request(text, level, detail="Intermedio", language="español", on_partial=None):
     """
     Maneja una solicitud de corrección de texto.
     
@@ -29,6 +29,7 @@ def handle_correction_request(text, level, detail="Intermedio", language="españ
         level (str): Nivel de español (A1-C2)
         detail (str): Nivel de detalle de la corrección
         language (str): Idioma para las explicaciones
+        on_partial (callable, opcional): Recibe resultados parciales durante el streaming
         
     Returns:
         dict: Resultado de la corrección o información de error
@@ -71,7 +72,8 @@ def handle_correction_request(text, level, detail="Intermedio", language="españ
                 nivel=level,
                 detalle=detail,
                 user_id=user_id,
-                idioma=language
+                idioma=language,
+                on_partial=on_partial
             )
             
             # Registrar tiempo de procesamiento
@@ -90,7 +92,8 @@ def handle_correction_request(text, level, detail="Intermedio", language="españ
                 }
                 
             # Asegurar estructura completa del resultado
-            result = ensure_correction_structure(correction_result, text)
+            result, diagnostico = validate_correction_structure(correction_result, text)
+            registrar_reparaciones_esquema(diagnostico, elapsed_time, len(text))
             
             # Guardar thread_id para futuras correcciones
             if "thread_id" in correction_result:
@@ -108,7 +111,8 @@ def handle_correction_request(text, level, detail="Intermedio", language="españ
                 "resultado": result,
                 "nivel": level,
                 "fecha": time.time(),
-                "tiempo_procesamiento": elapsed_time
+                "tiempo_procesamiento": elapsed_time,
+                "reparaciones_esquema": diagnostico["total"]
             })
             # Limitar historia a últimas 10 correcciones
             if len(correction_history) > 10:
@@ -133,6 +137,36 @@ def handle_correction_request(text, level, detail="Intermedio", language="españ
             "texto_original": text
         }
 
+def registrar_reparaciones_esquema(diagnostico, tiempo_respuesta, longitud_texto):
+    """
+    Registra las reparaciones que necesitó el resultado del asistente para
+    ajustarse al esquema, de modo que un aumento sostenido delate cambios
+    en el comportamiento del prompt.
+    
+    Args:
+        diagnostico (dict): Diagnóstico devuelto por la validación del esquema
+        tiempo_respuesta (float): Tiempo de procesamiento en segundos
+        longitud_texto (int): Longitud del texto corregido
+    """
+    try:
+        # Importar dinámicamente para evitar dependencias circulares
+        from core.firebase_client import save_model_metrics
+        
+        save_model_metrics(
+            modelo="correccion_texto",
+            tiempo_respuesta=tiempo_respuesta,
+            longitud_texto=longitud_texto,
+            resultado_exitoso=True,
+            detalles={
+                "reparaciones_esquema": diagnostico["total"],
+                "reparaciones_por_accion": diagnostico["por_accion"],
+                "campos_reparados": sorted({r["campo"] for r in diagnostico["reparaciones"]})
+            }
+        )
+    except Exception as e:
+        # No es crítico si falla
+        logger.warning(f"No se pudieron guardar las reparaciones del esquema: {e}")
+
 def get_correction_metrics():
     """
     Obtiene métricas sobre las correcciones realizadas en la sesión actual.
@@ -150,7 +184,8 @@ def get_correction_metrics():
                 "total_correcciones": 0,
                 "tiempo_promedio": 0,
                 "nivel_mas_comun": "Ninguno",
-                "ultima_correccion": None
+                "ultima_correccion": None,
+                "tasa_reparacion": 0
             }
         
         # Calcular métricas
@@ -166,6 +201,10 @@ def get_correction_metrics():
         
         nivel_mas_comun = max(niveles.items(), key=lambda x: x[1])[0] if niveles else "Ninguno"
         
+        # Proporción de respuestas que hubo que reparar para cumplir el esquema
+        reparadas = sum(1 for c in correction_history if c.get("reparaciones_esquema", 0) > 0)
+        tasa_reparacion = reparadas / total_correcciones
+        
         # Obtener información de la última corrección
         ultima_correccion = correction_history[-1] if correction_history else None
         
@@ -173,7 +212,8 @@ def get_correction_metrics():
             "total_correcciones": total_correcciones,
             "tiempo_promedio": tiempo_promedio,
             "nivel_mas_comun": nivel_mas_comun,
-            "ultima_correccion": ultima_correccion
+            "ultima_correccion": ultima_correccion,
+            "tasa_reparacion": tasa_reparacion
         }
         
     except Exception as e:
@@ -182,7 +222,8 @@ def get_correction_metrics():
             "total_correcciones": 0,
             "tiempo_promedio": 0,
             "nivel_mas_comun": "Error",
-            "ultima_correccion": None
+            "ultima_correccion": None,
+            "tasa_reparacion": 0
         }
 
 def display_correction_result(correction_result):
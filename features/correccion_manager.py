@@ -21,7 +21,7 @@ from core.session_manager import get_user_info, get_session_var, set_session_var
 from features.functions_definitions import get_evaluation_criteria
 
 # Importar explícitamente ambas funciones para evitar errores
-from core.firebase_client import save_correction_with_stats
+from core.firebase_client import save_correction_deferred
 
 logger = logging.getLogger(__name__)
 
@@ -377,8 +377,8 @@ def corregir_texto(texto_input, nivel, detalle="Intermedio", user_id=None, idiom
                 else:
                     puntuacion_global = 5.0  # Valor por defecto
                 
-                # Guardar en Firebase
-                correccion_id = save_correction_with_stats(
+                # Guardar en Firebase en segundo plano (el ID ya es definitivo)
+                correccion_id = save_correction_deferred(
                     user_id=user_id,
                     texto_original=texto_input,
                     texto_corregido=data.get("texto_corregido", ""),
@@ -387,7 +387,7 @@ def corregir_texto(texto_input, nivel, detalle="Intermedio", user_id=None, idiom
                     puntuacion=puntuacion_global
                 )
                 
-                logger.info(f"Corrección guardada para usuario {user_id} con ID {correccion_id}")
+                logger.info(f"Corrección encolada para usuario {user_id} con ID {correccion_id}")
             except Exception as firebase_error:
                 logger.error(f"Error guardando corrección en Firebase: {str(firebase_error)}")
                 logger.debug(traceback.format_exc())
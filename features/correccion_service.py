@@ -14,15 +14,18 @@ import traceback
 import streamlit as st
 
 # Importaciones del proyecto
-from core.clean_openai_assistant import get_clean_openai_assistants_client, extract_json_safely
+from core.clean_openai_assistant import get_clean_openai_assistants_client
 from core.session_manager import get_user_info, get_session_var, set_session_var
 from core.circuit_breaker import circuit_breaker
 from features.functions_definitions import ASSISTANT_FUNCTIONS, get_user_profile
-from core.firebase_client import save_correction_with_stats, get_user_data
-from core.json_extractor import validate_error_classification
+from core.firebase_client import save_correction_deferred, get_user_data
+from core.json_extractor import extract_json_safely, validate_error_classification, IncrementalJSONExtractor
 
 logger = logging.getLogger(__name__)
 
+# Intervalo mínimo (segundos) entre repintados de resultados parciales
+PARTIAL_RENDER_INTERVAL = 0.3
+
 # System prompt mejorado para el asistente de corrección con instrucciones explícitas de clasificación
 SYSTEM_PROMPT_CORRECTION = """🧩 Contexto:
 Eres un experto corrector de textos para estudiantes de Español como Lengua Extranjera (ELE). 
@@ -276,6 +279,41 @@ def obtener_perfil_estudiante(user_id):
             "estadisticas_errores": {}
         }
 
+def ejecutar_tool_calls(tool_calls):
+    """
+    Ejecuta las llamadas a funciones solicitadas por el asistente.
+    
+    Args:
+        tool_calls (list): Llamadas a funciones de required_action
+        
+    Returns:
+        list: Resultados en el formato esperado por submit_tool_outputs
+    """
+    tool_outputs = []
+    
+    for tool_call in tool_calls:
+        function_name = tool_call.get("function", {}).get("name")
+        function_args = tool_call.get("function", {}).get("arguments", "{}")
+        
+        # Parsear argumentos
+        try:
+            args = json.loads(function_args)
+        except json.JSONDecodeError:
+            logger.error(f"Error al parsear argumentos: {function_args}")
+            args = {}
+        
+        # Ejecutar la función correspondiente
+        from features.functions_definitions import execute_function
+        result = execute_function(function_name, args)
+        
+        # Añadir resultado a los outputs
+        tool_outputs.append({
+            "tool_call_id": tool_call.get("id"),
+            "output": json.dumps(result)
+        })
+    
+    return tool_outputs
+
 def process_function_calls(assistant_id, thread_id, run_id, client):
     """
     Procesa las llamadas a funciones del asistente.
@@ -315,28 +353,7 @@ def process_function_calls(assistant_id, thread_id, run_id, client):
             return False
         
         # Procesar cada llamada a función
-        tool_outputs = []
-        
-        for tool_call in tool_calls:
-            function_name = tool_call.get("function", {}).get("name")
-            function_args = tool_call.get("function", {}).get("arguments", "{}")
-            
-            # Parsear argumentos
-            try:
-                args = json.loads(function_args)
-            except json.JSONDecodeError:
-                logger.error(f"Error al parsear argumentos: {function_args}")
-                args = {}
-            
-            # Ejecutar la función correspondiente
-            from features.functions_definitions import execute_function
-            result = execute_function(function_name, args)
-            
-            # Añadir resultado a los outputs
-            tool_outputs.append({
-                "tool_call_id": tool_call.get("id"),
-                "output": json.dumps(result)
-            })
+        tool_outputs = ejecutar_tool_calls(tool_calls)
         
         # Enviar los resultados a la API
         submit_response = client._api_request(
@@ -359,7 +376,217 @@ def process_function_calls(assistant_id, thread_id, run_id, client):
         logger.debug(f"Detalles del error:\n{error_details}")
         return False
 
-def corregir_texto(texto_input, nivel, detalle="Intermedio", user_id=None, idioma="español"):
+def ejecutar_run_polling(client, thread_id, assistant_id):
+    """
+    Ejecuta el asistente de corrección y espera el resultado consultando su estado.
+    
+    Args:
+        client: Cliente de OpenAI Assistants
+        thread_id (str): ID del thread
+        assistant_id (str): ID del asistente
+        
+    Returns:
+        tuple: (contenido_texto, mensaje_error); mensaje_error es None si todo fue bien
+    """
+    # Ejecutar asistente con las funciones disponibles
+    run_response = client._api_request(
+        "POST", 
+        f"/threads/{thread_id}/runs", 
+        data={
+            "assistant_id": assistant_id,
+            "tools": ASSISTANT_FUNCTIONS,
+            # Forzar formato JSON para garantizar estructura
+            "response_format": {"type": "json_object"}
+        },
+        timeout=60
+    )
+    
+    if not run_response or "id" not in run_response:
+        return None, "Error iniciando la ejecución del asistente"
+        
+    run_id = run_response["id"]
+    logger.info(f"Ejecución iniciada: {run_id}")
+    
+    # Esperar a que la ejecución se complete
+    max_wait_time = 180  # 3 minutos máximo
+    start_wait_time = time.time()
+    polling_interval = 1
+    max_polling_interval = 5
+    polling_count = 0
+    
+    # Bucle de polling para esperar la respuesta
+    while True:
+        # Verificar timeout
+        if time.time() - start_wait_time > max_wait_time:
+            return None, f"La operación tardó demasiado tiempo (más de {max_wait_time} segundos)"
+        
+        # Consultar estado de la ejecución
+        run_status_response = client.get_run(thread_id, run_id)
+        
+        if not run_status_response or "status" not in run_status_response:
+            return None, "Error al verificar el estado de la ejecución"
+            
+        status = run_status_response["status"]
+        polling_count += 1
+        
+        # Mostrar estado solo cada 5 consultas para reducir ruido en logs
+        if polling_count % 5 == 0:
+            logger.info(f"Estado de ejecución ({polling_count}): {status}")
+        
+        # Verificar si ha terminado
+        if status == "completed":
+            logger.info(f"Ejecución completada después de {polling_count} consultas")
+            break
+            
+        # Verificar si ha fallado
+        if status in ["failed", "cancelled", "expired"]:
+            error_detail = run_status_response.get("last_error", {})
+            error_message = error_detail.get("message", "Unknown error")
+            return None, f"La ejecución falló: {error_message}"
+        
+        # Verificar si requiere acción (función)
+        if status == "requires_action":
+            logger.info("La ejecución requiere acción (function calling)")
+            
+            # Procesar llamadas a funciones
+            function_success = process_function_calls(assistant_id, thread_id, run_id, client)
+            
+            if not function_success:
+                return None, "Error procesando llamadas a funciones"
+            
+            # Continuar con el siguiente ciclo (no dormir)
+            continue
+        
+        # Esperar antes de verificar estado de nuevo
+        time.sleep(polling_interval)
+        
+        # Ajustar intervalo de polling (espera adaptativa)
+        polling_interval = min(polling_interval * 1.5, max_polling_interval)
+    
+    # Obtener mensajes
+    messages_response = client.list_messages(thread_id)
+    
+    if not messages_response or "data" not in messages_response:
+        return None, "Error al obtener mensajes del thread"
+        
+    # Buscar el mensaje más reciente del asistente
+    assistant_message = None
+    for message in messages_response["data"]:
+        if message["role"] == "assistant":
+            assistant_message = message
+            break
+    
+    if not assistant_message:
+        return None, "No se encontró respuesta del asistente"
+        
+    # Extraer contenido del mensaje
+    content_text = ""
+    for content_item in assistant_message.get("content", []):
+        if content_item["type"] == "text":
+            content_text += content_item["text"]["value"]
+    
+    return content_text, None
+
+def ejecutar_run_streaming(client, thread_id, assistant_id, on_partial):
+    """
+    Ejecuta el asistente de corrección en streaming, notificando resultados parciales.
+    
+    Cada fragmento de texto recibido alimenta un IncrementalJSONExtractor y, como
+    máximo cada PARTIAL_RENDER_INTERVAL segundos, se entrega a on_partial la mejor
+    estructura disponible para que la vista muestre la corrección según llega.
+    
+    Args:
+        client: Cliente de OpenAI Assistants
+        thread_id (str): ID del thread
+        assistant_id (str): ID del asistente
+        on_partial (callable): Función que recibe el diccionario parcial
+        
+    Returns:
+        tuple: (contenido_texto, mensaje_error); mensaje_error es None si todo fue bien
+    """
+    max_wait_time = 180  # 3 minutos máximo, igual que en el modo polling
+    start_wait_time = time.time()
+    ultimo_parcial = 0
+    
+    extractor = IncrementalJSONExtractor()
+    fragmentos = []
+    
+    eventos = client.stream_run(
+        thread_id,
+        assistant_id,
+        tools=ASSISTANT_FUNCTIONS,
+        # Forzar formato JSON para garantizar estructura
+        response_format={"type": "json_object"}
+    )
+    
+    while eventos is not None:
+        siguientes_eventos = None
+        
+        for evento, datos in eventos:
+            if time.time() - start_wait_time > max_wait_time:
+                return None, f"La operación tardó demasiado tiempo (más de {max_wait_time} segundos)"
+            
+            if evento == "thread.message.delta":
+                for content_item in datos.get("delta", {}).get("content", []):
+                    if content_item.get("type") == "text":
+                        fragmento = content_item.get("text", {}).get("value", "")
+                        fragmentos.append(fragmento)
+                        extractor.feed(fragmento)
+                
+                # Limitar la frecuencia de repintado de la vista
+                ahora = time.time()
+                if ahora - ultimo_parcial >= PARTIAL_RENDER_INTERVAL:
+                    ultimo_parcial = ahora
+                    _notificar_parcial(on_partial, extractor.snapshot())
+            
+            elif evento == "thread.run.requires_action":
+                logger.info("La ejecución requiere acción (function calling)")
+                tool_calls = datos.get("required_action", {}).get("submit_tool_outputs", {}).get("tool_calls", [])
+                if not tool_calls:
+                    return None, "Error procesando llamadas a funciones"
+                
+                # La ejecución continúa en un nuevo stream tras enviar los resultados
+                tool_outputs = ejecutar_tool_calls(tool_calls)
+                siguientes_eventos = client.stream_tool_outputs(thread_id, datos.get("id"), tool_outputs)
+                break
+            
+            elif evento in ("thread.run.failed", "thread.run.cancelled", "thread.run.expired"):
+                error_detail = datos.get("last_error") or {}
+                error_message = error_detail.get("message", "Unknown error")
+                return None, f"La ejecución falló: {error_message}"
+            
+            elif evento == "error":
+                error_message = datos.get("error", "Unknown error")
+                if isinstance(error_message, dict):
+                    error_message = error_message.get("message", "Unknown error")
+                return None, f"Error en la ejecución del asistente: {error_message}"
+        
+        eventos = siguientes_eventos
+    
+    content_text = "".join(fragmentos)
+    logger.info(f"Ejecución en streaming completada ({len(content_text)} caracteres)")
+    
+    # Entregar la versión final para que la vista quede completa
+    _notificar_parcial(on_partial, extractor.finish())
+    
+    return content_text, None
+
+def _notificar_parcial(on_partial, parcial):
+    """
+    Entrega un resultado parcial a la vista sin interrumpir la corrección si falla.
+    
+    Args:
+        on_partial (callable): Función que recibe el diccionario parcial
+        parcial (dict): Resultado parcial extraído hasta el momento
+    """
+    if not isinstance(parcial, dict):
+        return
+    try:
+        on_partial(parcial)
+    except Exception as e:
+        logger.warning(f"Error mostrando resultado parcial: {str(e)}")
+
+def corregir_texto(texto_input, nivel, detalle="Intermedio", user_id=None, idioma="español", on_partial=None):
     """
     Procesa un texto con OpenAI Assistants v2 para obtener correcciones.
     Implementación unificada con mejor manejo de errores y garantía de formato JSON.
@@ -370,6 +597,8 @@ def corregir_texto(texto_input, nivel, detalle="Intermedio", user_id=None, idiom
         detalle (str): Nivel de detalle para las correcciones
         user_id (str, opcional): ID del usuario
         idioma (str, opcional): Idioma para las explicaciones
+        on_partial (callable, opcional): Recibe resultados parciales mientras la
+            respuesta llega en streaming
         
     Returns:
         dict: Resultado de la corrección o diccionario con información de error
@@ -515,130 +744,18 @@ IMPORTANTE:
                 "texto_original": texto_input
             }
         
-        # Ejecutar asistente con las funciones disponibles
-        run_response = client._api_request(
-            "POST", 
-            f"/threads/{thread_id}/runs", 
-            data={
-                "assistant_id": assistant_id,
-                "tools": ASSISTANT_FUNCTIONS,
-                # Forzar formato JSON para garantizar estructura
-                "response_format": {"type": "json_object"}
-            },
-            timeout=60
-        )
-        
-        if not run_response or "id" not in run_response:
-            return {
-                "error": True,
-                "mensaje": "Error iniciando la ejecución del asistente",
-                "texto_original": texto_input
-            }
-            
-        run_id = run_response["id"]
-        logger.info(f"Ejecución iniciada: {run_id}")
-        
-        # Esperar a que la ejecución se complete
-        max_wait_time = 180  # 3 minutos máximo
-        start_wait_time = time.time()
-        polling_interval = 1
-        max_polling_interval = 5
-        polling_count = 0
-        
-        # Bucle de polling para esperar la respuesta
-        while True:
-            # Verificar timeout
-            if time.time() - start_wait_time > max_wait_time:
-                return {
-                    "error": True,
-                    "mensaje": f"La operación tardó demasiado tiempo (más de {max_wait_time} segundos)",
-                    "texto_original": texto_input
-                }
-            
-            # Consultar estado de la ejecución
-            run_status_response = client.get_run(thread_id, run_id)
-            
-            if not run_status_response or "status" not in run_status_response:
-                return {
-                    "error": True,
-                    "mensaje": "Error al verificar el estado de la ejecución",
-                    "texto_original": texto_input
-                }
-                
-            status = run_status_response["status"]
-            polling_count += 1
-            
-            # Mostrar estado solo cada 5 consultas para reducir ruido en logs
-            if polling_count % 5 == 0:
-                logger.info(f"Estado de ejecución ({polling_count}): {status}")
-            
-            # Verificar si ha terminado
-            if status == "completed":
-                logger.info(f"Ejecución completada después de {polling_count} consultas")
-                break
-                
-            # Verificar si ha fallado
-            if status in ["failed", "cancelled", "expired"]:
-                error_detail = run_status_response.get("last_error", {})
-                error_message = error_detail.get("message", "Unknown error")
-                return {
-                    "error": True,
-                    "mensaje": f"La ejecución falló: {error_message}",
-                    "texto_original": texto_input
-                }
-            
-            # Verificar si requiere acción (función)
-            if status == "requires_action":
-                logger.info("La ejecución requiere acción (function calling)")
-                
-                # Procesar llamadas a funciones
-                function_success = process_function_calls(assistant_id, thread_id, run_id, client)
-                
-                if not function_success:
-                    return {
-                        "error": True,
-                        "mensaje": "Error procesando llamadas a funciones",
-                        "texto_original": texto_input
-                    }
-                
-                # Continuar con el siguiente ciclo (no dormir)
-                continue
-            
-            # Esperar antes de verificar estado de nuevo
-            time.sleep(polling_interval)
-            
-            # Ajustar intervalo de polling (espera adaptativa)
-            polling_interval = min(polling_interval * 1.5, max_polling_interval)
-        
-        # Obtener mensajes
-        messages_response = client.list_messages(thread_id)
-        
-        if not messages_response or "data" not in messages_response:
-            return {
-                "error": True,
-                "mensaje": "Error al obtener mensajes del thread",
-                "texto_original": texto_input
-            }
-            
-        # Buscar el mensaje más reciente del asistente
-        assistant_message = None
-        for message in messages_response["data"]:
-            if message["role"] == "assistant":
-                assistant_message = message
-                break
+        # Ejecutar asistente: en streaming si la vista muestra resultados parciales
+        if on_partial is not None:
+            content_text, mensaje_error = ejecutar_run_streaming(client, thread_id, assistant_id, on_partial)
+        else:
+            content_text, mensaje_error = ejecutar_run_polling(client, thread_id, assistant_id)
         
-        if not assistant_message:
+        if mensaje_error:
             return {
                 "error": True,
-                "mensaje": "No se encontró respuesta del asistente",
+                "mensaje": mensaje_error,
                 "texto_original": texto_input
             }
-            
-        # Extraer contenido del mensaje
-        content_text = ""
-        for content_item in assistant_message.get("content", []):
-            if content_item["type"] == "text":
-                content_text += content_item["text"]["value"]
         
         if not content_text:
             return {
@@ -702,8 +819,8 @@ IMPORTANTE:
                 else:
                     puntuacion_global = 5.0  # Valor por defecto
                 
-                # Guardar en Firebase usando la función mejorada
-                correction_id = save_correction_with_stats(
+                # Guardar en Firebase en segundo plano (el ID ya es definitivo)
+                correction_id = save_correction_deferred(
                     user_id=user_id,
                     texto_original=texto_input,
                     texto_corregido=json_data.get("texto_corregido", ""),
@@ -713,7 +830,7 @@ IMPORTANTE:
                 )
                 
                 if correction_id:
-                    logger.info(f"Corrección guardada con ID: {correction_id}")
+                    logger.info(f"Corrección encolada para guardar con ID: {correction_id}")
                     # Añadir ID al resultado
                     json_data["correction_id"] = correction_id
                 else:
@@ -13,6 +13,11 @@ import re
 
 # Importaciones del proyecto
 from config.settings import COLORES_ERROR
+from utils.text_highlighting import (
+    generate_error_highlighting_css,
+    create_error_summary,
+    highlight_errors_in_text as highlight_original_text
+)
 
 logger = logging.getLogger(__name__)
 
@@ -41,11 +46,7 @@ def display_correccion_result(result_data):
         errores = result_data.get("errores", {})
         
         # Mostrar encabezado con saludo personalizado
-        if saludo:
-            st.markdown(f"### {saludo}")
-            
-        if tipo_texto:
-            st.markdown(f"*Tipo de texto detectado: {tipo_texto}*")
+        _mostrar_encabezado(saludo, tipo_texto)
         
         # Crear layout con columnas para texto original y corregido
         col_original, col_corregido = st.columns(2)
@@ -121,66 +122,206 @@ def display_correccion_result(result_data):
         # Mostrar análisis contextual
         if analisis_contextual:
             with st.expander("Análisis contextual", expanded=True):
-                # Crear columnas para las cuatro secciones del análisis
-                cols = st.columns(2)
-                
-                # Componentes del análisis contextual
-                componentes = [
-                    {"nombre": "Coherencia", "key": "coherencia"},
-                    {"nombre": "Cohesión", "key": "cohesion"},
-                    {"nombre": "Registro lingüístico", "key": "registro_linguistico"},
-                    {"nombre": "Adecuación cultural", "key": "adecuacion_cultural"}
-                ]
-                
-                # Mostrar cada componente
-                for i, componente in enumerate(componentes):
-                    col_idx = i % 2
-                    with cols[col_idx]:
-                        datos = analisis_contextual.get(componente["key"], {})
-                        
-                        if datos:
-                            st.markdown(f"**{componente['nombre']}**")
-                            
-                            # Puntuación
-                            puntuacion = datos.get("puntuacion", 0)
-                            st.progress(puntuacion/10.0, f"Puntuación: {puntuacion}/10")
-                            
-                            # Comentario
-                            if "comentario" in datos:
-                                st.markdown(datos["comentario"])
-                            
-                            # Sugerencias
-                            sugerencias = datos.get("sugerencias", [])
-                            if sugerencias:
-                                st.markdown("**Sugerencias de mejora:**")
-                                for sugerencia in sugerencias:
-                                    st.markdown(f"* {sugerencia}")
-                                    
-                            # Elementos destacables (solo para adecuación cultural)
-                            if componente["key"] == "adecuacion_cultural":
-                                elementos = datos.get("elementos_destacables", [])
-                                if elementos:
-                                    st.markdown("**Elementos culturales destacables:**")
-                                    for elemento in elementos:
-                                        st.markdown(f"* {elemento}")
-                            
-                            # Tipo detectado (solo para registro lingüístico)
-                            if componente["key"] == "registro_linguistico" and "tipo_detectado" in datos:
-                                st.markdown(f"**Tipo de registro detectado:** {datos['tipo_detectado']}")
-                                
-                            # Adecuación (solo para registro lingüístico)
-                            if componente["key"] == "registro_linguistico" and "adecuacion" in datos:
-                                st.markdown(f"**Adecuación:** {datos['adecuacion']}")
+                _mostrar_analisis_contextual(analisis_contextual)
         
         # Mostrar consejo final
-        if consejo_final:
-            st.markdown("### Consejo final")
-            st.success(consejo_final)
+        _mostrar_consejo_final(consejo_final)
             
     except Exception as e:
         logger.error(f"Error en display_correccion_result: {str(e)}")
         st.error(f"Error mostrando el resultado: {str(e)}")
 
+def _mostrar_encabezado(saludo, tipo_texto):
+    """
+    Muestra el saludo personalizado y el tipo de texto detectado.
+    
+    Args:
+        saludo (str): Saludo del asistente
+        tipo_texto (str): Tipo de texto detectado
+    """
+    if saludo:
+        st.markdown(f"### {saludo}")
+        
+    if tipo_texto:
+        st.markdown(f"*Tipo de texto detectado: {tipo_texto}*")
+
+def _mostrar_analisis_contextual(analisis_contextual):
+    """
+    Muestra las cuatro secciones del análisis contextual en dos columnas.
+    
+    Args:
+        analisis_contextual (dict): Análisis contextual de la corrección
+    """
+    # Crear columnas para las cuatro secciones del análisis
+    cols = st.columns(2)
+    
+    # Componentes del análisis contextual
+    componentes = [
+        {"nombre": "Coherencia", "key": "coherencia"},
+        {"nombre": "Cohesión", "key": "cohesion"},
+        {"nombre": "Registro lingüístico", "key": "registro_linguistico"},
+        {"nombre": "Adecuación cultural", "key": "adecuacion_cultural"}
+    ]
+    
+    # Mostrar cada componente
+    for i, componente in enumerate(componentes):
+        col_idx = i % 2
+        with cols[col_idx]:
+            datos = analisis_contextual.get(componente["key"], {})
+            
+            if datos:
+                st.markdown(f"**{componente['nombre']}**")
+                
+                # Puntuación
+                puntuacion = datos.get("puntuacion", 0)
+                st.progress(puntuacion/10.0, f"Puntuación: {puntuacion}/10")
+                
+                # Comentario
+                if "comentario" in datos:
+                    st.markdown(datos["comentario"])
+                
+                # Sugerencias
+                sugerencias = datos.get("sugerencias", [])
+                if sugerencias:
+                    st.markdown("**Sugerencias de mejora:**")
+                    for sugerencia in sugerencias:
+                        st.markdown(f"* {sugerencia}")
+                        
+                # Elementos destacables (solo para adecuación cultural)
+                if componente["key"] == "adecuacion_cultural":
+                    elementos = datos.get("elementos_destacables", [])
+                    if elementos:
+                        st.markdown("**Elementos culturales destacables:**")
+                        for elemento in elementos:
+                            st.markdown(f"* {elemento}")
+                
+                # Tipo detectado (solo para registro lingüístico)
+                if componente["key"] == "registro_linguistico" and "tipo_detectado" in datos:
+                    st.markdown(f"**Tipo de registro detectado:** {datos['tipo_detectado']}")
+                    
+                # Adecuación (solo para registro lingüístico)
+                if componente["key"] == "registro_linguistico" and "adecuacion" in datos:
+                    st.markdown(f"**Adecuación:** {datos['adecuacion']}")
+
+def _mostrar_consejo_final(consejo_final):
+    """
+    Muestra el consejo final de la corrección.
+    
+    Args:
+        consejo_final (str): Consejo final del asistente
+    """
+    if consejo_final:
+        st.markdown("### Consejo final")
+        st.success(consejo_final)
+
+class ProgressiveCorrectionRenderer:
+    """
+    Muestra una corrección por secciones a medida que llega en streaming.
+    
+    Reserva un hueco para cada sección en el orden en que el asistente las
+    genera (saludo, errores, texto corregido, análisis contextual y consejo
+    final) y solo repinta las secciones cuyo contenido ha cambiado. Al terminar,
+    clear() libera los huecos para que display_correccion_result muestre la
+    versión definitiva.
+    """
+    
+    SECCIONES = ("saludo", "errores", "texto_corregido", "analisis_contextual", "consejo_final")
+    
+    def __init__(self, texto_original=""):
+        """
+        Reserva los huecos de cada sección en la posición actual de la página.
+        
+        Args:
+            texto_original (str): Texto enviado por el estudiante
+        """
+        self.texto_original = texto_original
+        self._huecos = {seccion: st.empty() for seccion in self.SECCIONES}
+        self._mostrado = {}
+    
+    def update(self, parcial):
+        """
+        Repinta las secciones que han cambiado en el resultado parcial.
+        
+        Args:
+            parcial (dict): Resultado parcial de la corrección
+        """
+        try:
+            if not isinstance(parcial, dict):
+                return
+            
+            for seccion in self.SECCIONES:
+                contenido = self._contenido_seccion(parcial, seccion)
+                if not contenido or self._mostrado.get(seccion) == contenido:
+                    continue
+                
+                self._mostrado[seccion] = contenido
+                with self._huecos[seccion].container():
+                    self._pintar_seccion(seccion, contenido)
+                    
+        except Exception as e:
+            logger.error(f"Error en ProgressiveCorrectionRenderer.update: {str(e)}")
+    
+    def clear(self):
+        """Vacía todos los huecos reservados."""
+        for hueco in self._huecos.values():
+            hueco.empty()
+        self._mostrado = {}
+    
+    def _contenido_seccion(self, parcial, seccion):
+        """Obtiene los datos de una sección listos para mostrarse."""
+        if seccion == "saludo":
+            if not parcial.get("saludo"):
+                return None
+            return {"saludo": parcial.get("saludo", ""), "tipo_texto": parcial.get("tipo_texto", "")}
+        
+        if seccion == "errores":
+            errores = parcial.get("errores")
+            if not isinstance(errores, dict):
+                return None
+            # Solo errores ya utilizables: con fragmento y corrección recibidos
+            completos = {}
+            for categoria, lista_errores in errores.items():
+                if not isinstance(lista_errores, list):
+                    continue
+                validos = [
+                    error for error in lista_errores
+                    if isinstance(error, dict) and error.get("fragmento_erroneo") and "correccion" in error
+                ]
+                if validos:
+                    completos[categoria] = validos
+            return completos
+        
+        return parcial.get(seccion)
+    
+    def _pintar_seccion(self, seccion, contenido):
+        """Pinta una sección dentro de su hueco."""
+        if seccion == "saludo":
+            _mostrar_encabezado(contenido["saludo"], contenido["tipo_texto"])
+        
+        elif seccion == "errores":
+            total_errores = sum(len(lista) for lista in contenido.values())
+            st.markdown("### Correcciones detalladas")
+            st.info(f"Errores detectados hasta ahora: {total_errores}")
+            
+            # Texto original con los errores resaltados y resumen por categoría
+            html_resaltado = highlight_original_text(self.texto_original, contenido)
+            html_resumen = create_error_summary(contenido)
+            # El hueco se reemplaza completo en cada repintado, así que el CSS va con él
+            st.markdown(generate_error_highlighting_css(), unsafe_allow_html=True)
+            st.markdown(html_resaltado, unsafe_allow_html=True)
+            st.markdown(html_resumen, unsafe_allow_html=True)
+        
+        elif seccion == "texto_corregido":
+            st.markdown("#### Texto corregido")
+            st.markdown(contenido)
+        
+        elif seccion == "analisis_contextual" and isinstance(contenido, dict):
+            with st.expander("Análisis contextual", expanded=True):
+                _mostrar_analisis_contextual(contenido)
+        
+        elif seccion == "consejo_final":
+            _mostrar_consejo_final(contenido)
+
 def highlight_errors_in_text(texto, errores):
     """
     Resalta los errores en el texto original.
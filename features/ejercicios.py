@@ -207,16 +207,15 @@ def guardar_ejercicio_en_historial(ejercicio: Dict[str, Any]) -> bool:
         
         # También guardar en Firebase si está disponible
         try:
-            from core.firebase_client import initialize_firebase
-            db, success = initialize_firebase()
+            from core.firebase_client import guardar_ejercicio
             
-            if success and db:
-                uid = get_session_var("uid_usuario", "")
-                if uid:
-                    # Guardar en colección de ejercicios del usuario
-                    import uuid
-                    ejercicio_id = str(uuid.uuid4())
-                    db.collection("usuarios").document(uid).collection("ejercicios").document(ejercicio_id).set(ejercicio_con_fecha)
+            uid = get_session_var("uid_usuario", "")
+            if uid:
+                # Guardar en colección de ejercicios del usuario (actualiza el resumen de progreso)
+                import uuid
+                ejercicio_id = str(uuid.uuid4())
+                datos = dict(ejercicio_con_fecha, uid=uid, fecha=ejercicio_con_fecha["fecha_generacion"])
+                if guardar_ejercicio(datos, ejercicio_id):
                     logger.info(f"Ejercicio guardado en Firebase para usuario {uid}")
                     return True
         except Exception as firebase_error:
@@ -0,0 +1,328 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Exportación del historial completo
+----------------------------------
+Exporta todas las correcciones, simulacros y ejercicios de un usuario en
+NDJSON, CSV o libro de Excel (una hoja por colección).
+
+El historial se lee de Firestore página a página (iter_history) y cada página
+se escribe en un fichero temporal antes de pedir la siguiente, de modo que la
+memoria usada no depende del tamaño del historial. El libro de Excel se genera
+directamente como XML dentro del zip del .xlsx, también fila a fila.
+"""
+
+import csv
+import json
+import logging
+import os
+import re
+import tempfile
+import zipfile
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+import streamlit as st
+
+from config.settings import FIREBASE_COLLECTION_CORRECTIONS
+from core.session_manager import get_session_var, set_session_var
+
+logger = logging.getLogger(__name__)
+
+# Colecciones exportadas y nombre de su hoja
+COLECCIONES_EXPORTACION = [
+    (FIREBASE_COLLECTION_CORRECTIONS, "Correcciones"),
+    ("simulacros", "Simulacros"),
+    ("ejercicios", "Ejercicios"),
+]
+
+# Columnas de CSV y Excel por colección (los diccionarios anidados se aplanan como "campo.subcampo")
+COLUMNAS = {
+    FIREBASE_COLLECTION_CORRECTIONS: [
+        "id", "fecha", "nivel", "puntuacion", "palabras",
+        "errores.gramatica", "errores.lexico", "errores.puntuacion", "errores.estructura textual",
+        "texto_original", "texto_corregido", "consejo_final",
+    ],
+    "simulacros": [
+        "id", "fecha", "nivel", "tipo", "puntuacion", "calificacion", "apto",
+        "tiempo_empleado", "puntuaciones_secciones",
+    ],
+    "ejercicios": ["id", "fecha", "nivel", "tipo", "tema", "titulo"],
+}
+
+# Formato -> (extensión, tipo MIME)
+FORMATOS = {
+    "ndjson": (".ndjson", "application/x-ndjson"),
+    "csv": (".csv", "text/csv"),
+    "xlsx": (".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+# Máximo de caracteres de una celda de Excel
+MAX_CARACTERES_CELDA = 32767
+
+# Caracteres de control no permitidos en XML
+_CONTROL_XML = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+def _fecha_legible(fecha):
+    """Convierte la fecha de un documento a 'AAAA-MM-DD HH:MM:SS'."""
+    # Importar dinámicamente para evitar dependencias circulares
+    from core.progress_rollup import to_timestamp
+
+    timestamp = to_timestamp(fecha)
+    if timestamp is None:
+        return "" if fecha is None else str(fecha)
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+
+def _serializar(valor):
+    """Serializa en JSON los tipos de Firestore que json no conoce."""
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    if isinstance(valor, (bytes, bytearray)):
+        return None
+    return str(valor)
+
+def _aplanar(documento, prefijo=""):
+    """
+    Aplana un documento: los diccionarios anidados pasan a claves "a.b" y las
+    listas se guardan como JSON.
+    """
+    plano = {}
+    for clave, valor in documento.items():
+        nombre = f"{prefijo}{clave}"
+        if isinstance(valor, dict) and not prefijo:
+            plano[nombre] = json.dumps(valor, ensure_ascii=False, default=_serializar)
+            plano.update(_aplanar(valor, f"{nombre}."))
+        elif isinstance(valor, (dict, list)):
+            plano[nombre] = json.dumps(valor, ensure_ascii=False, default=_serializar)
+        else:
+            plano[nombre] = valor
+    return plano
+
+def _fila(coleccion, documento):
+    """Valores de las columnas de una colección para un documento."""
+    plano = _aplanar(documento)
+    plano["fecha"] = _fecha_legible(documento.get("fecha"))
+    if coleccion == FIREBASE_COLLECTION_CORRECTIONS and "palabras" not in plano:
+        texto = documento.get("texto_original")
+        plano["palabras"] = len(texto.split()) if isinstance(texto, str) else None
+    return [plano.get(columna) for columna in COLUMNAS[coleccion]]
+
+def iter_registros(uid):
+    """
+    Recorre el historial exportable de un usuario página a página.
+
+    Args:
+        uid (str): ID del usuario
+
+    Yields:
+        tuple: (colección, documento completo con su "id")
+    """
+    # Importar dinámicamente para evitar dependencias circulares
+    from core.firebase_client import iter_history
+
+    for coleccion, _ in COLECCIONES_EXPORTACION:
+        for documento in iter_history(uid, coleccion):
+            yield coleccion, documento
+
+def _escribir_ndjson(ruta, uid):
+    total = 0
+    with open(ruta, "w", encoding="utf-8") as f:
+        for coleccion, documento in iter_registros(uid):
+            registro = {"coleccion": coleccion, **documento}
+            f.write(json.dumps(registro, ensure_ascii=False, default=_serializar))
+            f.write("\n")
+            total += 1
+    return total
+
+def _escribir_csv(ruta, uid):
+    # Un único CSV: columna "coleccion" más la unión de las columnas de todas las colecciones
+    cabecera = ["coleccion"]
+    for coleccion, _ in COLECCIONES_EXPORTACION:
+        cabecera += [c for c in COLUMNAS[coleccion] if c not in cabecera]
+
+    total = 0
+    # utf-8-sig para que Excel reconozca las tildes al abrir el CSV
+    with open(ruta, "w", encoding="utf-8-sig", newline="") as f:
+        escritor = csv.writer(f)
+        escritor.writerow(cabecera)
+        for coleccion, documento in iter_registros(uid):
+            valores = dict(zip(COLUMNAS[coleccion], _fila(coleccion, documento)))
+            valores["coleccion"] = coleccion
+            escritor.writerow(["" if valores.get(c) is None else valores.get(c) for c in cabecera])
+            total += 1
+    return total
+
+def _letra_columna(indice):
+    """Letra de columna de Excel (0 -> A, 26 -> AA)."""
+    letras = ""
+    indice += 1
+    while indice:
+        indice, resto = divmod(indice - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+def _celda_xlsx(referencia, valor):
+    """XML de una celda: números como valor y el resto como texto en línea."""
+    if valor is None or valor == "":
+        return ""
+    if isinstance(valor, bool):
+        return f'<c r="{referencia}" t="b"><v>{int(valor)}</v></c>'
+    if isinstance(valor, (int, float)):
+        return f'<c r="{referencia}"><v>{valor}</v></c>'
+    texto = _CONTROL_XML.sub("", str(valor))[:MAX_CARACTERES_CELDA]
+    return f'<c r="{referencia}" t="inlineStr"><is><t xml:space="preserve">{escape(texto)}</t></is></c>'
+
+def _fila_xlsx(numero, valores):
+    celdas = "".join(_celda_xlsx(f"{_letra_columna(i)}{numero}", v) for i, v in enumerate(valores))
+    return f'<row r="{numero}">{celdas}</row>'
+
+def _escribir_xlsx(ruta, uid):
+    # Importar dinámicamente para evitar dependencias circulares
+    from core.firebase_client import iter_history
+
+    total = 0
+    with zipfile.ZipFile(ruta, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for numero_hoja, (coleccion, _) in enumerate(COLECCIONES_EXPORTACION, start=1):
+            # Cada hoja se escribe en streaming dentro del zip
+            with zf.open(f"xl/worksheets/sheet{numero_hoja}.xml", "w", force_zip64=True) as hoja:
+                hoja.write(
+                    b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                    b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+                )
+                hoja.write(_fila_xlsx(1, COLUMNAS[coleccion]).encode("utf-8"))
+                fila = 1
+                for documento in iter_history(uid, coleccion):
+                    fila += 1
+                    hoja.write(_fila_xlsx(fila, _fila(coleccion, documento)).encode("utf-8"))
+                hoja.write(b"</sheetData></worksheet>")
+                total += fila - 1
+
+        hojas = "".join(
+            f'<sheet name="{nombre}" sheetId="{i}" r:id="rId{i}"/>'
+            for i, (_, nombre) in enumerate(COLECCIONES_EXPORTACION, start=1)
+        )
+        relaciones = "".join(
+            f'<Relationship Id="rId{i}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+            f'Target="worksheets/sheet{i}.xml"/>'
+            for i in range(1, len(COLECCIONES_EXPORTACION) + 1)
+        )
+        tipos_hojas = "".join(
+            f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+            f'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            for i in range(1, len(COLECCIONES_EXPORTACION) + 1)
+        )
+        zf.writestr(
+            "[Content_Types].xml",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            f'{tipos_hojas}</Types>'
+        )
+        zf.writestr(
+            "_rels/.rels",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+            'Target="xl/workbook.xml"/></Relationships>'
+        )
+        zf.writestr(
+            "xl/workbook.xml",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets>{hojas}</sheets></workbook>'
+        )
+        zf.writestr(
+            "xl/_rels/workbook.xml.rels",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            f'{relaciones}</Relationships>'
+        )
+    return total
+
+_ESCRITORES = {
+    "ndjson": _escribir_ndjson,
+    "csv": _escribir_csv,
+    "xlsx": _escribir_xlsx,
+}
+
+def exportar_historial(uid, formato="xlsx"):
+    """
+    Exporta el historial completo de un usuario a un fichero temporal.
+
+    Args:
+        uid (str): ID del usuario
+        formato (str): "ndjson", "csv" o "xlsx"
+
+    Returns:
+        dict: {"ruta", "nombre", "mime", "registros"}, o None si hubo error
+    """
+    if not uid or formato not in FORMATOS:
+        logger.warning(f"Exportación de historial no válida (uid={uid}, formato={formato})")
+        return None
+
+    extension, mime = FORMATOS[formato]
+    temp_dir = os.path.join(tempfile.gettempdir(), "textocorrector_ele")
+    os.makedirs(temp_dir, exist_ok=True)
+    descriptor, ruta = tempfile.mkstemp(prefix="historial_", suffix=extension, dir=temp_dir)
+    os.close(descriptor)
+
+    try:
+        registros = _ESCRITORES[formato](ruta, uid)
+        logger.info(f"Historial de {uid} exportado en {formato}: {registros} registros")
+        return {
+            "ruta": ruta,
+            "nombre": f"historial_{datetime.now().strftime('%Y%m%d_%H%M')}{extension}",
+            "mime": mime,
+            "registros": registros,
+        }
+    except Exception as e:
+        logger.error(f"Error exportando historial de {uid}: {str(e)}")
+        try:
+            os.remove(ruta)
+        except OSError:
+            pass
+        return None
+
+def mostrar_exportacion_historial(uid):
+    """
+    Muestra las opciones para exportar el historial completo y el botón de
+    descarga cuando el fichero está listo.
+
+    Args:
+        uid (str): ID del usuario
+
+    Returns:
+        None
+    """
+    try:
+        st.markdown("#### Exportar mi historial")
+
+        etiquetas = {"xlsx": "Excel (.xlsx)", "csv": "CSV", "ndjson": "JSON por líneas (.ndjson)"}
+        formato = st.selectbox(
+            "Formato", list(etiquetas), format_func=etiquetas.get, key="exportacion_historial_formato"
+        )
+
+        if st.button("Preparar exportación", key="exportacion_historial_btn"):
+            anterior = get_session_var("exportacion_historial")
+            if anterior and os.path.exists(anterior["ruta"]):
+                os.remove(anterior["ruta"])
+            with st.spinner("Exportando el historial..."):
+                set_session_var("exportacion_historial", exportar_historial(uid, formato))
+            if not get_session_var("exportacion_historial"):
+                st.error("No se pudo exportar el historial. Inténtalo de nuevo más tarde.")
+
+        exportacion = get_session_var("exportacion_historial")
+        if exportacion and os.path.exists(exportacion["ruta"]):
+            st.caption(f"{exportacion['registros']} registros exportados")
+            with open(exportacion["ruta"], "rb") as f:
+                st.download_button(
+                    "Descargar historial", data=f, file_name=exportacion["nombre"],
+                    mime=exportacion["mime"], key="exportacion_historial_descarga"
+                )
+    except Exception as e:
+        logger.error(f"Error mostrando exportación de historial: {str(e)}")
+        st.error(f"Error al mostrar la exportación del historial: {str(e)}")
@@ -18,11 +18,16 @@ from core.firebase_client import (
     get_user_data, 
     update_user_data, 
     get_correcciones_usuario,
-    get_simulacros_usuario,
-    get_ejercicios_usuario
+    listar_historial,
+    obtener_rollup_progreso
 )
+from config.settings import FIREBASE_COLLECTION_CORRECTIONS
 from core.session_manager import get_session_var, set_session_var, get_user_info
-from utils.analytics import calcular_metricas_progreso
+from utils.analytics import calcular_metricas_progreso, tendencias_desde_resumen, nivel_desde_resumen
+from core.progress_rollup import metrics_from_rollup
+from core.fetch_coordinator import FetchCoordinator
+from core.figure_cache import figura_en_cache
+from core.history_cache import get_history
 
 logger = logging.getLogger(__name__)
 
@@ -78,6 +83,9 @@ def actualizar_perfil_usuario(user_id, datos_actualizados):
         logger.error(f"Error actualizando perfil de usuario: {str(e)}")
         return False
 
+# Días que abarca cada periodo de las estadísticas
+DIAS_PERIODO = {"semana": 7, "mes": 30, "trimestre": 90}
+
 def obtener_estadisticas_usuario(user_id, periodo=None):
     """
     Obtiene estadísticas de uso y progreso del usuario.
@@ -90,6 +98,27 @@ def obtener_estadisticas_usuario(user_id, periodo=None):
         dict: Estadísticas del usuario
     """
     try:
+        # Camino rápido: métricas desde el resumen de progreso precalculado
+        rollup = obtener_rollup_progreso(user_id)
+        if rollup is not None:
+            periodo_dias = DIAS_PERIODO.get(periodo, 365) if periodo else None
+            estadisticas = metrics_from_rollup(rollup, periodo_dias)
+            # Tendencias y nivel de las medias móviles del resumen (lectura directa)
+            estadisticas["tendencias"] = tendencias_desde_resumen(rollup)
+            estadisticas["nivel_estimado"] = nivel_desde_resumen(rollup)
+            return estadisticas
+        
+        # Sin resumen disponible y sin periodo: el historial columnar en caché basta
+        if not periodo:
+            historial = get_history(user_id)
+            return {
+                "total_correcciones": historial.total("correccion"),
+                "total_simulacros": historial.total("simulacro"),
+                "total_ejercicios": historial.total("ejercicio"),
+                "metricas": calcular_metricas_progreso([], [], [], historial=historial)
+            }
+        
+        # Con periodo: calcular recorriendo el historial
         # Definir fechas para filtro
         fecha_fin = datetime.now()
         if periodo == "semana":
@@ -101,10 +130,15 @@ def obtener_estadisticas_usuario(user_id, periodo=None):
         else:
             fecha_inicio = fecha_fin - timedelta(days=365)  # Por defecto último año
         
-        # Obtener datos de actividad
-        correcciones = get_correcciones_usuario(user_id)
-        simulacros = get_simulacros_usuario(user_id)
-        ejercicios = get_ejercicios_usuario(user_id)
+        # Obtener datos de actividad en paralelo (de simulacros y ejercicios bastan los campos de lista)
+        datos = FetchCoordinator() \
+            .submit("correcciones", get_correcciones_usuario, user_id) \
+            .submit("simulacros", listar_historial, user_id, "simulacros", proyeccion=True) \
+            .submit("ejercicios", listar_historial, user_id, "ejercicios", proyeccion=True) \
+            .results(default=[])
+        correcciones = datos["correcciones"]
+        simulacros = datos["simulacros"]
+        ejercicios = datos["ejercicios"]
         
         # Filtrar por fecha si es necesario
         if periodo:
@@ -144,7 +178,8 @@ def obtener_estadisticas_usuario(user_id, periodo=None):
             "metricas": {}
         }
 
-def generar_grafico_progreso(user_id, tipo="errores", periodo=None):
+@figura_en_cache(uid_arg="user_id")
+def generar_grafico_progreso(user_id, tipo="errores", periodo=None, correcciones=None):
     """
     Genera un gráfico de progreso del usuario.
     
@@ -152,13 +187,16 @@ def generar_grafico_progreso(user_id, tipo="errores", periodo=None):
         user_id (str): ID del usuario
         tipo (str): Tipo de gráfico (errores, actividad, nivel)
         periodo (str, opcional): Periodo para filtrar (semana, mes, trimestre)
+        correcciones (list, opcional): Correcciones ya obtenidas (se consultan si no se indican)
         
     Returns:
-        plotly.graph_objects.Figure: Figura de Plotly con el gráfico
+        plotly.graph_objects.Figure: Figura de Plotly con el gráfico (desde core.figure_cache
+            mientras no cambien los datos ni se guarde una actividad nueva del usuario)
     """
     try:
-        # Obtener datos
-        correcciones = get_correcciones_usuario(user_id)
+        # Obtener datos (solo el gráfico de actividad necesita los textos completos)
+        if correcciones is None:
+            correcciones = listar_historial(user_id, FIREBASE_COLLECTION_CORRECTIONS, proyeccion=(tipo != "actividad"))
         
         if not correcciones:
             # Devolver gráfico vacío
@@ -306,21 +344,38 @@ def generar_grafico_progreso(user_id, tipo="errores", periodo=None):
         )
         return fig
 
-def obtener_recomendaciones_usuario(user_id):
+def obtener_recomendaciones_usuario(user_id, correcciones=None):
     """
     Genera recomendaciones personalizadas basadas en el progreso del usuario.
     
     Args:
         user_id (str): ID del usuario
+        correcciones (list, opcional): Correcciones ya obtenidas (si no se indican
+            se usa el historial columnar en caché)
         
     Returns:
         list: Lista de recomendaciones
     """
     try:
-        # Obtener datos de correcciones
-        correcciones = get_correcciones_usuario(user_id)
+        if correcciones is None:
+            # Recuentos por categoría desde el historial en caché (sin descargar las correcciones)
+            historial = get_history(user_id)
+            num_correcciones = historial.num_correcciones
+            errores_totales = historial.errores.groupby("categoria", sort=False)["cantidad"].sum().to_dict()
+        else:
+            num_correcciones = len(correcciones)
+            # Análisis de errores más frecuentes
+            errores_totales = {}
+            for correccion in correcciones:
+                for error in correccion.get('errores', []):
+                    categoria = error.get('categoria', 'Otro')
+                    cantidad = error.get('cantidad', 0)
+                    if categoria in errores_totales:
+                        errores_totales[categoria] += cantidad
+                    else:
+                        errores_totales[categoria] = cantidad
         
-        if not correcciones:
+        if not num_correcciones:
             return [
                 {
                     "titulo": "Comienza a practicar",
@@ -329,17 +384,6 @@ def obtener_recomendaciones_usuario(user_id):
                 }
             ]
         
-        # Análisis de errores más frecuentes
-        errores_totales = {}
-        for correccion in correcciones:
-            for error in correccion.get('errores', []):
-                categoria = error.get('categoria', 'Otro')
-                cantidad = error.get('cantidad', 0)
-                if categoria in errores_totales:
-                    errores_totales[categoria] += cantidad
-                else:
-                    errores_totales[categoria] = cantidad
-        
         # Ordenar errores por frecuencia
         errores_ordenados = sorted(errores_totales.items(), key=lambda x: x[1], reverse=True)
         
@@ -388,10 +432,10 @@ def obtener_recomendaciones_usuario(user_id):
                 })
         
         # Recomendación de simulacro si el usuario ha realizado más de 5 correcciones
-        if len(correcciones) >= 5:
+        if num_correcciones >= 5:
             recomendaciones.append({
                 "titulo": "¡Pon a prueba tus habilidades!",
-                "descripcion": f"Ya has realizado {len(correcciones)} correcciones. Es un buen momento para intentar un simulacro de examen DELE.",
+                "descripcion": f"Ya has realizado {num_correcciones} correcciones. Es un buen momento para intentar un simulacro de examen DELE.",
                 "tipo": "simulacro",
                 "parametros": {"nivel": nivel}
             })
@@ -562,10 +606,86 @@ def mostrar_formulario_edicion_perfil(user_info):
         logger.error(f"Error en formulario de edición de perfil: {str(e)}")
         st.error("Ha ocurrido un error en el formulario. Por favor, intenta de nuevo más tarde.")
 
+def _mostrar_metricas_resumen(estadisticas):
+    """Muestra los totales y las métricas de aprendizaje del resumen de progreso."""
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        st.metric("Textos corregidos", estadisticas["total_correcciones"])
+    
+    with col2:
+        st.metric("Simulacros realizados", estadisticas["total_simulacros"])
+    
+    with col3:
+        st.metric("Ejercicios completados", estadisticas["total_ejercicios"])
+    
+    if "metricas" in estadisticas and estadisticas["metricas"]:
+        st.write("### Métricas de Aprendizaje")
+        
+        metricas = estadisticas["metricas"]
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            if "tasa_mejora" in metricas:
+                st.metric("Tasa de mejora", f"{metricas['tasa_mejora']:.1f}%")
+            
+            if "palabras_por_sesion" in metricas:
+                st.metric("Palabras por sesión", f"{metricas['palabras_por_sesion']:.0f}")
+        
+        with col2:
+            if "consistencia" in metricas:
+                st.metric("Consistencia", f"{metricas['consistencia']:.1f}/10")
+            
+            if "diversidad_temas" in metricas:
+                st.metric("Diversidad de temas", f"{metricas['diversidad_temas']:.1f}/10")
+    
+    nivel_estimado = estadisticas.get("nivel_estimado") or {}
+    if nivel_estimado.get("nivel"):
+        st.metric("Nivel estimado", nivel_estimado["nivel"],
+                  help=f"Confianza: {nivel_estimado.get('confianza', 0):.0f}%")
+    
+    tendencias = estadisticas.get("tendencias") or {}
+    if tendencias.get("mensaje"):
+        st.info(tendencias["mensaje"])
+
+def _mostrar_recomendaciones(recomendaciones):
+    """Muestra las recomendaciones personalizadas con su botón de acción."""
+    st.write("### Recomendaciones Personalizadas")
+    
+    for i, recomendacion in enumerate(recomendaciones):
+        with st.expander(recomendacion["titulo"], expanded=(i == 0)):
+            st.write(recomendacion["descripcion"])
+            
+            # Botón de acción según el tipo de recomendación
+            if recomendacion["tipo"] == "ejercicio":
+                if st.button(f"Realizar ejercicio", key=f"btn_ejercicio_{i}"):
+                    # Guardar parámetros en sesión para usar en la vista de ejercicios
+                    set_session_var("ejercicio_recomendado", recomendacion["parametros"])
+                    st.session_state.current_page = "ejercicios"
+                    st.experimental_rerun()
+            
+            elif recomendacion["tipo"] == "simulacro":
+                if st.button(f"Iniciar simulacro", key=f"btn_simulacro_{i}"):
+                    # Guardar parámetros en sesión para usar en la vista de simulacro
+                    set_session_var("simulacro_recomendado", recomendacion["parametros"])
+                    st.session_state.current_page = "simulacro"
+                    st.experimental_rerun()
+            
+            elif recomendacion["tipo"] == "correccion":
+                if st.button(f"Escribir texto", key=f"btn_correccion_{i}"):
+                    # Guardar parámetros en sesión para usar en la vista de corrección
+                    set_session_var("correccion_recomendada", recomendacion["parametros"])
+                    st.session_state.current_page = "correccion"
+                    st.experimental_rerun()
+
 def mostrar_resumen_progreso(user_id, periodo=None):
     """
     Muestra un resumen del progreso del usuario en la interfaz de Streamlit.
     
+    Las consultas del panel se lanzan en paralelo y cada bloque se muestra en
+    cuanto llegan sus datos; si una consulta no responde a tiempo, su bloque
+    muestra un aviso y el resto del panel se muestra igualmente.
+    
     Args:
         user_id (str): ID del usuario
         periodo (str, opcional): Periodo para filtrar (semana, mes, trimestre)
@@ -574,9 +694,6 @@ def mostrar_resumen_progreso(user_id, periodo=None):
         None
     """
     try:
-        # Obtener estadísticas
-        estadisticas = obtener_estadisticas_usuario(user_id, periodo)
-        
         st.write("### Resumen de Actividad")
         
         # Selección de periodo
@@ -598,76 +715,49 @@ def mostrar_resumen_progreso(user_id, periodo=None):
             # Recargar con el nuevo periodo
             return periodo_seleccionado
         
-        # Mostrar estadísticas básicas
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            st.metric("Textos corregidos", estadisticas["total_correcciones"])
-        
-        with col2:
-            st.metric("Simulacros realizados", estadisticas["total_simulacros"])
+        periodo_filtro = periodo_seleccionado if periodo_seleccionado != "todo" else None
         
-        with col3:
-            st.metric("Ejercicios completados", estadisticas["total_ejercicios"])
+        # Lanzar las consultas del panel en paralelo; las correcciones completas
+        # sirven para los dos gráficos y las recomendaciones salen del historial en caché
+        consultas = FetchCoordinator() \
+            .submit("estadisticas", obtener_estadisticas_usuario, user_id, periodo) \
+            .submit("correcciones", get_correcciones_usuario, user_id)
         
-        # Mostrar gráficos de progreso
+        # Reservar el hueco de cada bloque para mantener el orden del panel
+        bloque_estadisticas = st.empty()
         st.write("### Evolución de Errores")
-        fig_errores = generar_grafico_progreso(user_id, "errores", periodo_seleccionado if periodo_seleccionado != "todo" else None)
-        st.plotly_chart(fig_errores, use_container_width=True)
-        
+        bloque_errores = st.empty()
         st.write("### Actividad de Escritura")
-        fig_actividad = generar_grafico_progreso(user_id, "actividad", periodo_seleccionado if periodo_seleccionado != "todo" else None)
-        st.plotly_chart(fig_actividad, use_container_width=True)
-        
-        if "metricas" in estadisticas and estadisticas["metricas"]:
-            st.write("### Métricas de Aprendizaje")
-            
-            metricas = estadisticas["metricas"]
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                if "tasa_mejora" in metricas:
-                    st.metric("Tasa de mejora", f"{metricas['tasa_mejora']:.1f}%")
-                
-                if "palabras_por_sesion" in metricas:
-                    st.metric("Palabras por sesión", f"{metricas['palabras_por_sesion']:.0f}")
+        bloque_actividad = st.empty()
+        bloque_recomendaciones = st.empty()
+        
+        for bloque in (bloque_estadisticas, bloque_errores, bloque_actividad):
+            bloque.info("Cargando...")
+        
+        # Mostrar cada bloque a medida que llegan sus datos
+        for nombre, datos, error in consultas.as_completed():
+            if nombre == "estadisticas":
+                with bloque_estadisticas.container():
+                    if error is not None:
+                        st.warning("No se pudieron cargar las estadísticas. Inténtalo de nuevo más tarde.")
+                    else:
+                        _mostrar_metricas_resumen(datos)
             
-            with col2:
-                if "consistencia" in metricas:
-                    st.metric("Consistencia", f"{metricas['consistencia']:.1f}/10")
+            elif nombre == "correcciones":
+                if error is not None:
+                    for bloque in (bloque_errores, bloque_actividad):
+                        bloque.warning("No se pudo cargar el historial de correcciones.")
+                    continue
                 
-                if "diversidad_temas" in metricas:
-                    st.metric("Diversidad de temas", f"{metricas['diversidad_temas']:.1f}/10")
-        
-        # Mostrar recomendaciones
-        st.write("### Recomendaciones Personalizadas")
-        recomendaciones = obtener_recomendaciones_usuario(user_id)
-        
-        for i, recomendacion in enumerate(recomendaciones):
-            with st.expander(recomendacion["titulo"], expanded=(i == 0)):
-                st.write(recomendacion["descripcion"])
-                
-                # Botón de acción según el tipo de recomendación
-                if recomendacion["tipo"] == "ejercicio":
-                    if st.button(f"Realizar ejercicio", key=f"btn_ejercicio_{i}"):
-                        # Guardar parámetros en sesión para usar en la vista de ejercicios
-                        set_session_var("ejercicio_recomendado", recomendacion["parametros"])
-                        st.session_state.current_page = "ejercicios"
-                        st.experimental_rerun()
+                fig_errores = generar_grafico_progreso(user_id, "errores", periodo_filtro, correcciones=datos)
+                bloque_errores.plotly_chart(fig_errores, use_container_width=True)
                 
-                elif recomendacion["tipo"] == "simulacro":
-                    if st.button(f"Iniciar simulacro", key=f"btn_simulacro_{i}"):
-                        # Guardar parámetros en sesión para usar en la vista de simulacro
-                        set_session_var("simulacro_recomendado", recomendacion["parametros"])
-                        st.session_state.current_page = "simulacro"
-                        st.experimental_rerun()
+                fig_actividad = generar_grafico_progreso(user_id, "actividad", periodo_filtro, correcciones=datos)
+                bloque_actividad.plotly_chart(fig_actividad, use_container_width=True)
                 
-                elif recomendacion["tipo"] == "correccion":
-                    if st.button(f"Escribir texto", key=f"btn_correccion_{i}"):
-                        # Guardar parámetros en sesión para usar en la vista de corrección
-                        set_session_var("correccion_recomendada", recomendacion["parametros"])
-                        st.session_state.current_page = "correccion"
-                        st.experimental_rerun()
+                recomendaciones = obtener_recomendaciones_usuario(user_id)
+                with bloque_recomendaciones.container():
+                    _mostrar_recomendaciones(recomendaciones)
         
         return periodo_seleccionado
     except Exception as e:
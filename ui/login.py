@@ -13,6 +13,7 @@ import re
 
 # --- CHANGE START ---
 from core.firebase_client import login_user, create_user, get_user_data, FirebaseWebAPIKeyMissingError
+from core.auth_tokens import token_manager, get_valid_token
 # --- CHANGE END ---
 from core.session_manager import set_session_var, init_session_state
 from ui.main_layout import mostrar_mensaje_error
@@ -32,11 +33,22 @@ def mostrar_login():
         
         # Verificar si ya hay un usuario logueado
         if 'user_info' in st.session_state and st.session_state['user_info']:
-            return True
+            # Renovar el ID token si está a punto de caducar; si Firebase
+            # rechaza la renovación, la sesión ha caducado y hay que volver a entrar
+            if st.session_state['user_info'].get('es_anonimo') or get_valid_token() \
+                    or not token_manager.session_expired():
+                return True
+            set_session_var('user_info', None)
+            sesion_caducada = True
+        else:
+            sesion_caducada = False
         
         # Título
         st.markdown("<h2>Iniciar sesión</h2>", unsafe_allow_html=True)
         
+        if sesion_caducada:
+            st.warning("Tu sesión ha caducado. Vuelve a iniciar sesión para continuar.")
+        
         # --- CHANGE START ---
         # Verificar si hay un error de configuración Firebase
         if 'firebase_config_error' in st.session_state and st.session_state['firebase_config_error']:
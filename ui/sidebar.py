@@ -280,6 +280,11 @@ def mostrar_estado_servicios():
             openai_status = get_session_var("openai_status", True)
             firebase_status = get_session_var("firebase_status", True)
             
+            # Combinar con la salud del cliente de Firestore compartido
+            from core.firebase_client import firestore_registry
+            if firestore_registry.health()["estado"] == "error":
+                firebase_status = False
+            
             # Indicadores de estado
             st.markdown("### Estado de servicios")
             
@@ -307,5 +312,19 @@ def mostrar_estado_servicios():
                 
                 Si algún servicio está caído, inténtalo de nuevo más tarde o contacta al soporte.
                 """)
+                
+                if IS_DEV:
+                    from core.profile_cache import profile_cache
+                    stats = profile_cache.stats()
+                    st.caption(
+                        f"Caché de perfiles: {stats['hit_ratio']:.0%} de aciertos "
+                        f"({stats['hits']}/{stats['hits'] + stats['misses']} lecturas, {stats['entries']} perfiles)"
+                    )
+                    from core.metrics_sink import metrics_sink
+                    stats = metrics_sink.stats()
+                    st.caption(
+                        f"Métricas: {stats['pending']} pendientes, {stats['written']} escritas, "
+                        f"{stats['dropped']} descartadas, {stats['failed']} perdidas"
+                    )
     except Exception as e:
         logger.error(f"Error mostrando estado de servicios: {str(e)}")
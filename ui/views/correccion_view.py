@@ -16,6 +16,7 @@ from datetime import datetime
 # Importaciones del proyecto
 from config.settings import NIVELES_ESPANOL
 from features.correccion_controller import handle_correction_request, display_correction_result, get_correction_metrics
+from features.correccion_utils import ProgressiveCorrectionRenderer
 from core.session_manager import get_user_info, get_session_var, set_session_var
 
 logger = logging.getLogger(__name__)
@@ -141,13 +142,23 @@ def render_view():
             # Guardar hora de inicio para métricas
             start_time = time.time()
             
-            # Procesar la corrección con el nuevo controlador unificado
-            correction_result = handle_correction_request(
-                text=texto_input,
-                level=nivel,
-                detail=detalle,
-                language=idioma
-            )
+            # Zona de estado arriba y, debajo, los huecos para el resultado parcial
+            zona_estado = st.container()
+            renderer = ProgressiveCorrectionRenderer(texto_input)
+            
+            # Procesar la corrección con el nuevo controlador unificado,
+            # mostrando cada sección en cuanto llega del asistente
+            with zona_estado:
+                correction_result = handle_correction_request(
+                    text=texto_input,
+                    level=nivel,
+                    detail=detalle,
+                    language=idioma,
+                    on_partial=renderer.update
+                )
+            
+            # Sustituir la vista parcial por el resultado definitivo
+            renderer.clear()
             
             # Guardar resultado para futuras referencias
             st.session_state.correction_result = correction_result
@@ -16,6 +16,7 @@ from features.perfil import (
     mostrar_resumen_progreso,
     cargar_perfil_usuario
 )
+from features.exportacion_historial import mostrar_exportacion_historial
 from core.session_manager import get_session_var, set_session_var, get_user_info
 from ui.main_layout import mostrar_mensaje_error
 
@@ -128,6 +129,10 @@ def mostrar_seccion_progreso():
         # Actualizar periodo si cambió
         if nuevo_periodo != periodo:
             set_session_var("periodo_progreso", nuevo_periodo)
+        
+        # Exportación del historial completo
+        st.markdown("---")
+        mostrar_exportacion_historial(user_info.get('uid'))
     except Exception as e:
         logger.error(f"Error mostrando sección de progreso: {str(e)}")
         st.error(f"Error al cargar el progreso: {str(e)}")
@@ -7,14 +7,12 @@ Este módulo contiene funciones para analizar datos de usuarios y generar estad
 """
 
 import logging
-import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
-from collections import Counter
+
+from utils.analytics_engine import HistorialAnalitico, TIPOS
 
 logger = logging.getLogger(__name__)
 
-def calcular_metricas_progreso(correcciones, simulacros, ejercicios):
+def calcular_metricas_progreso(correcciones, simulacros, ejercicios, historial=None):
     """
     Calcula métricas de progreso del estudiante basadas en su actividad.
     
@@ -22,250 +20,66 @@ def calcular_metricas_progreso(correcciones, simulacros, ejercicios):
         correcciones (list): Lista de correcciones realizadas
         simulacros (list): Lista de simulacros realizados
         ejercicios (list): Lista de ejercicios completados
+        historial (HistorialAnalitico, opcional): Historial ya ingerido de esas listas
         
     Returns:
         dict: Diccionario con las métricas calculadas
     """
     try:
-        metricas = {}
+        historial = historial or HistorialAnalitico(correcciones, simulacros, ejercicios)
         
         # Verificar si hay datos suficientes para calcular métricas
-        if not correcciones and not simulacros and not ejercicios:
+        if not any(historial.total(tipo) for tipo in TIPOS):
             return {}
         
-        # Calcular la tasa de mejora basada en la puntuación de las correcciones
-        if len(correcciones) >= 2:
-            # Ordenar correcciones por fecha
-            correcciones_ordenadas = sorted(correcciones, key=lambda x: x.get('fecha', datetime.min))
-            
-            # Obtener puntuaciones inicial y final
-            puntuaciones = [c.get('puntuacion', 0) for c in correcciones_ordenadas if 'puntuacion' in c]
-            
-            if len(puntuaciones) >= 2:
-                puntuacion_inicial = puntuaciones[0]
-                puntuacion_final = puntuaciones[-1]
-                
-                if puntuacion_inicial > 0:  # Evitar división por cero
-                    tasa_mejora = ((puntuacion_final - puntuacion_inicial) / puntuacion_inicial) * 100
-                    metricas['tasa_mejora'] = max(0, min(100, tasa_mejora))  # Limitar entre 0 y 100
-        
-        # Calcular palabras promedio por sesión de escritura
-        if correcciones:
-            palabras_totales = sum([len(c.get('texto_original', '').split()) for c in correcciones])
-            palabras_por_sesion = palabras_totales / len(correcciones)
-            metricas['palabras_por_sesion'] = palabras_por_sesion
-        
-        # Calcular consistencia (frecuencia de uso)
-        todas_actividades = correcciones + simulacros + ejercicios
-        if todas_actividades:
-            # Convertir fechas a objetos datetime si son strings
-            for actividad in todas_actividades:
-                if 'fecha' in actividad and isinstance(actividad['fecha'], str):
-                    try:
-                        actividad['fecha'] = datetime.fromisoformat(actividad['fecha'].replace('Z', '+00:00'))
-                    except ValueError:
-                        actividad['fecha'] = datetime.now()
-            
-            # Ordenar por fecha
-            todas_actividades = sorted(todas_actividades, key=lambda x: x.get('fecha', datetime.min))
-            
-            if len(todas_actividades) >= 2:
-                # Calcular diferencias entre fechas consecutivas
-                fechas = [a.get('fecha', datetime.min) for a in todas_actividades if 'fecha' in a]
-                
-                if len(fechas) >= 2:
-                    # Calcular diferencias en días
-                    diferencias = [(fechas[i+1] - fechas[i]).days for i in range(len(fechas)-1)]
-                    
-                    # Calcular regularidad (inverso de la desviación estándar de las diferencias)
-                    if diferencias:
-                        std_diff = np.std(diferencias) if len(diferencias) > 1 else 0
-                        if std_diff == 0:  # Evitar división por cero
-                            consistencia = 10.0  # Máxima consistencia
-                        else:
-                            # A menor desviación estándar, mayor consistencia
-                            consistencia = min(10.0, 10.0 / (1 + 0.5 * std_diff))
-                        
-                        metricas['consistencia'] = consistencia
-                
-                # Calcular frecuencia promedio (días entre sesiones)
-                if fechas and len(fechas) >= 2:
-                    primer_fecha = min(fechas)
-                    ultima_fecha = max(fechas)
-                    dias_totales = (ultima_fecha - primer_fecha).days
-                    
-                    if dias_totales > 0:
-                        sesiones_por_semana = (len(fechas) / dias_totales) * 7
-                        metricas['sesiones_por_semana'] = min(7, sesiones_por_semana)  # Máximo 7 (una por día)
-        
-        # Calcular diversidad de temas tratados
-        todos_temas = []
-        for actividad in correcciones + ejercicios + simulacros:
-            if 'tema' in actividad:
-                todos_temas.append(actividad['tema'])
-        
-        if todos_temas:
-            # Contar frecuencia de cada tema
-            contador_temas = Counter(todos_temas)
-            
-            # Calcular índice de diversidad (basado en entropía de Shannon)
-            N = len(todos_temas)
-            if N > 0:
-                diversidad = 0
-                for tema, count in contador_temas.items():
-                    p = count / N
-                    diversidad -= p * np.log(p)
-                
-                # Normalizar a escala 0-10
-                diversidad_normalizada = min(10, diversidad * 3)  # Factor de escala
-                metricas['diversidad_temas'] = diversidad_normalizada
-        
-        return metricas
+        return historial.metricas_progreso()
     except Exception as e:
         logger.error(f"Error calculando métricas de progreso: {str(e)}")
         return {}
 
-def analizar_errores(correcciones):
+def analizar_errores(correcciones, historial=None):
     """
     Analiza los errores comunes en las correcciones del estudiante.
     
     Args:
         correcciones (list): Lista de correcciones realizadas
+        historial (HistorialAnalitico, opcional): Historial ya ingerido de las correcciones
         
     Returns:
         dict: Análisis de errores por categoría
     """
     try:
-        if not correcciones:
+        historial = historial or HistorialAnalitico(correcciones)
+        if not historial.num_correcciones:
             return {}
         
-        # Estructura para almacenar errores por categoría
-        errores_por_categoria = {}
-        
-        # Procesar cada corrección
-        for correccion in correcciones:
-            # Extraer errores
-            for error in correccion.get('errores', []):
-                categoria = error.get('categoria', 'Otro')
-                cantidad = error.get('cantidad', 0)
-                
-                # Añadir a la categoría correspondiente
-                if categoria in errores_por_categoria:
-                    errores_por_categoria[categoria]['total'] += cantidad
-                    errores_por_categoria[categoria]['frecuencia'] += 1
-                else:
-                    errores_por_categoria[categoria] = {
-                        'total': cantidad,
-                        'frecuencia': 1,
-                        'ejemplos': []
-                    }
-                
-                # Añadir ejemplos si están disponibles
-                if 'ejemplos' in error and len(error['ejemplos']) > 0:
-                    # Limitar a máximo 5 ejemplos por categoría
-                    nuevos_ejemplos = error['ejemplos'][:min(5, 5 - len(errores_por_categoria[categoria]['ejemplos']))]
-                    errores_por_categoria[categoria]['ejemplos'].extend(nuevos_ejemplos)
-        
-        # Calcular porcentajes y ordenar por frecuencia
-        total_errores = sum(cat['total'] for cat in errores_por_categoria.values())
-        
-        if total_errores > 0:
-            for categoria in errores_por_categoria:
-                errores_por_categoria[categoria]['porcentaje'] = (errores_por_categoria[categoria]['total'] / total_errores) * 100
-        
-        # Ordenar por total de errores (descendente)
-        errores_ordenados = {
-            k: v for k, v in sorted(
-                errores_por_categoria.items(), 
-                key=lambda item: item[1]['total'], 
-                reverse=True
-            )
-        }
-        
-        return errores_ordenados
+        return historial.analisis_errores()
     except Exception as e:
         logger.error(f"Error analizando errores: {str(e)}")
         return {}
 
-def calcular_nivel_estimado(correcciones, simulacros):
+def calcular_nivel_estimado(correcciones, simulacros, historial=None):
     """
     Estima el nivel de español del estudiante basado en correcciones y simulacros.
     
     Args:
         correcciones (list): Lista de correcciones realizadas
         simulacros (list): Lista de simulacros realizados
+        historial (HistorialAnalitico, opcional): Historial ya ingerido de esas listas
         
     Returns:
         dict: Nivel estimado y confianza
     """
     try:
-        if not correcciones and not simulacros:
+        historial = historial or HistorialAnalitico(correcciones, simulacros)
+        if not historial.total("correccion") and not historial.total("simulacro"):
             return {
                 'nivel': None,
                 'confianza': 0,
                 'puntuacion': 0
             }
         
-        # Recopilar puntuaciones y niveles de todas las actividades
-        puntuaciones_por_nivel = {
-            'A1': [],
-            'A2': [],
-            'B1': [],
-            'B2': [],
-            'C1': [],
-            'C2': []
-        }
-        
-        # Procesar correcciones
-        for correccion in correcciones:
-            nivel = correccion.get('nivel')
-            puntuacion = correccion.get('puntuacion')
-            
-            if nivel in puntuaciones_por_nivel and puntuacion is not None:
-                puntuaciones_por_nivel[nivel].append(puntuacion)
-        
-        # Procesar simulacros (tienen más peso)
-        for simulacro in simulacros:
-            nivel = simulacro.get('nivel')
-            puntuacion = simulacro.get('puntuacion')
-            
-            if nivel in puntuaciones_por_nivel and puntuacion is not None:
-                # Los simulacros tienen doble peso
-                puntuaciones_por_nivel[nivel].append(puntuacion)
-                puntuaciones_por_nivel[nivel].append(puntuacion)
-        
-        # Calcular promedio por nivel
-        promedios = {}
-        for nivel, puntuaciones in puntuaciones_por_nivel.items():
-            if puntuaciones:
-                promedios[nivel] = sum(puntuaciones) / len(puntuaciones)
-            else:
-                promedios[nivel] = 0
-        
-        # Determinar nivel con mayor puntuación promedio
-        nivel_max = max(promedios.items(), key=lambda x: x[1])
-        
-        if nivel_max[1] == 0:
-            return {
-                'nivel': None,
-                'confianza': 0,
-                'puntuacion': 0
-            }
-        
-        # Calcular confianza (qué tan superior es respecto al segundo mayor)
-        promedios_ordenados = sorted(promedios.items(), key=lambda x: x[1], reverse=True)
-        
-        if len(promedios_ordenados) >= 2 and promedios_ordenados[1][1] > 0:
-            ratio = promedios_ordenados[0][1] / promedios_ordenados[1][1]
-            confianza = min(100, (ratio - 1) * 100)
-        else:
-            confianza = 90  # Alta confianza si solo hay un nivel con puntuaciones
-        
-        return {
-            'nivel': nivel_max[0],
-            'confianza': confianza,
-            'puntuacion': nivel_max[1]
-        }
+        return historial.nivel_estimado()
     except Exception as e:
         logger.error(f"Error calculando nivel estimado: {str(e)}")
         return {
@@ -274,142 +88,24 @@ def calcular_nivel_estimado(correcciones, simulacros):
             'puntuacion': 0
         }
 
-def analizar_tendencias(correcciones, periodo=30):
+def analizar_tendencias(correcciones, periodo=30, historial=None):
     """
     Analiza tendencias en el progreso del estudiante en un periodo determinado.
     
     Args:
         correcciones (list): Lista de correcciones realizadas
         periodo (int): Número de días a analizar
+        historial (HistorialAnalitico, opcional): Historial ya ingerido de las correcciones
         
     Returns:
         dict: Análisis de tendencias
     """
     try:
-        if not correcciones:
+        historial = historial or HistorialAnalitico(correcciones)
+        if not historial.num_correcciones:
             return {}
         
-        # Convertir fechas a objetos datetime si son strings
-        for correccion in correcciones:
-            if 'fecha' in correccion and isinstance(correccion['fecha'], str):
-                try:
-                    correccion['fecha'] = datetime.fromisoformat(correccion['fecha'].replace('Z', '+00:00'))
-                except ValueError:
-                    correccion['fecha'] = datetime.now()
-        
-        # Filtrar por periodo
-        fecha_limite = datetime.now() - timedelta(days=periodo)
-        correcciones_periodo = [c for c in correcciones if c.get('fecha', datetime.min) >= fecha_limite]
-        
-        if not correcciones_periodo:
-            return {}
-        
-        # Ordenar por fecha
-        correcciones_ordenadas = sorted(correcciones_periodo, key=lambda x: x.get('fecha', datetime.min))
-        
-        # Crear DataFrame para análisis
-        datos = []
-        for correccion in correcciones_ordenadas:
-            fecha = correccion.get('fecha', datetime.now())
-            puntuacion = correccion.get('puntuacion', 0)
-            palabras = len(correccion.get('texto_original', '').split())
-            
-            # Errores por categoría
-            errores_dict = {}
-            for error in correccion.get('errores', []):
-                categoria = error.get('categoria', 'Otro')
-                cantidad = error.get('cantidad', 0)
-                errores_dict[f"error_{categoria}"] = cantidad
-            
-            # Combinar datos
-            fila = {
-                'fecha': fecha,
-                'puntuacion': puntuacion,
-                'palabras': palabras,
-                **errores_dict
-            }
-            
-            datos.append(fila)
-        
-        # Si no hay suficientes datos, terminar
-        if len(datos) < 2:
-            return {
-                'tendencia_general': 'estable',
-                'mensaje': 'No hay suficientes datos para identificar tendencias claras'
-            }
-        
-        # Crear DataFrame
-        df = pd.DataFrame(datos)
-        
-        # Calcular tendencias
-        tendencias = {}
-        
-        # Tendencia en puntuación
-        if 'puntuacion' in df.columns and df['puntuacion'].notna().sum() >= 2:
-            primera_puntuacion = df['puntuacion'].iloc[0]
-            ultima_puntuacion = df['puntuacion'].iloc[-1]
-            
-            if ultima_puntuacion > primera_puntuacion * 1.1:
-                tendencias['puntuacion'] = 'mejora'
-            elif ultima_puntuacion < primera_puntuacion * 0.9:
-                tendencias['puntuacion'] = 'deterioro'
-            else:
-                tendencias['puntuacion'] = 'estable'
-        
-        # Tendencia en cantidad de palabras
-        if 'palabras' in df.columns and df['palabras'].notna().sum() >= 2:
-            primeras_palabras = df['palabras'].iloc[:len(df)//2].mean()
-            ultimas_palabras = df['palabras'].iloc[len(df)//2:].mean()
-            
-            if ultimas_palabras > primeras_palabras * 1.2:
-                tendencias['palabras'] = 'aumento'
-            elif ultimas_palabras < primeras_palabras * 0.8:
-                tendencias['palabras'] = 'disminución'
-            else:
-                tendencias['palabras'] = 'estable'
-        
-        # Tendencias en errores por categoría
-        columnas_errores = [col for col in df.columns if col.startswith('error_')]
-        tendencias_errores = {}
-        
-        for columna in columnas_errores:
-            if df[columna].notna().sum() >= 2:
-                primeros_errores = df[columna].iloc[:len(df)//2].mean()
-                ultimos_errores = df[columna].iloc[len(df)//2:].mean()
-                
-                categoria = columna.replace('error_', '')
-                
-                if primeros_errores == 0:
-                    if ultimos_errores > 0:
-                        tendencias_errores[categoria] = 'aumento'
-                    else:
-                        tendencias_errores[categoria] = 'estable'
-                else:
-                    ratio = ultimos_errores / primeros_errores
-                    
-                    if ratio < 0.7:
-                        tendencias_errores[categoria] = 'mejora'
-                    elif ratio > 1.3:
-                        tendencias_errores[categoria] = 'deterioro'
-                    else:
-                        tendencias_errores[categoria] = 'estable'
-        
-        # Determinar tendencia general
-        if tendencias.get('puntuacion') == 'mejora' and all(v != 'deterioro' for v in tendencias_errores.values()):
-            tendencia_general = 'mejora'
-        elif tendencias.get('puntuacion') == 'deterioro' or any(v == 'deterioro' for v in tendencias_errores.values()):
-            tendencia_general = 'deterioro'
-        else:
-            tendencia_general = 'estable'
-        
-        return {
-            'tendencia_general': tendencia_general,
-            'tendencias_detalladas': {
-                **tendencias,
-                'errores': tendencias_errores
-            },
-            'mensaje': generar_mensaje_tendencia(tendencia_general, tendencias, tendencias_errores)
-        }
+        return historial.tendencias(periodo)
     except Exception as e:
         logger.error(f"Error analizando tendencias: {str(e)}")
         return {
@@ -471,7 +167,68 @@ def generar_mensaje_tendencia(tendencia_general, tendencias, tendencias_errores)
     
     return mensaje
 
-def generar_informe_profesor(correcciones, simulacros, ejercicios, user_info):
+def tendencias_desde_resumen(rollup):
+    """
+    Tendencias del estudiante leídas de las medias móviles de su resumen de
+    progreso (core.progress_rollup), sin recorrer el historial.
+    
+    Args:
+        rollup (dict): Resumen de progreso del usuario
+        
+    Returns:
+        dict: Análisis de tendencias con el mismo formato que analizar_tendencias
+    """
+    try:
+        # Importar dinámicamente para evitar dependencias circulares
+        from core.progress_rollup import trends_from_rollup
+        
+        tendencias = trends_from_rollup(rollup or {})
+        if not tendencias:
+            return {}
+        if "tendencias_detalladas" not in tendencias:
+            return {
+                "tendencia_general": "estable",
+                "mensaje": "No hay suficientes datos para identificar tendencias claras"
+            }
+        
+        detalladas = dict(tendencias["tendencias_detalladas"])
+        tendencias_errores = detalladas.pop("errores")
+        tendencias["mensaje"] = generar_mensaje_tendencia(
+            tendencias["tendencia_general"], detalladas, tendencias_errores
+        )
+        return tendencias
+    except Exception as e:
+        logger.error(f"Error analizando tendencias del resumen: {str(e)}")
+        return {
+            'tendencia_general': 'estable',
+            'mensaje': 'Error al analizar las tendencias'
+        }
+
+def nivel_desde_resumen(rollup):
+    """
+    Nivel estimado del estudiante leído de las medias móviles de su resumen
+    de progreso (core.progress_rollup), sin recorrer el historial.
+    
+    Args:
+        rollup (dict): Resumen de progreso del usuario
+        
+    Returns:
+        dict: Nivel estimado y confianza
+    """
+    try:
+        # Importar dinámicamente para evitar dependencias circulares
+        from core.progress_rollup import level_from_rollup
+        
+        return level_from_rollup(rollup or {})
+    except Exception as e:
+        logger.error(f"Error calculando nivel estimado del resumen: {str(e)}")
+        return {
+            'nivel': None,
+            'confianza': 0,
+            'puntuacion': 0
+        }
+
+def generar_informe_profesor(correcciones, simulacros, ejercicios, user_info, historial=None):
     """
     Genera un informe completo para el profesor sobre el progreso del estudiante.
     
@@ -480,13 +237,18 @@ def generar_informe_profesor(correcciones, simulacros, ejercicios, user_info):
         simulacros (list): Lista de simulacros realizados
         ejercicios (list): Lista de ejercicios completados
         user_info (dict): Información del usuario
+        historial (HistorialAnalitico, opcional): Historial ya ingerido de esas
+            listas (p. ej. de la caché columnar; entonces las listas pueden ir vacías)
         
     Returns:
         dict: Informe completo
     """
     try:
+        # Ingerir el historial una sola vez para todos los análisis
+        historial = historial or HistorialAnalitico(correcciones, simulacros, ejercicios)
+        
         # Si no hay datos, devolver mensaje
-        if not correcciones and not simulacros and not ejercicios:
+        if not any(historial.total(tipo) for tipo in TIPOS):
             return {
                 "mensaje": "El estudiante no ha realizado actividades suficientes para generar un informe.",
                 "recomendaciones": ["Animar al estudiante a utilizar la plataforma regularmente."]
@@ -501,9 +263,9 @@ def generar_informe_profesor(correcciones, simulacros, ejercicios, user_info):
                 "lengua_materna": user_info.get('lengua_materna', 'No especificada')
             },
             "actividad": {
-                "total_correcciones": len(correcciones),
-                "total_simulacros": len(simulacros),
-                "total_ejercicios": len(ejercicios),
+                "total_correcciones": historial.total("correccion"),
+                "total_simulacros": historial.total("simulacro"),
+                "total_ejercicios": historial.total("ejercicio"),
                 "ultima_actividad": None,
                 "frecuencia_semanal": 0
             },
@@ -515,33 +277,14 @@ def generar_informe_profesor(correcciones, simulacros, ejercicios, user_info):
             "recomendaciones": []
         }
         
-        # Calcular fecha de última actividad
-        todas_fechas = []
-        for actividad in correcciones + simulacros + ejercicios:
-            if 'fecha' in actividad:
-                fecha = actividad['fecha']
-                if isinstance(fecha, str):
-                    try:
-                        fecha = datetime.fromisoformat(fecha.replace('Z', '+00:00'))
-                    except ValueError:
-                        continue
-                todas_fechas.append(fecha)
-        
-        if todas_fechas:
-            informe["actividad"]["ultima_actividad"] = max(todas_fechas).strftime("%d/%m/%Y")
-            
-            # Calcular frecuencia semanal
-            if len(todas_fechas) >= 2:
-                fecha_min = min(todas_fechas)
-                fecha_max = max(todas_fechas)
-                
-                dias_totales = (fecha_max - fecha_min).days
-                if dias_totales > 0:
-                    frecuencia = (len(todas_fechas) / dias_totales) * 7
-                    informe["actividad"]["frecuencia_semanal"] = round(frecuencia, 1)
+        # Calcular fecha de última actividad y frecuencia semanal
+        resumen = historial.resumen_actividad()
+        if resumen["ultima_actividad"]:
+            informe["actividad"]["ultima_actividad"] = resumen["ultima_actividad"].strftime("%d/%m/%Y")
+            informe["actividad"]["frecuencia_semanal"] = resumen["frecuencia_semanal"]
         
         # Calcular nivel estimado
-        nivel_estimado = calcular_nivel_estimado(correcciones, simulacros)
+        nivel_estimado = calcular_nivel_estimado(correcciones, simulacros, historial=historial)
         if nivel_estimado.get('nivel'):
             informe["nivel"] = {
                 "estimado": nivel_estimado.get('nivel'),
@@ -550,7 +293,7 @@ def generar_informe_profesor(correcciones, simulacros, ejercicios, user_info):
             }
         
         # Análisis de errores
-        errores_analizados = analizar_errores(correcciones)
+        errores_analizados = analizar_errores(correcciones, historial=historial)
         if errores_analizados:
             # Convertir a formato simplificado
             errores_formateados = {}
@@ -569,12 +312,12 @@ def generar_informe_profesor(correcciones, simulacros, ejercicios, user_info):
                 informe["debilidades"].append(f"Errores de {categoria}")
         
         # Análisis de tendencias
-        tendencias = analizar_tendencias(correcciones)
+        tendencias = analizar_tendencias(correcciones, historial=historial)
         if tendencias:
             informe["tendencias"] = tendencias
         
         # Identificar fortalezas
-        if correcciones:
+        if historial.num_correcciones:
             # Buscar categorías con pocos errores o en mejora
             if errores_analizados:
                 # Categorías con menos errores
@@ -630,4 +373,28 @@ def generar_informe_profesor(correcciones, simulacros, ejercicios, user_info):
             "mensaje": f"Error generando informe: {str(e)}",
             "recomendaciones": ["Contactar al soporte técnico si el problema persiste."]
         }
-    
\ No newline at end of file
+    
+
+def generar_informe_profesor_usuario(uid, user_info):
+    """
+    Genera el informe del profesor de un estudiante a partir de su historial en
+    la caché columnar (sin descargar sus actividades si la caché está al día).
+    
+    Args:
+        uid (str): ID del estudiante
+        user_info (dict): Información del usuario
+        
+    Returns:
+        dict: Informe completo
+    """
+    try:
+        # Importar dinámicamente para evitar dependencias circulares
+        from core.history_cache import get_history
+        
+        return generar_informe_profesor([], [], [], user_info, historial=get_history(uid))
+    except Exception as e:
+        logger.error(f"Error generando informe de profesor: {str(e)}")
+        return {
+            "mensaje": f"Error generando informe: {str(e)}",
+            "recomendaciones": ["Contactar al soporte técnico si el problema persiste."]
+        }
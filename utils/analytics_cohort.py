@@ -0,0 +1,403 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Analíticas de grupo
+-------------------
+Informe de una clase completa para el profesor: distribución de errores de la
+clase, curvas de progreso de puntuación y nivel, patrones de errores
+frecuentes y estudiantes atípicos.
+
+Los historiales de los estudiantes se reúnen en paralelo (desde la caché
+columnar de core.history_cache) y se concatenan en dos tablas de la clase,
+actividades y errores, con una columna de estudiante. Todos los análisis son
+agregaciones vectorizadas sobre esas tablas, sin recorrer a cada estudiante.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from config.settings import COHORT_FETCH_TIMEOUT, COHORT_OUTLIER_THRESHOLD
+from utils.analytics_engine import NIVELES, TIPOS, matriz_actividad
+
+logger = logging.getLogger(__name__)
+
+# Métricas por estudiante que se comparan con la clase
+METRICAS_ATIPICOS = {
+    "puntuacion_media": "Puntuación media",
+    "errores_por_100_palabras": "Errores por cada 100 palabras",
+    "actividades_30_dias": "Actividades en los últimos 30 días",
+}
+
+def cargar_historiales(uids):
+    """
+    Reúne en paralelo los historiales analíticos de varios estudiantes.
+
+    Args:
+        uids (list): IDs de los estudiantes
+
+    Returns:
+        tuple: (dict uid -> HistorialAnalitico en el orden de uids,
+            lista de los uids cuyo historial no se pudo obtener)
+    """
+    # Importar dinámicamente para evitar dependencias circulares
+    from core.fetch_coordinator import FetchCoordinator
+    from core.history_cache import get_history
+
+    uids = list(dict.fromkeys(uid for uid in uids if uid))
+    # Pool propio: una clase grande no deja sin hilos a los paneles de las demás sesiones
+    consultas = FetchCoordinator(timeout=COHORT_FETCH_TIMEOUT, pool="cohorte")
+    for uid in uids:
+        consultas.submit(uid, get_history, uid)
+    resultados = consultas.results()
+
+    historiales = {uid: resultados[uid] for uid in uids if resultados.get(uid) is not None}
+    sin_datos = [uid for uid in uids if uid not in historiales]
+    if sin_datos:
+        logger.warning(f"No se pudo obtener el historial de {len(sin_datos)} estudiantes")
+    return historiales, sin_datos
+
+class Cohorte:
+    """
+    Historiales de una clase unidos en tablas columnares.
+
+    Atributos:
+        actividades (DataFrame): Una fila por actividad de cualquier estudiante
+            (estudiante, tipo, fecha, puntuación, nivel y palabras)
+        errores (DataFrame): Una fila por corrección y categoría de error
+            (estudiante, fila de la corrección en actividades, categoría y cantidad)
+    """
+
+    def __init__(self, historiales, ahora=None):
+        """
+        Prepara la cohorte (las tablas se construyen al primer uso).
+
+        Args:
+            historiales (dict): uid -> HistorialAnalitico de cada estudiante
+            ahora (datetime, opcional): Momento de referencia para los periodos
+        """
+        self.uids = list(historiales)
+        self.ahora = ahora or datetime.now()
+        self._historiales = list(historiales.values())
+
+    @cached_property
+    def actividades(self):
+        """DataFrame: Actividades de toda la clase con el código del estudiante."""
+        historiales = self._historiales
+        cuentas = [len(h.puntuaciones) for h in historiales]
+        if not sum(cuentas):
+            return pd.DataFrame({
+                "estudiante": np.zeros(0, dtype=int), "tipo": pd.Categorical([], categories=TIPOS),
+                "fecha": np.zeros(0, dtype="datetime64[ns]"), "puntuacion": np.zeros(0),
+                "nivel": np.zeros(0, dtype=int), "palabras": np.zeros(0, dtype=int),
+            })
+
+        puntuaciones = pd.concat([h.puntuaciones for h in historiales], ignore_index=True)
+        actividades = pd.DataFrame({
+            "estudiante": np.repeat(np.arange(len(historiales)), cuentas),
+            "tipo": puntuaciones["tipo"],
+            "fecha": np.concatenate([h.fechas[0] for h in historiales]),
+            # Sin puntuación, NaN (no cuenta en las medias)
+            "puntuacion": puntuaciones["puntuacion"].where(puntuaciones["tiene_puntuacion"]),
+            # Código del nivel en NIVELES (-1 si no es un nivel del MCER)
+            "nivel": pd.Categorical(puntuaciones["nivel"], categories=NIVELES).codes.astype(int),
+            "palabras": 0,
+        })
+        # Las correcciones de cada estudiante van primero en su bloque, en el mismo orden que palabras()
+        es_correccion = (actividades["tipo"] == "correccion").to_numpy()
+        actividades.loc[es_correccion, "palabras"] = np.concatenate(
+            [np.asarray(h.palabras(), dtype=int) for h in historiales])
+        return actividades
+
+    @cached_property
+    def errores(self):
+        """DataFrame: Errores de toda la clase, enlazados con su fila en actividades."""
+        historiales = self._historiales
+        tablas = [h.errores for h in historiales]
+        cuentas = [len(tabla) for tabla in tablas]
+        if not sum(cuentas):
+            return pd.DataFrame({
+                "estudiante": np.zeros(0, dtype=int), "fila": np.zeros(0, dtype=int),
+                "categoria": pd.Series([], dtype=object), "cantidad": np.zeros(0),
+            })
+
+        inicios = np.cumsum([0] + [len(h.puntuaciones) for h in historiales])[:-1]
+        estudiante = np.repeat(np.arange(len(historiales)), cuentas)
+        errores = pd.concat(tablas, ignore_index=True)
+        return pd.DataFrame({
+            "estudiante": estudiante,
+            "fila": inicios[estudiante] + errores["fila"].to_numpy(dtype=int),
+            "categoria": errores["categoria"],
+            "cantidad": errores["cantidad"].astype(float),
+        })
+
+    def _correcciones(self):
+        return self.actividades[self.actividades["tipo"] == "correccion"]
+
+    def resumen(self):
+        """
+        Totales de la clase.
+
+        Returns:
+            dict: Estudiantes, actividades por tipo y estudiantes activos en la última semana
+        """
+        actividades = self.actividades
+        por_tipo = actividades["tipo"].value_counts()
+        recientes = actividades["fecha"] >= pd.Timestamp(self.ahora - timedelta(days=7))
+        return {
+            "estudiantes": len(self.uids),
+            "total_correcciones": int(por_tipo.get("correccion", 0)),
+            "total_simulacros": int(por_tipo.get("simulacro", 0)),
+            "total_ejercicios": int(por_tipo.get("ejercicio", 0)),
+            "activos_ultima_semana": int(actividades.loc[recientes, "estudiante"].nunique()),
+        }
+
+    def distribucion_errores(self):
+        """
+        Errores de la clase por categoría, ordenados por total descendente.
+
+        Returns:
+            dict: categoría -> {"total", "porcentaje", "estudiantes",
+                "porcentaje_estudiantes", "media_por_correccion"}
+        """
+        errores = self.errores
+        if errores.empty:
+            return {}
+
+        agregados = errores.groupby("categoria", sort=False, dropna=False).agg(
+            total=("cantidad", "sum"), estudiantes=("estudiante", "nunique")
+        ).sort_values("total", ascending=False, kind="mergesort")
+        total_errores = agregados["total"].sum()
+        num_correcciones = max(1, len(self._correcciones()))
+        con_correcciones = max(1, self._correcciones()["estudiante"].nunique())
+
+        return {
+            categoria: {
+                "total": total,
+                "porcentaje": total / total_errores * 100 if total_errores > 0 else 0,
+                "estudiantes": estudiantes,
+                "porcentaje_estudiantes": estudiantes / con_correcciones * 100,
+                "media_por_correccion": total / num_correcciones,
+            }
+            for categoria, total, estudiantes in zip(
+                agregados.index, agregados["total"].tolist(), agregados["estudiantes"].tolist())
+        }
+
+    def curvas_progreso(self, frecuencia="W"):
+        """
+        Evolución de la clase por periodo: puntuación de las correcciones (media
+        y cuartiles), nivel medio de correcciones y simulacros y estudiantes activos.
+
+        Args:
+            frecuencia (str): Periodo de pandas ("D", "W", "M")
+
+        Returns:
+            list: Un diccionario por periodo, en orden cronológico
+        """
+        actividades = self.actividades[self.actividades["fecha"].notna()]
+        if actividades.empty:
+            return []
+
+        periodo = actividades["fecha"].dt.to_period(frecuencia).dt.start_time
+        correcciones = actividades["tipo"] == "correccion"
+        puntuaciones = actividades["puntuacion"].where(correcciones).groupby(periodo)
+        # Nivel 1 (A1) a 6 (C2); las actividades sin nivel MCER no cuentan
+        niveles = (actividades["nivel"] + 1).where(
+            (actividades["nivel"] >= 0) & (actividades["tipo"] != "ejercicio")).groupby(periodo)
+
+        curvas = pd.DataFrame({
+            "puntuacion_media": puntuaciones.mean(),
+            "puntuacion_p25": puntuaciones.quantile(0.25),
+            "puntuacion_p75": puntuaciones.quantile(0.75),
+            "nivel_medio": niveles.mean(),
+            "estudiantes_activos": actividades["estudiante"].groupby(periodo).nunique(),
+        }).sort_index()
+        curvas = curvas.astype(object).where(curvas.notna(), None)
+        return [{"fecha": fecha.to_pydatetime(), **fila} for fecha, fila in zip(curvas.index, curvas.to_dict("records"))]
+
+    def mapa_actividad(self, vista="semana", metrica="estudiantes"):
+        """
+        Matriz del mapa de calor de actividad de la clase.
+
+        Args:
+            vista (str): "semana" (día x hora), "mes" o "año" (calendarios)
+            metrica (str): "estudiantes" (estudiantes distintos por celda) o "actividades"
+
+        Returns:
+            DataFrame: Día de la semana x hora o semana (ver matriz_actividad)
+        """
+        actividades = self.actividades
+        usuarios = actividades["estudiante"].to_numpy() if metrica == "estudiantes" else None
+        return matriz_actividad(actividades["fecha"].to_numpy(), vista, usuarios=usuarios, ahora=self.ahora)
+
+    def niveles_por_periodo(self, frecuencia="W"):
+        """
+        Estudiantes en cada nivel por periodo, según el nivel de su última
+        corrección o simulacro del periodo.
+
+        Args:
+            frecuencia (str): Periodo de pandas ("D", "W", "M")
+
+        Returns:
+            list: Diccionarios {"fecha", "nivel", "estudiantes"} en orden cronológico
+        """
+        actividades = self.actividades
+        validas = actividades["fecha"].notna() & (actividades["nivel"] >= 0) & (actividades["tipo"] != "ejercicio")
+        actividades = actividades[validas].sort_values("fecha", kind="mergesort")
+        if actividades.empty:
+            return []
+
+        periodo = actividades["fecha"].dt.to_period(frecuencia).dt.start_time.rename("fecha")
+        ultimos = actividades.groupby([periodo, actividades["estudiante"]])["nivel"].last()
+        conteo = ultimos.groupby(level="fecha").value_counts().sort_index()
+        return [
+            {"fecha": fecha.to_pydatetime(), "nivel": NIVELES[nivel], "estudiantes": int(n)}
+            for (fecha, nivel), n in conteo.items()
+        ]
+
+    def patrones_errores(self, limite=10):
+        """
+        Parejas de categorías de error que aparecen juntas con más frecuencia
+        en una misma corrección.
+
+        Args:
+            limite (int): Número máximo de patrones
+
+        Returns:
+            list: Diccionarios {"patron", "categorias", "correcciones",
+                "estudiantes", "porcentaje"} ordenados por frecuencia
+        """
+        errores = self.errores[self.errores["cantidad"] > 0]
+        if errores.empty:
+            return []
+
+        # Matriz de presencia corrección x categoría y coocurrencias por producto matricial
+        filas, correcciones = pd.factorize(errores["fila"])
+        codigos, categorias = pd.factorize(errores["categoria"], use_na_sentinel=False)
+        presencia = np.zeros((len(correcciones), len(categorias)), dtype=np.int32)
+        presencia[filas, codigos] = 1
+        coocurrencias = presencia.T @ presencia
+        i, j = np.triu_indices(len(categorias), k=1)
+        conteos = coocurrencias[i, j]
+        orden = np.argsort(-conteos, kind="stable")[:limite]
+        orden = orden[conteos[orden] > 0]
+
+        estudiante = self.actividades["estudiante"].to_numpy()[correcciones.to_numpy()]
+        patrones = []
+        for k in orden:
+            juntas = (presencia[:, i[k]] & presencia[:, j[k]]).astype(bool)
+            patrones.append({
+                "patron": f"{categorias[i[k]]} + {categorias[j[k]]}",
+                "categorias": [categorias[i[k]], categorias[j[k]]],
+                "correcciones": int(conteos[k]),
+                "estudiantes": int(len(np.unique(estudiante[juntas]))),
+                "porcentaje": conteos[k] / len(correcciones) * 100,
+            })
+        return patrones
+
+    def metricas_estudiantes(self):
+        """
+        Métricas de cada estudiante para compararlo con la clase.
+
+        Returns:
+            DataFrame: Una fila por estudiante (índice: uid) con las columnas de METRICAS_ATIPICOS
+        """
+        actividades = self.actividades
+        estudiantes = pd.RangeIndex(len(self.uids))
+        correcciones = self._correcciones()
+
+        errores = self.errores.groupby("estudiante")["cantidad"].sum().reindex(estudiantes, fill_value=0)
+        palabras = correcciones.groupby("estudiante")["palabras"].sum().reindex(estudiantes, fill_value=0)
+        recientes = actividades["fecha"] >= pd.Timestamp(self.ahora - timedelta(days=30))
+
+        metricas = pd.DataFrame({
+            "puntuacion_media": correcciones.groupby("estudiante")["puntuacion"].mean().reindex(estudiantes),
+            "errores_por_100_palabras": (errores / palabras.where(palabras > 0)) * 100,
+            "actividades_30_dias": actividades[recientes].groupby("estudiante").size()
+                .reindex(estudiantes, fill_value=0).astype(float),
+        })
+        metricas.index = pd.Index(self.uids, name="uid")
+        return metricas
+
+    def estudiantes_atipicos(self, umbral=COHORT_OUTLIER_THRESHOLD):
+        """
+        Estudiantes que se alejan de la clase en alguna métrica, según la
+        puntuación z robusta (mediana y desviación absoluta mediana).
+
+        Args:
+            umbral (float): Valor absoluto de z a partir del que se marca
+
+        Returns:
+            list: Diccionarios {"uid", "metrica", "valor", "mediana_clase", "z",
+                "direccion"} ordenados por |z| descendente
+        """
+        metricas = self.metricas_estudiantes()
+        if len(metricas) < 3:
+            return []
+
+        valores = metricas.to_numpy(dtype=float)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            medianas = np.nanmedian(valores, axis=0)
+            dispersion = 1.4826 * np.nanmedian(np.abs(valores - medianas), axis=0)
+            # Si más de la mitad coincide con la mediana, usar la desviación media
+            media_abs = 1.2533 * np.nanmean(np.abs(valores - medianas), axis=0)
+            dispersion = np.where(dispersion > 0, dispersion, media_abs)
+            z = (valores - medianas) / np.where(dispersion > 0, dispersion, np.nan)
+
+        filas, columnas = np.nonzero(np.abs(np.nan_to_num(z)) >= umbral)
+        orden = np.argsort(-np.abs(z[filas, columnas]), kind="stable")
+        return [
+            {
+                "uid": metricas.index[f],
+                "metrica": metricas.columns[c],
+                "valor": float(valores[f, c]),
+                "mediana_clase": float(medianas[c]),
+                "z": float(z[f, c]),
+                "direccion": "por encima" if z[f, c] > 0 else "por debajo",
+            }
+            for f, c in zip(filas[orden], columnas[orden])
+        ]
+
+def generar_informe_cohorte(uids, frecuencia="W", historiales=None):
+    """
+    Genera el informe de una clase para el profesor.
+
+    Args:
+        uids (list): IDs de los estudiantes de la clase
+        frecuencia (str): Periodo de las curvas de progreso ("D", "W", "M")
+        historiales (dict, opcional): uid -> HistorialAnalitico ya cargados
+
+    Returns:
+        dict: Resumen, errores, progreso, niveles, patrones, mapa de actividad,
+            atípicos y estudiantes sin datos
+    """
+    try:
+        sin_datos = []
+        if historiales is None:
+            historiales, sin_datos = cargar_historiales(uids)
+        if not historiales:
+            return {
+                "mensaje": "No se ha podido obtener la actividad de ningún estudiante de la clase.",
+                "sin_datos": sin_datos
+            }
+
+        cohorte = Cohorte(historiales)
+        return {
+            "resumen": cohorte.resumen(),
+            "errores": cohorte.distribucion_errores(),
+            "progreso": cohorte.curvas_progreso(frecuencia),
+            "niveles": cohorte.niveles_por_periodo(frecuencia),
+            "patrones": cohorte.patrones_errores(),
+            "mapa_actividad": cohorte.mapa_actividad(),
+            "atipicos": cohorte.estudiantes_atipicos(),
+            "sin_datos": sin_datos
+        }
+    except Exception as e:
+        logger.error(f"Error generando informe de la clase: {str(e)}")
+        return {
+            "mensaje": f"Error generando informe de la clase: {str(e)}",
+            "sin_datos": []
+        }
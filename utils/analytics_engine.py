@@ -0,0 +1,712 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Motor columnar de analíticas
+----------------------------
+Convierte el historial de un estudiante (listas de correcciones, simulacros y
+ejercicios) en DataFrames tipados: las fechas se interpretan una sola vez y
+los errores se despliegan en una tabla larga (una fila por corrección y
+categoría). Cada tabla se construye la primera vez que la pide un análisis y
+la comparten todos los demás.
+
+Las analíticas de utils.analytics se calculan después con operaciones
+vectorizadas sobre esas tablas, con los mismos resultados que el recorrido
+original de los diccionarios.
+"""
+
+import logging
+import re
+import warnings
+from datetime import datetime, timedelta
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+from dateutil.tz import tzlocal
+
+logger = logging.getLogger(__name__)
+
+NIVELES = ["A1", "A2", "B1", "B2", "C1", "C2"]
+
+TIPOS = ["correccion", "simulacro", "ejercicio"]
+
+# Fecha ISO 8601 con zona horaria explícita
+_ISO_CON_ZONA = re.compile(r"\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})$")
+
+_UN_DIA = np.timedelta64(1, "D")
+
+# Separadores de str.split() fuera de ASCII (todos desde U+0085)
+_ESPACIOS_NO_ASCII = np.array([i for i in range(0x80, 0x3001) if chr(i).isspace()], dtype=np.uint32)
+
+def contar_palabras(textos):
+    """
+    Cuenta las palabras de muchos textos a la vez, igual que len(texto.split()).
+
+    Los textos se unen en un único búfer UTF-32 y se suman por tramos los
+    inicios de palabra (carácter no blanco precedido de blanco), sin crear
+    las listas de palabras.
+
+    Args:
+        textos (list): Textos (los valores que no son texto cuentan 0)
+
+    Returns:
+        np.ndarray: Número de palabras de cada texto
+    """
+    textos = [t if isinstance(t, str) else "" for t in textos]
+    if not textos:
+        return np.zeros(0, dtype=int)
+
+    # Un blanco delante de cada texto separa los tramos; el final cierra el último
+    bufer = np.frombuffer((" " + " ".join(textos) + " ").encode("utf-32-le"), dtype=np.uint32)
+    blanco = (bufer == 32) | ((bufer >= 9) & (bufer <= 13)) | ((bufer >= 28) & (bufer <= 31))
+    altos = np.flatnonzero(bufer >= _ESPACIOS_NO_ASCII[0])
+    if len(altos):
+        blanco[altos] = np.isin(bufer[altos], _ESPACIOS_NO_ASCII)
+
+    # inicio[k]: el carácter k + 1 empieza una palabra; el tramo de cada texto
+    # empieza en su blanco inicial
+    inicio = blanco[:-1] & ~blanco[1:]
+    tramos = np.cumsum([0] + [len(t) + 1 for t in textos[:-1]])
+    return np.add.reduceat(inicio, tramos, dtype=np.int64).astype(int)
+
+def _a_numero(valores):
+    """Convierte una lista a números; los valores no numéricos cuentan 0."""
+    numeros = pd.to_numeric(valores, errors="coerce")
+    return np.nan_to_num(numeros) if numeros.dtype.kind == "f" else numeros
+
+def _normalizar_errores(errores):
+    """Lista de errores (diccionarios) de una corrección, en formato lista o recuento por categoría."""
+    if isinstance(errores, dict):
+        # Formato guardado por save_correction_with_stats: {categoría: cantidad}
+        return [{"categoria": c, "cantidad": n} for c, n in errores.items()]
+    if isinstance(errores, (list, tuple)):
+        return [error for error in errores if isinstance(error, dict)]
+    return []
+
+def _a_hora_local(indice):
+    """Convierte fechas con zona horaria a hora local sin zona."""
+    return pd.DatetimeIndex(indice).tz_convert(tzlocal()).tz_localize(None)
+
+def _parsear_textos(textos):
+    """
+    Interpreta fechas ISO 8601 en texto. Las fechas sin zona son hora local;
+    las que llevan zona se pasan a hora local.
+    """
+    # Caso habitual: todas sin zona, o todas con la misma zona (un único análisis)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", FutureWarning)
+        try:
+            fechas = pd.to_datetime(textos, format="ISO8601", errors="coerce")
+        except ValueError:
+            fechas = None
+    if fechas is not None and fechas.dtype == "datetime64[ns]":
+        return fechas.to_numpy()
+    if fechas is not None and isinstance(fechas.dtype, pd.DatetimeTZDtype):
+        return _a_hora_local(fechas).to_numpy()
+
+    # Zonas mezcladas: separar las que llevan zona
+    resultado = pd.Series(pd.NaT, index=textos.index, dtype="datetime64[ns]")
+    con_zona = textos.str.contains(_ISO_CON_ZONA, na=False)
+    resultado[~con_zona] = pd.to_datetime(textos[~con_zona], format="ISO8601", errors="coerce").to_numpy()
+    resultado[con_zona] = _a_hora_local(
+        pd.to_datetime(textos[con_zona], format="ISO8601", errors="coerce", utc=True)
+    ).to_numpy()
+    return resultado.to_numpy()
+
+def parsear_fechas(valores):
+    """
+    Interpreta de una vez una columna de fechas en cualquiera de los formatos
+    guardados (timestamp, ISO 8601 con o sin zona, datetime).
+
+    Args:
+        valores (list): Fechas tal como vienen en los documentos
+
+    Returns:
+        tuple: (np.ndarray datetime64[ns] en hora local, con NaT si falta,
+            np.ndarray bool con True donde había un texto no interpretable)
+    """
+    serie = pd.Series(valores, dtype=object)
+    invalidas = np.zeros(len(serie), dtype=bool)
+    tipo = pd.api.types.infer_dtype(serie, skipna=True)
+
+    # Columnas homogéneas (lo normal): sin recorrer los valores en Python
+    if tipo == "empty":
+        return np.full(len(serie), np.datetime64("NaT"), dtype="datetime64[ns]"), invalidas
+    if tipo == "string":
+        fechas = _parsear_textos(serie.str.strip())
+        return fechas, serie.notna().to_numpy() & np.isnat(fechas)
+    if tipo in ("floating", "integer", "mixed-integer-float"):
+        segundos = pd.to_numeric(serie, errors="coerce")
+        return _a_hora_local(pd.to_datetime(segundos, unit="s", utc=True)).to_numpy(), invalidas
+    if tipo == "datetime":
+        try:
+            fechas = pd.to_datetime(serie)
+        except (ValueError, TypeError):
+            fechas = None
+        if fechas is not None and fechas.dtype == "datetime64[ns]":
+            return fechas.to_numpy(), invalidas
+        if fechas is not None and isinstance(fechas.dtype, pd.DatetimeTZDtype):
+            return _a_hora_local(fechas).to_numpy(), invalidas
+
+    # Formatos mezclados
+    fechas = pd.Series(pd.NaT, index=serie.index, dtype="datetime64[ns]")
+    es_numero = serie.map(lambda v: isinstance(v, (int, float)) and not isinstance(v, bool))
+    es_texto = serie.map(lambda v: isinstance(v, str))
+    es_fecha = serie.map(lambda v: isinstance(v, datetime))
+
+    if es_numero.any():
+        segundos = serie[es_numero].astype(float)
+        fechas[es_numero] = _a_hora_local(pd.to_datetime(segundos, unit="s", utc=True)).to_numpy()
+    if es_texto.any():
+        fechas[es_texto] = _parsear_textos(serie[es_texto].str.strip())
+        invalidas = (es_texto & fechas.isna()).to_numpy()
+    if es_fecha.any():
+        fechas[es_fecha] = [
+            (v.astimezone().replace(tzinfo=None) if v.tzinfo else v) for v in serie[es_fecha]
+        ]
+
+    return fechas.to_numpy(dtype="datetime64[ns]"), invalidas
+
+# Vistas del mapa de actividad: días x horas, calendario del mes y del último año
+VISTAS_ACTIVIDAD = ("semana", "mes", "año")
+
+DIAS_SEMANA = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+
+def matriz_actividad(fechas, vista="semana", usuarios=None, ahora=None):
+    """
+    Agrega fechas de actividad en la matriz de un mapa de calor, en una sola
+    pasada vectorizada (cada fecha se convierte en el índice de su celda y se
+    cuentan con bincount).
+
+    Vistas:
+        - "semana": día de la semana x hora del día (todo el historial)
+        - "mes": calendario del mes actual (día de la semana x semana)
+        - "año": calendario de las últimas 53 semanas (día de la semana x semana)
+
+    Args:
+        fechas (array): Fechas datetime64 (hora local; las NaT se ignoran)
+        vista (str): "semana", "mes" o "año"
+        usuarios (array, opcional): Código de usuario de cada fecha; si se
+            indica, cada celda cuenta usuarios distintos en lugar de actividades
+        ahora (datetime, opcional): Momento de referencia de los calendarios
+
+    Returns:
+        DataFrame: Filas DIAS_SEMANA, columnas horas o semanas (lunes de cada
+            semana) y recuentos; en los calendarios, NaN fuera del periodo
+    """
+    if vista not in VISTAS_ACTIVIDAD:
+        raise ValueError(f"Vista de actividad no válida: {vista}")
+
+    fechas = np.asarray(fechas, dtype="datetime64[ns]")
+    validas = ~np.isnat(fechas)
+    fechas = fechas[validas]
+    if usuarios is not None:
+        usuarios = np.asarray(usuarios)[validas]
+    dias = fechas.astype("datetime64[D]")
+    # El 1 de enero de 1970 fue jueves: +3 deja el lunes en 0
+    dia_semana = (dias.astype(np.int64) + 3) % 7
+
+    if vista == "semana":
+        columnas = [f"{hora}:00" for hora in range(24)]
+        hora = ((fechas - dias) // np.timedelta64(1, "h")).astype(np.int64)
+        celdas = dia_semana * 24 + hora
+        fuera = None
+    else:
+        hoy = np.datetime64((ahora or datetime.now()).date(), "D")
+        if vista == "mes":
+            inicio = hoy.astype("datetime64[M]").astype("datetime64[D]")
+            fin = (hoy.astype("datetime64[M]") + 1).astype("datetime64[D]") - 1
+        else:
+            inicio, fin = hoy - 364, hoy
+        primer_lunes = inicio - (inicio.astype(np.int64) + 3) % 7
+        semanas = int((fin - primer_lunes).astype(np.int64)) // 7 + 1
+        lunes = primer_lunes + 7 * np.arange(semanas)
+        columnas = [pd.Timestamp(dia).strftime("%d/%m/%Y") for dia in lunes]
+
+        en_periodo = (dias >= inicio) & (dias <= fin)
+        desplazamiento = (dias[en_periodo] - primer_lunes).astype(np.int64)
+        dia_semana = dia_semana[en_periodo]
+        celdas = dia_semana * semanas + desplazamiento // 7
+        if usuarios is not None:
+            usuarios = usuarios[en_periodo]
+        # Días de las semanas del borde que no pertenecen al periodo
+        todos = primer_lunes + np.arange(7 * semanas)
+        fuera = ((todos < inicio) | (todos > fin)).reshape(semanas, 7).T
+
+    tamano = 7 * len(columnas)
+    if usuarios is None:
+        recuentos = np.bincount(celdas, minlength=tamano)
+    else:
+        codigos = pd.factorize(usuarios)[0].astype(np.int64)
+        total_usuarios = max(1, int(codigos.max()) + 1) if len(codigos) else 1
+        pares = np.unique(celdas * total_usuarios + codigos)
+        recuentos = np.bincount(pares // total_usuarios, minlength=tamano)
+
+    matriz = recuentos.reshape(7, len(columnas)).astype(float)
+    if fuera is not None:
+        matriz[fuera] = np.nan
+    return pd.DataFrame(matriz, index=DIAS_SEMANA, columns=columnas)
+
+class HistorialAnalitico:
+    """
+    Historial de un estudiante en formato columnar, listo para las analíticas.
+
+    Atributos:
+        puntuaciones (DataFrame): Una fila por actividad con tipo, orden original,
+            nivel y puntuación
+        fechas (tuple): Fechas de las actividades (datetime64, hora local) y
+            máscara de los textos de fecha no válidos
+        temas (tuple): Máscara de actividades con tema y tema de cada una
+        actividades (DataFrame): Las columnas de puntuaciones más fecha y tema
+        errores (DataFrame): Una fila por corrección y categoría de error
+            (fila de la corrección, posición, categoría y cantidad)
+    """
+
+    def __init__(self, correcciones=None, simulacros=None, ejercicios=None, ahora=None):
+        """
+        Prepara el historial (las tablas se construyen al primer uso).
+
+        Args:
+            correcciones (list): Correcciones del estudiante
+            simulacros (list): Simulacros del estudiante
+            ejercicios (list): Ejercicios del estudiante
+            ahora (datetime, opcional): Momento de referencia para los periodos
+        """
+        self.ahora = ahora or datetime.now()
+        self._correcciones = correcciones or []
+        self._documentos = self._correcciones + (simulacros or []) + (ejercicios or [])
+        self._cuentas = [len(self._correcciones), len(simulacros or []), len(ejercicios or [])]
+        self.num_correcciones = len(self._correcciones)
+        self._palabras = None
+        self._ejemplos = None
+
+    @classmethod
+    def desde_columnas(cls, columnas, ahora=None):
+        """
+        Crea el historial a partir de columnas ya extraídas (por ejemplo, de la
+        caché columnar de core.history_cache) sin volver a leer los documentos.
+
+        Args:
+            columnas (dict): Por tipo de actividad, el diccionario que devuelve columnas()
+            ahora (datetime, opcional): Momento de referencia para los periodos
+
+        Returns:
+            HistorialAnalitico: Historial con todas sus tablas construidas
+        """
+        historial = cls(ahora=ahora)
+        partes = [columnas.get(tipo) or {} for tipo in TIPOS]
+        historial._cuentas = [len(parte.get("fecha", ())) for parte in partes]
+        historial.num_correcciones = historial._cuentas[0]
+
+        def unir(campo, dtype=None):
+            return np.concatenate([np.asarray(parte.get(campo, ()), dtype=dtype) for parte in partes])
+
+        historial.__dict__["puntuaciones"] = pd.DataFrame({
+            "tipo": pd.Categorical.from_codes(np.repeat(np.arange(len(TIPOS)), historial._cuentas), categories=TIPOS),
+            "orden": np.concatenate([np.arange(n) for n in historial._cuentas]).astype(int),
+            "tiene_puntuacion": unir("tiene_puntuacion", bool),
+            "puntuacion": unir("puntuacion", float),
+            "nivel": unir("nivel", object),
+        })
+        historial.__dict__["fechas"] = (unir("fecha", "datetime64[ns]"), unir("fecha_invalida", bool))
+        historial.__dict__["temas"] = (unir("tiene_tema", bool), unir("tema", object))
+
+        correcciones = partes[0]
+        historial._palabras = np.asarray(correcciones.get("palabras", ()), dtype=int)
+        errores = correcciones.get("errores")
+        historial.__dict__["errores"] = errores if errores is not None else \
+            pd.DataFrame({"fila": [], "posicion": [], "categoria": [], "cantidad": []})
+        historial._ejemplos = correcciones.get("ejemplos") or {}
+        return historial
+
+    def total(self, tipo):
+        """int: Número de actividades de un tipo ("correccion", "simulacro" o "ejercicio")."""
+        return self._cuentas[TIPOS.index(tipo)]
+
+    def columnas(self, tipo):
+        """
+        Columnas de un tipo de actividad, en el orden de las listas de entrada.
+
+        Args:
+            tipo (str): "correccion", "simulacro" o "ejercicio"
+
+        Returns:
+            dict: Arrays fecha, fecha_invalida, tiene_puntuacion, puntuacion, nivel,
+                tiene_tema y tema; las correcciones añaden palabras, errores
+                (DataFrame) y ejemplos (los primeros de cada categoría)
+        """
+        inicio = sum(self._cuentas[:TIPOS.index(tipo)])
+        tramo = slice(inicio, inicio + self.total(tipo))
+        puntuaciones = self.puntuaciones.iloc[tramo]
+        columnas = {
+            "fecha": self.fechas[0][tramo],
+            "fecha_invalida": self.fechas[1][tramo],
+            "tiene_puntuacion": puntuaciones["tiene_puntuacion"].to_numpy(),
+            "puntuacion": puntuaciones["puntuacion"].to_numpy(),
+            "nivel": puntuaciones["nivel"].to_numpy(dtype=object),
+            "tiene_tema": self.temas[0][tramo],
+            "tema": self.temas[1][tramo],
+        }
+        if tipo == "correccion":
+            columnas["palabras"] = self.palabras()
+            columnas["errores"] = self.errores
+            columnas["ejemplos"] = self._primeros_ejemplos()
+        return columnas
+
+    @cached_property
+    def puntuaciones(self):
+        """DataFrame: Tipo, orden original, nivel y puntuación de cada actividad."""
+        documentos = self._documentos
+        puntuaciones = [doc.get("puntuacion") for doc in documentos]
+        return pd.DataFrame({
+            "tipo": pd.Categorical.from_codes(np.repeat(np.arange(len(TIPOS)), self._cuentas), categories=TIPOS),
+            "orden": np.concatenate([np.arange(n) for n in self._cuentas]).astype(int),
+            "tiene_puntuacion": np.array([p is not None for p in puntuaciones], dtype=bool),
+            "puntuacion": pd.to_numeric(puntuaciones, errors="coerce").astype(float),
+            "nivel": [doc.get("nivel") for doc in documentos],
+        })
+
+    @cached_property
+    def fechas(self):
+        """tuple: (fechas datetime64 en hora local, máscara de textos de fecha no válidos)."""
+        return parsear_fechas([doc.get("fecha") for doc in self._documentos])
+
+    @cached_property
+    def temas(self):
+        """tuple: (máscara de actividades con campo tema, tema de cada actividad)."""
+        documentos = self._documentos
+        tema = np.empty(len(documentos), dtype=object)
+        tema[:] = [doc.get("tema") for doc in documentos]
+        return np.array(["tema" in doc for doc in documentos], dtype=bool), tema
+
+    @cached_property
+    def actividades(self):
+        """DataFrame: Las columnas de puntuaciones más fechas y tema de cada actividad."""
+        fechas, invalidas = self.fechas
+        tiene_tema, tema = self.temas
+        actividades = self.puntuaciones.assign(
+            tiene_fecha=pd.notna(fechas) | invalidas,
+            fecha=fechas,
+            # Los textos de fecha no interpretables cuentan como "ahora", igual que en el cálculo original
+            fecha_invalida=invalidas,
+            tiene_tema=tiene_tema,
+            tema=tema,
+        )
+        actividades["fecha_efectiva"] = actividades["fecha"].mask(invalidas, pd.Timestamp(self.ahora))
+        return actividades
+
+    @cached_property
+    def errores(self):
+        """DataFrame: Una fila por corrección y categoría de error."""
+        errores, self._errores_planos = self._desplegar_errores(range(self.num_correcciones))
+        return errores
+
+    def palabras(self, filas=None):
+        """
+        Número de palabras del texto original de las correcciones.
+
+        Args:
+            filas (array, opcional): Posiciones de las correcciones (todas si no se indica)
+
+        Returns:
+            np.ndarray: Palabras por corrección (0 si no hay texto)
+        """
+        if self._palabras is None and filas is not None:
+            return contar_palabras([self._correcciones[i].get("texto_original") for i in filas])
+        if self._palabras is None:
+            self._palabras = contar_palabras([doc.get("texto_original") for doc in self._correcciones])
+        return self._palabras if filas is None else self._palabras[filas]
+
+    def _desplegar_errores(self, filas):
+        """
+        Despliega los errores de las correcciones indicadas (en formato lista o
+        recuento por categoría) en tablas largas.
+
+        Returns:
+            tuple: (DataFrame de errores, lista de los diccionarios de error en el mismo orden)
+        """
+        filas = np.asarray(filas, dtype=int)
+        listas = [self._correcciones[fila].get("errores") or [] for fila in filas]
+        planos = [error for lista in listas if type(lista) is list for error in lista]
+        if set(map(type, listas)) <= {list} and set(map(type, planos)) <= {dict}:
+            cuentas = [len(lista) for lista in listas]
+        else:
+            # Formatos antiguos o elementos que no son errores: normalizar corrección a corrección
+            listas = [_normalizar_errores(lista) for lista in listas]
+            planos = [error for lista in listas for error in lista]
+            cuentas = [len(lista) for lista in listas]
+        categorias = [error.get("categoria", "Otro") for error in planos]
+        inicios = np.repeat(np.cumsum([0] + cuentas)[:-1], cuentas).astype(int)
+
+        errores = pd.DataFrame({
+            "fila": np.repeat(filas, cuentas),
+            "posicion": np.arange(len(planos)) - inicios,
+            "categoria": categorias,
+            "cantidad": _a_numero([error.get("cantidad", 0) for error in planos]),
+        })
+        return errores, planos
+
+    def _primeros_ejemplos(self, limite=5):
+        """
+        Primeros ejemplos de cada categoría de error, en orden de aparición.
+        El recorrido termina en cuanto todas las categorías tienen el límite.
+        """
+        if self._ejemplos is not None:
+            return {categoria: lista[:limite] for categoria, lista in self._ejemplos.items()}
+        categorias = self.errores["categoria"].tolist()
+        ejemplos = {categoria: [] for categoria in categorias}
+        completas = set()
+        for error, categoria in zip(self._errores_planos, categorias):
+            nuevos = error.get("ejemplos")
+            if not nuevos or categoria in completas:
+                continue
+            destino = ejemplos[categoria]
+            destino.extend(nuevos[:limite - len(destino)])
+            if len(destino) >= limite:
+                completas.add(categoria)
+                if len(completas) == len(ejemplos):
+                    break
+        return ejemplos
+
+    def _de_tipo(self, tipo):
+        return self.actividades[self.actividades["tipo"] == tipo]
+
+    def metricas_progreso(self):
+        """
+        Métricas de progreso: tasa de mejora, palabras por sesión, consistencia,
+        sesiones por semana y diversidad de temas.
+
+        Returns:
+            dict: Métricas calculadas (vacío si no hay actividad)
+        """
+        actividades = self.actividades
+        if actividades.empty:
+            return {}
+
+        metricas = {}
+        correcciones = self._de_tipo("correccion")
+
+        if len(correcciones) >= 2:
+            ordenadas = correcciones.sort_values("fecha_efectiva", kind="mergesort", na_position="first")
+            puntuaciones = ordenadas.loc[ordenadas["tiene_puntuacion"], "puntuacion"]
+            if len(puntuaciones) >= 2:
+                inicial, final = puntuaciones.iloc[0], puntuaciones.iloc[-1]
+                if inicial > 0:
+                    metricas["tasa_mejora"] = max(0, min(100, float((final - inicial) / inicial * 100)))
+
+        if len(correcciones):
+            metricas["palabras_por_sesion"] = float(self.palabras().mean())
+
+        if len(actividades) >= 2:
+            fechas = np.sort(actividades.loc[actividades["tiene_fecha"], "fecha_efectiva"].dropna().to_numpy())
+            if len(fechas) >= 2:
+                diferencias = np.diff(fechas) // _UN_DIA
+                desviacion = float(np.std(diferencias)) if len(diferencias) > 1 else 0
+                metricas["consistencia"] = 10.0 if desviacion == 0 else min(10.0, 10.0 / (1 + 0.5 * desviacion))
+
+                dias_totales = int((fechas[-1] - fechas[0]) // _UN_DIA)
+                if dias_totales > 0:
+                    metricas["sesiones_por_semana"] = min(7, len(fechas) / dias_totales * 7)
+
+        temas = actividades.loc[actividades["tiene_tema"], "tema"]
+        if len(temas):
+            p = temas.value_counts(dropna=False).to_numpy() / len(temas)
+            metricas["diversidad_temas"] = min(10, float(-(p * np.log(p)).sum()) * 3)
+
+        return metricas
+
+    def analisis_errores(self):
+        """
+        Errores por categoría con total, frecuencia, ejemplos y porcentaje,
+        ordenados por total descendente.
+
+        Returns:
+            dict: Análisis de errores por categoría
+        """
+        if not self.num_correcciones or self.errores.empty:
+            return {}
+
+        agregados = self.errores.groupby("categoria", sort=False, dropna=False)["cantidad"] \
+            .agg(total="sum", frecuencia="size") \
+            .sort_values("total", ascending=False, kind="mergesort")
+        ejemplos = self._primeros_ejemplos()
+
+        total_errores = agregados["total"].sum().item()
+        resultado = {}
+        for categoria, total, frecuencia in zip(agregados.index, agregados["total"].tolist(),
+                                                agregados["frecuencia"].tolist()):
+            resultado[categoria] = {"total": total, "frecuencia": frecuencia, "ejemplos": ejemplos.get(categoria, [])}
+            if total_errores > 0:
+                resultado[categoria]["porcentaje"] = total / total_errores * 100
+        return resultado
+
+    def nivel_estimado(self):
+        """
+        Nivel estimado a partir de las puntuaciones medias por nivel de
+        correcciones y simulacros (los simulacros pesan el doble).
+
+        Returns:
+            dict: {"nivel", "confianza", "puntuacion"}
+        """
+        sin_nivel = {"nivel": None, "confianza": 0, "puntuacion": 0}
+        actividades = self.puntuaciones
+        tipos = actividades["tipo"].cat.codes.to_numpy()
+        niveles = pd.Categorical(actividades["nivel"], categories=NIVELES).codes
+        validas = (tipos <= TIPOS.index("simulacro")) & (niveles >= 0) & actividades["tiene_puntuacion"].to_numpy()
+        if not validas.any():
+            return sin_nivel
+
+        niveles = niveles[validas]
+        pesos = np.where(tipos[validas] == TIPOS.index("simulacro"), 2.0, 1.0)
+        ponderadas = np.bincount(niveles, weights=actividades["puntuacion"].to_numpy()[validas] * pesos,
+                                 minlength=len(NIVELES))
+        sumas_pesos = np.bincount(niveles, weights=pesos, minlength=len(NIVELES))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            promedios = pd.Series(np.where(sumas_pesos > 0, ponderadas / sumas_pesos, 0.0), index=NIVELES)
+        promedios = promedios.fillna(0)
+
+        nivel = promedios.idxmax()
+        if promedios[nivel] == 0:
+            return sin_nivel
+
+        ordenados = sorted(promedios.tolist(), reverse=True)
+        if ordenados[1] > 0:
+            confianza = min(100, (ordenados[0] / ordenados[1] - 1) * 100)
+        else:
+            confianza = 90
+        return {"nivel": nivel, "confianza": confianza, "puntuacion": float(promedios[nivel])}
+
+    def tendencias(self, periodo=30):
+        """
+        Tendencias de puntuación, extensión y errores por categoría en las
+        correcciones de los últimos días.
+
+        Args:
+            periodo (int): Número de días a analizar
+
+        Returns:
+            dict: Tendencia general, tendencias detalladas y mensaje
+        """
+        # Importar dinámicamente para evitar dependencias circulares
+        from utils.analytics import generar_mensaje_tendencia
+
+        if not self.num_correcciones:
+            return {}
+
+        # Solo las correcciones (las primeras filas); los textos de fecha no válidos cuentan como "ahora"
+        fechas, invalidas = (columna[:self.num_correcciones] for columna in self.fechas)
+        efectivas = np.where(invalidas, np.datetime64(self.ahora, "ns"), fechas)
+        limite = np.datetime64(self.ahora - timedelta(days=periodo), "ns")
+        periodo_filas = np.flatnonzero(~np.isnat(efectivas) & (efectivas >= limite))
+        filas = periodo_filas[np.argsort(efectivas[periodo_filas], kind="stable")]
+        if not len(filas):
+            return {}
+
+        n = len(filas)
+        if n < 2:
+            return {
+                "tendencia_general": "estable",
+                "mensaje": "No hay suficientes datos para identificar tendencias claras"
+            }
+        mitad = n // 2
+
+        tendencias = {}
+        puntuaciones = self.puntuaciones.iloc[filas]
+        puntuaciones = puntuaciones["puntuacion"].where(puntuaciones["tiene_puntuacion"], 0.0)
+        if puntuaciones.notna().sum() >= 2:
+            primera, ultima = puntuaciones.iloc[0], puntuaciones.iloc[-1]
+            if ultima > primera * 1.1:
+                tendencias["puntuacion"] = "mejora"
+            elif ultima < primera * 0.9:
+                tendencias["puntuacion"] = "deterioro"
+            else:
+                tendencias["puntuacion"] = "estable"
+
+        palabras = self.palabras(filas)
+        primeras, ultimas = palabras[:mitad].mean(), palabras[mitad:].mean()
+        if ultimas > primeras * 1.2:
+            tendencias["palabras"] = "aumento"
+        elif ultimas < primeras * 0.8:
+            tendencias["palabras"] = "disminución"
+        else:
+            tendencias["palabras"] = "estable"
+
+        tendencias_errores = self._tendencias_errores(filas, mitad)
+
+        if tendencias.get("puntuacion") == "mejora" and all(v != "deterioro" for v in tendencias_errores.values()):
+            tendencia_general = "mejora"
+        elif tendencias.get("puntuacion") == "deterioro" or any(v == "deterioro" for v in tendencias_errores.values()):
+            tendencia_general = "deterioro"
+        else:
+            tendencia_general = "estable"
+
+        return {
+            "tendencia_general": tendencia_general,
+            "tendencias_detalladas": {**tendencias, "errores": tendencias_errores},
+            "mensaje": generar_mensaje_tendencia(tendencia_general, tendencias, tendencias_errores)
+        }
+
+    def _tendencias_errores(self, filas, mitad):
+        """
+        Compara la media de errores por categoría de la primera y la segunda
+        mitad de las correcciones indicadas (en orden cronológico).
+        """
+        if "errores" in self.__dict__:
+            errores = self.errores[self.errores["fila"].isin(filas)].copy()
+        else:
+            # Sin la tabla completa, desplegar solo las correcciones del periodo
+            errores = self._desplegar_errores(filas)[0]
+        rango = pd.Series(np.arange(len(filas)), index=filas)
+        if errores.empty:
+            return {}
+        errores["rango"] = errores["fila"].map(rango)
+        errores["categoria"] = errores["categoria"].map(str)
+        errores = errores.sort_values(["rango", "posicion"], kind="mergesort")
+
+        # Una categoría repetida en la misma corrección conserva el último valor
+        categorias = pd.unique(errores["categoria"])
+        matriz = errores.drop_duplicates(["rango", "categoria"], keep="last") \
+            .pivot(index="rango", columns="categoria", values="cantidad") \
+            .reindex(index=range(len(filas)), columns=categorias)
+
+        validas = matriz.notna().sum() >= 2
+        primeros = matriz.iloc[:mitad].mean()
+        ultimos = matriz.iloc[mitad:].mean()
+        ratio = ultimos / primeros.where(primeros != 0)
+        tendencia = np.select(
+            [primeros == 0, ratio < 0.7, ratio > 1.3],
+            [np.where(ultimos > 0, "aumento", "estable"), "mejora", "deterioro"],
+            default="estable"
+        )
+        return {categoria: t for categoria, t, valida in zip(categorias, tendencia, validas) if valida}
+
+    def mapa_actividad(self, vista="semana"):
+        """
+        Matriz del mapa de calor de actividad (ver matriz_actividad).
+
+        Args:
+            vista (str): "semana", "mes" o "año"
+
+        Returns:
+            DataFrame: Actividades por celda
+        """
+        return matriz_actividad(self.fechas[0], vista, ahora=self.ahora)
+
+    def resumen_actividad(self):
+        """
+        Última actividad y frecuencia semanal para el informe del profesor.
+
+        Returns:
+            dict: {"ultima_actividad": datetime o None, "frecuencia_semanal": float}
+        """
+        fechas = pd.Series(self.fechas[0]).dropna()
+        if fechas.empty:
+            return {"ultima_actividad": None, "frecuencia_semanal": 0}
+
+        primera, ultima = fechas.min(), fechas.max()
+        frecuencia = 0
+        if len(fechas) >= 2:
+            dias_totales = (ultima - primera).days
+            if dias_totales > 0:
+                frecuencia = round(len(fechas) / dias_totales * 7, 1)
+        return {"ultima_actividad": ultima.to_pydatetime(), "frecuencia_semanal": frecuencia}
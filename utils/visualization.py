@@ -5,6 +5,11 @@ Funciones para visualización de datos
 ------------------------------------
 Este módulo contiene funciones para crear visualizaciones a partir de los datos
 de correcciones, errores y progreso del estudiante.
+
+Las figuras se guardan en core.figure_cache con una huella de los datos y los
+parámetros del gráfico; las recargas con los mismos datos no las reconstruyen.
+Todas las funciones crear_* aceptan cache_uid para asociar la figura a un
+usuario y descartarla cuando guarde una actividad nueva.
 """
 
 import logging
@@ -16,8 +21,12 @@ import plotly.graph_objects as go
 import streamlit as st
 from datetime import datetime, timedelta
 
+from core.figure_cache import figura_en_cache
+from utils.analytics_engine import matriz_actividad, parsear_fechas
+
 logger = logging.getLogger(__name__)
 
+@figura_en_cache()
 def crear_grafico_errores(errores, titulo="Distribución de Errores"):
     """
     Crea un gráfico de barras para visualizar la distribución de errores.
@@ -73,6 +82,7 @@ def crear_grafico_errores(errores, titulo="Distribución de Errores"):
         )
         return fig
 
+@figura_en_cache()
 def crear_grafico_progreso(datos, campo_x, campo_y, titulo, color=None):
     """
     Crea un gráfico de líneas para visualizar el progreso en el tiempo.
@@ -149,6 +159,7 @@ def crear_grafico_progreso(datos, campo_x, campo_y, titulo, color=None):
         )
         return fig
 
+@figura_en_cache()
 def crear_radar_habilidades(datos, categorias=None, valor_max=10, titulo="Perfil de Habilidades"):
     """
     Crea un gráfico de radar (araña) para visualizar el perfil de habilidades.
@@ -212,19 +223,26 @@ def crear_radar_habilidades(datos, categorias=None, valor_max=10, titulo="Perfil
         )
         return fig
 
-def crear_mapa_calor_actividad(datos, titulo="Mapa de Actividad"):
+@figura_en_cache()
+def crear_mapa_calor_actividad(datos, titulo="Mapa de Actividad", vista="semana", metrica="actividades"):
     """
-    Crea un mapa de calor para visualizar la actividad por día de la semana y hora.
+    Crea un mapa de calor para visualizar la actividad por día de la semana y hora,
+    o un calendario del mes actual o del último año.
     
     Args:
-        datos (list): Lista de actividades con timestamps
+        datos (list | dict | DataFrame): Lista de actividades con timestamps,
+            diccionario uid -> lista de actividades (vista del profesor) o
+            matriz ya agregada con analytics_engine.matriz_actividad
         titulo (str): Título del gráfico
+        vista (str): "semana" (día x hora), "mes" o "año" (calendarios)
+        metrica (str): "actividades" o "estudiantes" (estudiantes distintos
+            por celda; solo con un diccionario de usuarios)
         
     Returns:
         plotly.graph_objects.Figure: Figura de Plotly con el gráfico
     """
     try:
-        if not datos:
+        if datos is None or len(datos) == 0:
             # Devolver gráfico vacío
             fig = go.Figure()
             fig.update_layout(
@@ -233,51 +251,45 @@ def crear_mapa_calor_actividad(datos, titulo="Mapa de Actividad"):
             )
             return fig
         
-        # Convertir a DataFrame
-        df = pd.DataFrame(datos)
-        
-        # Asegurarse de que la fecha está en formato datetime
-        if 'fecha' in df.columns:
-            if df['fecha'].dtype == 'object':
-                df['fecha'] = pd.to_datetime(df['fecha'])
-        
-        # Extraer día de la semana y hora
-        df['dia_semana'] = df['fecha'].dt.day_name()
-        df['hora'] = df['fecha'].dt.hour
-        
-        # Contar actividades por día y hora
-        heatmap_data = df.groupby(['dia_semana', 'hora']).size().reset_index(name='count')
-        
-        # Pivotear para formato de matriz
-        heatmap_pivot = heatmap_data.pivot(index='dia_semana', columns='hora', values='count')
-        
-        # Ordenar días de la semana (lunes a domingo)
-        orden_dias = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-        heatmap_pivot = heatmap_pivot.reindex(orden_dias)
-        
-        # Crear etiquetas en español
-        dias_es = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
-        heatmap_pivot.index = dias_es
-        
-        # Llenar NaN con 0
-        heatmap_pivot = heatmap_pivot.fillna(0)
+        if isinstance(datos, pd.DataFrame):
+            matriz = datos
+        else:
+            # Fechas y usuarios en columnas; se agregan en una sola pasada
+            usuarios = None
+            if isinstance(datos, dict):
+                listas = [actividades or [] for actividades in datos.values()]
+                fechas = [actividad.get('fecha') for actividades in listas for actividad in actividades]
+                if metrica == "estudiantes":
+                    usuarios = np.repeat(np.arange(len(listas)), [len(actividades) for actividades in listas])
+            else:
+                fechas = [actividad.get('fecha') for actividad in datos]
+            matriz = matriz_actividad(parsear_fechas(fechas)[0], vista, usuarios=usuarios)
         
-        # Crear gráfico de mapa de calor
-        fig = px.imshow(
-            heatmap_pivot,
-            title=titulo,
-            labels=dict(x="Hora del día", y="Día de la semana", color="Actividades"),
-            x=[f"{h}:00" for h in range(24)],
-            y=dias_es,
-            aspect="auto",
-            color_continuous_scale="YlOrRd"
-        )
+        if vista == "semana":
+            eje_x = "Hora del día"
+        else:
+            eje_x = "Semana (lunes)"
+        etiqueta = "Estudiantes" if metrica == "estudiantes" else "Actividades"
+        
+        # Crear gráfico de mapa de calor (las celdas fuera del periodo quedan en blanco)
+        fig = go.Figure(go.Heatmap(
+            z=matriz.to_numpy(),
+            x=list(matriz.columns),
+            y=list(matriz.index),
+            colorscale="YlOrRd",
+            colorbar=dict(title=etiqueta),
+            hovertemplate=f"%{{y}}, %{{x}}<br>{etiqueta}: %{{z}}<extra></extra>",
+            xgap=1 if vista != "semana" else 0,
+            ygap=1 if vista != "semana" else 0
+        ))
         
         # Personalizar diseño
         fig.update_layout(
+            title=titulo,
             template="plotly_white",
-            xaxis_title="Hora del día",
-            yaxis_title="Día de la semana"
+            xaxis_title=eje_x,
+            yaxis_title="Día de la semana",
+            yaxis=dict(autorange="reversed")
         )
         
         return fig
@@ -291,6 +303,7 @@ def crear_mapa_calor_actividad(datos, titulo="Mapa de Actividad"):
         )
         return fig
 
+@figura_en_cache()
 def crear_grafico_comparativo(antes, despues, etiquetas, titulo="Comparación Antes vs Después"):
     """
     Crea un gráfico de barras comparativo entre dos conjuntos de valores.
@@ -349,6 +362,7 @@ def crear_grafico_comparativo(antes, despues, etiquetas, titulo="Comparación An
         )
         return fig
 
+@figura_en_cache()
 def crear_grafico_pastel(datos, campo_valores, campo_etiquetas, titulo="Distribución"):
     """
     Crea un gráfico circular (pastel) para visualizar distribuciones.
@@ -400,6 +414,7 @@ def crear_grafico_pastel(datos, campo_valores, campo_etiquetas, titulo="Distribu
         )
         return fig
 
+@figura_en_cache()
 def crear_indicador_progreso(valor, min_val=0, max_val=100, titulo="Progreso", umbral=None):
     """
     Crea un indicador de progreso tipo gauge.
@@ -669,4 +684,84 @@ def generar_informe_visual(correcciones, periodo=30):
         return {
             "mensaje": f"Error generando informe visual: {str(e)}"
         }
-    
\ No newline at end of file
+    
+def generar_informe_visual_cohorte(informe):
+    """
+    Genera los gráficos del informe de una clase (utils.analytics_cohort).
+    
+    Args:
+        informe (dict): Informe devuelto por generar_informe_cohorte
+        
+    Returns:
+        dict: Diccionario con figuras de Plotly organizadas por sección
+    """
+    try:
+        if not informe or "mensaje" in informe:
+            return {
+                "mensaje": informe.get("mensaje") if informe else "No hay datos de la clase para generar un informe visual."
+            }
+        
+        graficos = {}
+        
+        # Distribución de errores de la clase
+        if informe.get("errores"):
+            graficos['errores'] = crear_grafico_errores(
+                [{'categoria': cat, 'cantidad': datos['total']} for cat, datos in informe["errores"].items()],
+                titulo="Distribución de Errores de la Clase"
+            )
+        
+        # Curvas de progreso de la puntuación (media y cuartiles)
+        series = {
+            'puntuacion_media': 'Media',
+            'puntuacion_p25': 'Percentil 25',
+            'puntuacion_p75': 'Percentil 75'
+        }
+        datos_progreso = [
+            {'fecha': punto['fecha'], 'puntuacion': punto[campo], 'serie': nombre}
+            for punto in informe.get("progreso", [])
+            for campo, nombre in series.items()
+            if punto.get(campo) is not None
+        ]
+        if datos_progreso:
+            graficos['progreso'] = crear_grafico_progreso(
+                datos_progreso,
+                'fecha',
+                'puntuacion',
+                titulo="Evolución de las Puntuaciones de la Clase",
+                color='serie'
+            )
+        
+        # Estudiantes por nivel en cada periodo
+        if informe.get("niveles"):
+            graficos['niveles'] = crear_grafico_progreso(
+                informe["niveles"],
+                'fecha',
+                'estudiantes',
+                titulo="Estudiantes por Nivel",
+                color='nivel'
+            )
+        
+        # Estudiantes activos por día de la semana y hora
+        mapa = informe.get("mapa_actividad")
+        if mapa is not None and np.nansum(mapa.to_numpy()) > 0:
+            graficos['mapa_calor'] = crear_mapa_calor_actividad(
+                mapa,
+                titulo="Estudiantes Activos por Día y Hora",
+                metrica="estudiantes"
+            )
+        
+        # Errores que aparecen juntos con más frecuencia
+        if informe.get("patrones"):
+            graficos['patrones'] = crear_grafico_pastel(
+                informe["patrones"],
+                'correcciones',
+                'patron',
+                titulo="Errores que Aparecen Juntos"
+            )
+        
+        return graficos
+    except Exception as e:
+        logger.error(f"Error generando informe visual de la clase: {str(e)}")
+        return {
+            "mensaje": f"Error generando informe visual de la clase: {str(e)}"
+        }